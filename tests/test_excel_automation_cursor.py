@@ -0,0 +1,56 @@
+from utils.excel_automation_cursor import CellCursor
+
+
+def test_unknown_position_uses_go_to():
+    assert CellCursor(max_relative_keys=4).plan(0, 0) is None
+
+
+def test_relative_move_with_arrow_keys():
+    cursor = CellCursor(max_relative_keys=4)
+    cursor.moved_to(2, 2)
+    assert cursor.plan(2, 2) == ''
+    assert cursor.plan(4, 1) == '{DOWN 2}{LEFT 1}'
+    assert cursor.plan(9, 2) is None
+
+
+def test_enter_moves_in_configured_direction():
+    cursor = CellCursor(max_relative_keys=4, enter_direction='right')
+    cursor.moved_to(0, 0)
+    cursor.after_enter()
+    assert cursor.position == (0, 1)
+
+
+def test_enter_at_sheet_edge_does_not_move():
+    cursor = CellCursor(max_relative_keys=4, enter_direction='up')
+    cursor.moved_to(0, 3)
+    cursor.after_enter()
+    assert cursor.position == (0, 3)
+
+
+def test_relative_navigation_is_disabled_by_default():
+    cursor = CellCursor()
+    assert cursor.max_relative_keys == 0
+    cursor.moved_to(2, 2)
+    assert cursor.plan(2, 2) == ''
+    assert cursor.plan(3, 2) is None
+    # Enterは非表示の行を飛ばす場合があるため、移動後の位置は追跡しない
+    cursor.after_enter()
+    assert cursor.position is None
+
+
+def test_selected_range_is_collapsed_on_the_active_cell():
+    cursor = CellCursor(max_relative_keys=4)
+    cursor.moved_to(1, 1, range_selected=True)
+    assert cursor.plan(1, 1) == '+{BACKSPACE}'
+    # 矢印キーで移動すると選択範囲も解除される
+    assert cursor.plan(2, 1) == '{DOWN 1}'
+    cursor.moved_to(1, 1)
+    assert cursor.plan(1, 1) == ''
+
+
+def test_enter_in_selected_range_loses_position():
+    cursor = CellCursor(max_relative_keys=4)
+    cursor.moved_to(1, 1, range_selected=True)
+    cursor.after_enter()
+    assert cursor.position is None
+    assert not cursor.range_selected
@@ -0,0 +1,85 @@
+import pytest
+
+from utils.excel_automation_configs import ExcelConfig
+from utils.excel_automation_estimator import estimate, record_script
+
+TIMING = {
+    'window_activation': 0.5, 'window_wait': 5, 'file_operation': 2, 'text_input': 0.5,
+    'cell_selection': 0.5, 'cell_navigation': 0.1, 'dialog_wait': 1, 'dialog_timeout': 10,
+    'dialog_quiet_period': 2, 'ribbon_operation': 1,
+}
+
+
+@pytest.fixture(autouse=True)
+def fixed_settings(monkeypatch):
+    monkeypatch.setitem(ExcelConfig.TEXT_INPUT, 'chars_per_second', 0)
+    monkeypatch.setitem(ExcelConfig.PROCESS_MONITOR, 'idle_duration', 0.6)
+    monkeypatch.setitem(ExcelConfig.PROCESS_MONITOR, 'sample_interval', 0.2)
+
+
+def test_start_excel_uses_window_wait_and_idle():
+    result = estimate([('start_excel', ('a.xlsx',))], timing=TIMING)
+    operation = result.operations[0]
+    assert operation.cost == {'window_wait': 1}
+    assert operation.seconds == pytest.approx(5 + 0.8)
+
+
+def test_save_file_includes_idle_wait():
+    result = estimate([('save_file', ())], timing=TIMING)
+    assert result.total_seconds == pytest.approx(0.5 + 2 + 0.8)
+
+
+def test_save_as_times_out_without_dialog():
+    result = estimate([('save_file', ('out.xlsx',))], timing=TIMING, dialog_found=False)
+    assert result.total_seconds == pytest.approx(0.5 + 10)
+
+
+def test_relative_navigation_is_cheaper_than_go_to(monkeypatch):
+    monkeypatch.setitem(ExcelConfig.CELL_NAVIGATION, 'max_relative_keys', 10)
+
+    def script(excel):
+        excel.select_cell(0, 0)
+        excel.input_text('a')
+        excel.select_cell(1, 0)
+        excel.input_text('b')
+
+    result = estimate(record_script(script), timing=TIMING)
+    counts = dict((key, count) for key, _, count in result.seconds_by_key())
+    # 1回目は「ジャンプ」、2回目はEnter後の位置なので移動不要
+    assert counts['cell_selection'] == 3
+    assert 'cell_navigation' not in counts
+
+
+def test_saving_for_timing_change():
+    result = estimate([('select_cell', (5, 5)), ('select_cell', (20, 20))], timing=TIMING)
+    assert result.saving('cell_selection', 0.25) == pytest.approx(2 * 3 * 0.25)
+
+
+def test_input_block_is_costed_by_fill_plan():
+    values = [[f'=A{row + 1}*2'] for row in range(100)]
+    result = estimate([('input_block', (0, 1, values))], timing=TIMING)
+    counts = dict((key, count) for key, _, count in result.seconds_by_key())
+    # 先頭セルの入力 + 範囲選択と下方向へのコピー
+    assert counts['cell_selection'] == 6
+    assert counts['text_input'] == 2
+
+
+def test_selecting_the_active_cell_of_a_range_collapses_the_selection():
+    result = estimate([('select_range', (0, 0, 2, 2)), ('select_cell', (0, 0))], timing=TIMING)
+    assert result.operations[1].cost == {'window_activation': 1, 'cell_navigation': 1}
+
+
+def test_open_file_miss_waits_for_open_timeout():
+    result = estimate([('open_file', ('a.xlsx',))], timing=dict(TIMING, open_timeout=60), dialog_found=False)
+    assert result.operations[0].cost['open_timeout'] == 1
+
+
+def test_go_to_is_used_by_default():
+    def script(excel):
+        excel.select_cell(0, 0)
+        excel.input_text('a')
+        excel.select_cell(1, 0)
+
+    result = estimate(record_script(script), timing=TIMING)
+    counts = dict((key, count) for key, _, count in result.seconds_by_key())
+    assert counts['cell_selection'] == 6
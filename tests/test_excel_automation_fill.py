@@ -0,0 +1,54 @@
+from utils.excel_automation_fill import FillStep, normalize_formula, plan_fill
+
+
+def test_relative_references_normalize_to_the_same_formula():
+    assert normalize_formula('=A1*2', 1, 0) == normalize_formula('=A2*2', 2, 0)
+    assert normalize_formula('=$A$1', 1, 0) == normalize_formula('=$A$1', 5, 3) == '=R0C0'
+
+
+def test_string_literals_and_function_names_are_not_references():
+    assert normalize_formula('=LOG10(A1)&"A1"', 0, 0) == '=LOG10(R[0]C[0])&"A1"'
+
+
+def test_whole_column_and_row_references():
+    assert normalize_formula('=SUM(A:A)', 0, 1) == '=SUM(C[-1]:C[-1])'
+    assert normalize_formula('=SUM($B:$C)', 3, 3) == '=SUM(C1:C2)'
+    assert normalize_formula('=SUM(1:1)', 1, 0) == '=SUM(R[-1]:R[-1])'
+    assert normalize_formula('=SUM($2:3)', 4, 0) == '=SUM(R1:R[-2])'
+
+
+def test_vertical_run_uses_fill_down():
+    values = [['=A1*2'], ['=A2*2'], ['=A3*2']]
+    steps = plan_fill(values, 0, 1, min_run=3)
+    assert steps == [
+        FillStep('input', 0, 1, 0, 1, '=A1*2'),
+        FillStep('fill_down', 0, 1, 2, 1, None),
+    ]
+
+
+def test_adjacent_columns_share_one_fill_down():
+    values = [['x', 'y']] * 3
+    steps = plan_fill(values, min_run=3)
+    assert [step for step in steps if step.kind != 'input'] == [FillStep('fill_down', 0, 0, 2, 1, None)]
+
+
+def test_horizontal_run_uses_fill_right():
+    steps = plan_fill([['=A1', '=B1', '=C1']], 1, 0, min_run=3)
+    assert steps[-1] == FillStep('fill_right', 1, 0, 1, 2, None)
+
+
+def test_whole_column_reference_is_not_filled_right():
+    steps = plan_fill([['=SUM(A:A)'] * 3], 0, 1, min_run=3)
+    assert all(step.kind == 'input' for step in steps)
+    assert len(steps) == 3
+
+
+def test_whole_row_reference_is_not_filled_down():
+    steps = plan_fill([['=SUM(1:1)']] * 3, 1, 0, min_run=3)
+    assert all(step.kind == 'input' for step in steps)
+    assert len(steps) == 3
+
+
+def test_short_runs_and_empty_cells_are_input_individually():
+    steps = plan_fill([['a', 'a', None, 'a']], min_run=3)
+    assert [(step.kind, step.left) for step in steps] == [('input', 0), ('input', 1), ('input', 3)]
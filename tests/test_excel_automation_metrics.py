@@ -0,0 +1,45 @@
+from utils.excel_automation_metrics import MetricsRegistry
+from utils.excel_automation_retry import RetryEngine, RetryPolicy
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry(buckets=(0.1, 1))
+    histogram = registry.histogram('excel_wait_seconds', '待機処理の所要時間')
+    histogram.observe(0.05, wait='dialog')
+    histogram.observe(0.5, wait='dialog')
+    histogram.observe(5, wait='dialog')
+
+    text = registry.render_prometheus()
+    assert '# TYPE excel_wait_seconds histogram' in text
+    assert 'excel_wait_seconds_bucket{wait="dialog",le="0.1"} 1' in text
+    assert 'excel_wait_seconds_bucket{wait="dialog",le="1.0"} 2' in text
+    assert 'excel_wait_seconds_bucket{wait="dialog",le="+Inf"} 3' in text
+    assert 'excel_wait_seconds_count{wait="dialog"} 3' in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter('excel_operations_total').inc(operation='a"b\\c')
+    assert 'excel_operations_total{operation="a\\"b\\\\c"} 1' in registry.render_prometheus()
+
+
+def test_snapshot_is_json_friendly():
+    registry = MetricsRegistry(buckets=(1,))
+    registry.gauge('excel_process_handles').set(10)
+    registry.histogram('excel_operation_seconds').observe(0.5, operation='select_cell')
+    snapshot = registry.snapshot()
+    assert snapshot['excel_process_handles'] == {'type': 'gauge', 'values': [{'labels': {}, 'value': 10}]}
+    assert snapshot['excel_operation_seconds']['values'][0]['buckets'] == {'1.0': 1, '+Inf': 1}
+
+
+def test_retry_engine_records_operations():
+    registry = MetricsRegistry()
+    engine = RetryEngine(policy=RetryPolicy(max_retries=2, retry_delay=0, jitter=0), operation_timeout=None,
+                         metrics=registry, sleep=lambda seconds: None)
+    results = iter([False, True])
+    engine.run('セル選択', lambda: next(results), 'select_cell')
+    engine.record_operation('input_block', 'failure', 1.5)
+
+    assert registry.counter('excel_operations_total').value(operation='select_cell', result='success') == 1
+    assert registry.counter('excel_operation_retries_total').value(operation='select_cell') == 1
+    assert registry.histogram('excel_operation_seconds').count(operation='input_block') == 1
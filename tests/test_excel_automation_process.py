@@ -0,0 +1,73 @@
+from utils.excel_automation_process import ExcelProcessMonitor, FakeProcessSource, ProcessSample
+
+MB = 1024 * 1024
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_monitor(cpu_per_sample, memory_mb=100, handles=500, interval=0.2):
+    """サンプリング間隔ごとのCPU時間の増分から計測値の列を作成"""
+    samples = []
+    cpu_seconds = 0.0
+    for index, cpu in enumerate(cpu_per_sample):
+        cpu_seconds += cpu
+        memory = memory_mb[index] if isinstance(memory_mb, list) else memory_mb
+        samples.append(ProcessSample(index * interval, cpu_seconds, memory * MB, handles))
+    clock = FakeClock()
+    monitor = ExcelProcessMonitor(FakeProcessSource(samples), sleep=clock.sleep, clock=clock)
+    monitor.sample_interval = interval
+    monitor.idle_cpu_percent = 5
+    monitor.idle_duration = 0.6
+    monitor.memory_growth_factor = 3.0
+    monitor.max_memory_mb = 2048
+    monitor.max_handles = 10000
+    return monitor
+
+
+def test_cpu_percent():
+    previous = ProcessSample(0.0, 1.0, 0, 0)
+    current = ProcessSample(0.5, 1.25, 0, 0)
+    assert ExcelProcessMonitor.cpu_percent(previous, current) == 50.0
+
+
+def test_waits_until_cpu_stays_low():
+    # 高負荷が続いた後にアイドルになる
+    monitor = make_monitor([0.0, 0.2, 0.2, 0.0, 0.0, 0.0, 0.0])
+    assert monitor.wait_until_idle(timeout=5)
+    # 最後の高負荷区間の終わり（0.4秒）から idle_duration 経過した時点
+    assert monitor.last_sample.timestamp == 1.0
+
+
+def test_idle_wait_times_out_while_busy():
+    monitor = make_monitor([0.2] * 100)
+    assert not monitor.wait_until_idle(timeout=1)
+    assert monitor.baseline is None
+
+
+def test_baseline_is_taken_at_first_idle():
+    # 読み込み中（100MB）ではなく、読み込み完了後のアイドル時（400MB）を基準とする
+    monitor = make_monitor([0.0, 0.2, 0.0, 0.0, 0.0, 0.0], memory_mb=[100, 250, 400, 400, 400, 400])
+    assert monitor.check_resources() is None
+    assert monitor.wait_until_idle(timeout=5)
+    assert monitor.baseline.memory_bytes == 400 * MB
+    assert monitor.check_resources() is None
+
+
+def test_memory_growth_is_reported():
+    monitor = make_monitor([0.0] * 5, memory_mb=[300] * 4 + [1000])
+    assert monitor.wait_until_idle(timeout=5)
+    assert 'メモリ使用量' in monitor.check_resources()
+
+
+def test_memory_limit_and_handles_are_reported():
+    assert '上限' in make_monitor([0.0], memory_mb=4096).check_resources()
+    assert 'ハンドル数' in make_monitor([0.0], handles=20000).check_resources()
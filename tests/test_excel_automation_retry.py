@@ -0,0 +1,160 @@
+import pytest
+
+from utils.excel_automation_retry import (
+    CircuitBreaker, Deadline, ExcelOperationError, NonRetryableError, RetryEngine, RetryPolicy, retry_operation,
+)
+
+
+def make_engine(max_retries=3, on_trip=None, threshold=3, continue_on_error=True):
+    policy = RetryPolicy(max_retries=max_retries, retry_delay=0.1, backoff_factor=2, max_delay=10, jitter=0)
+    breaker = CircuitBreaker(failure_threshold=threshold, cooldown=30, on_trip=on_trip)
+    return RetryEngine(policy=policy, breaker=breaker, operation_timeout=None,
+                       continue_on_error=continue_on_error, sleep=lambda seconds: None)
+
+
+class Operations:
+    def __init__(self, engine):
+        self.retry_engine = engine
+        self.inner_calls = 0
+        self.outer_calls = 0
+
+    @retry_operation("内側")
+    def inner(self):
+        self.inner_calls += 1
+        return False
+
+    @retry_operation("外側")
+    def outer(self):
+        self.outer_calls += 1
+        return self.inner()
+
+    @retry_operation("キー入力", idempotent=False)
+    def type_keys(self):
+        self.outer_calls += 1
+        return False
+
+
+def test_policy_backoff_is_capped():
+    policy = RetryPolicy(max_retries=5, retry_delay=1, backoff_factor=2, max_delay=5, jitter=0)
+    assert [policy.delay(attempt) for attempt in range(5)] == [1, 2, 4, 5, 5]
+
+
+def test_retries_until_success():
+    engine = make_engine()
+    results = iter([False, False, 'ok'])
+    assert engine.run('操作', lambda: next(results)) == 'ok'
+
+
+def test_exception_counts_as_failure():
+    engine = make_engine(max_retries=1, threshold=0)
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise RuntimeError('失敗')
+
+    assert engine.run('操作', fail) is False
+    assert len(calls) == 2
+
+
+def test_nested_operations_are_not_retried_separately():
+    operations = Operations(make_engine(max_retries=3, threshold=0))
+    assert operations.outer() is False
+    # 外側の4回の試行で内側を1回ずつ実行する（4 × 4 = 16回にはならない）
+    assert operations.outer_calls == 4
+    assert operations.inner_calls == 4
+
+
+def test_none_result_is_not_a_failure():
+    engine = make_engine(threshold=1)
+    calls = []
+    assert engine.run('操作', lambda: calls.append(1)) is None
+    assert len(calls) == 1
+    assert not engine.breaker.is_open()
+
+
+def test_breaker_trip_blocks_until_reset():
+    trips = []
+    engine = make_engine(max_retries=0, threshold=2, on_trip=lambda: trips.append(1) or True)
+    engine.run('操作', lambda: False)
+    engine.run('操作', lambda: False)
+    assert trips == [1]
+    assert engine.breaker.tripped
+
+    calls = []
+    assert engine.run('操作', lambda: calls.append(1) or True) is False
+    assert calls == []
+
+    engine.breaker.reset()
+    assert engine.run('操作', lambda: True) is True
+
+
+def test_operations_inside_on_trip_are_not_blocked():
+    engine = make_engine(max_retries=0, threshold=1)
+    engine.breaker.on_trip = lambda: engine.run('再起動', lambda: True)
+    engine.run('操作', lambda: False)
+    assert engine.breaker.tripped
+
+
+def test_raises_when_continue_on_error_is_false():
+    engine = make_engine(max_retries=0, threshold=0, continue_on_error=False)
+    with pytest.raises(ExcelOperationError):
+        engine.run('操作', lambda: False)
+
+
+def test_nested_deadlines_use_earliest():
+    now = [0.0]
+    engine = make_engine()
+    engine.clock = lambda: now[0]
+    with engine.deadline(10):
+        with engine.deadline(3):
+            assert engine.clamp(5) == 3
+        assert engine.clamp(5) == 5
+    assert engine.remaining() is None
+
+
+def test_deadline_expires():
+    now = [0.0]
+    deadline = Deadline(2, clock=lambda: now[0])
+    now[0] = 2.5
+    assert deadline.expired()
+    assert deadline.remaining() == 0.0
+
+
+@pytest.mark.parametrize('error', [ValueError('列番号が範囲外です'), NonRetryableError('Excelが見つかりません')])
+def test_deterministic_failure_is_not_retried_and_does_not_trip(error):
+    trips = []
+    engine = make_engine(max_retries=3, threshold=1, on_trip=lambda: trips.append(1) or True)
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise error
+
+    for _ in range(3):
+        with pytest.raises(type(error)):
+            engine.run('操作', fail)
+    assert len(calls) == 3
+    assert trips == []
+    assert engine.breaker.failures == 0
+    assert not engine.breaker.is_open()
+
+
+def test_deterministic_failure_in_nested_operation_propagates():
+    engine = make_engine(max_retries=3, threshold=1)
+    calls = []
+
+    def inner():
+        calls.append(1)
+        raise ValueError('方向が不正です')
+
+    with pytest.raises(ValueError):
+        engine.run('外側', lambda: engine.run('内側', inner))
+    assert len(calls) == 1
+    assert engine.breaker.failures == 0
+
+
+def test_non_idempotent_operation_is_not_retried():
+    operations = Operations(make_engine(max_retries=3, threshold=0))
+    assert operations.type_keys() is False
+    assert operations.outer_calls == 1
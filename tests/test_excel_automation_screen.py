@@ -0,0 +1,55 @@
+import numpy as np
+
+from utils.excel_automation_screen import ScreenSettleDetector, SyntheticCaptureSource, to_small_gray
+
+
+def frame(value, size=(40, 60)):
+    return np.full(size, value, dtype=np.uint8)
+
+
+def make_detector(frames, **kwargs):
+    source = SyntheticCaptureSource(frames)
+    detector = ScreenSettleDetector(source, stable_frames=3, frame_interval=0.001,
+                                    pixel_threshold=8, change_ratio=0.001, sleep=lambda seconds: None, **kwargs)
+    return source, detector
+
+
+def test_settles_after_stable_frames():
+    source, detector = make_detector([frame(0), frame(50), frame(100), frame(100)])
+    assert detector.wait_until_settled(timeout=1)
+    # 初回 + 変化2回 + 無変化3回
+    assert source.index == 6
+
+
+def test_static_screen_settles_immediately():
+    source, detector = make_detector([frame(0)])
+    assert detector.wait_until_settled(timeout=1)
+    assert source.index == 4
+
+
+def test_require_change_waits_for_delayed_redraw():
+    # 描画の開始が遅れる場合（無変化が続いてから変化する場合）
+    frames = [frame(0)] * 5 + [frame(200)]
+    source, detector = make_detector(frames)
+    assert detector.wait_until_settled(timeout=1, require_change=True)
+    # 変化（6フレーム目）を検出してから3フレーム安定するまで待機する
+    assert source.index == 9
+
+
+def test_require_change_times_out_without_change():
+    _, detector = make_detector([frame(0)])
+    assert not detector.wait_until_settled(timeout=0.02, require_change=True)
+
+
+def test_small_changes_below_ratio_are_ignored():
+    noisy = frame(0)
+    noisy[0, 0] = 255  # 1画素だけの変化（カーソルの点滅など）
+    _, detector = make_detector([frame(0)])
+    assert not detector.frame_changed(frame(0), noisy)
+    assert detector.frame_changed(frame(0), frame(0, size=(20, 30)))
+
+
+def test_to_small_gray_converts_and_scales():
+    rgb = np.zeros((100, 200, 3), dtype=np.uint8)
+    small = to_small_gray(rgb, 0.25)
+    assert small.shape == (25, 50)
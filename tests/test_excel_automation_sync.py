@@ -0,0 +1,141 @@
+import zipfile
+
+import numpy as np
+import pytest
+
+from utils.excel_automation_sync import SyncRange, cell_text, group_ranges, plan_sync, read_sheet
+
+WORKBOOK = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+          xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+  <bookViews><workbookView activeTab="0"/></bookViews>
+  <sheets><sheet name="Data" sheetId="1" r:id="rId1"/></sheets>
+</workbook>'''
+
+RELS = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+  <Relationship Id="rId1" Target="worksheets/sheet1.xml"
+    Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>
+</Relationships>'''
+
+SHARED_STRINGS = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+  <si><t>済</t></si>
+  <si><r><t>a</t></r><r><t>b</t></r></si>
+</sst>'''
+
+# A1:A5 = 1..5、B1:B5 = 共有数式 =A1*2、C1 = "済"、C2 = "ab"（リッチテキスト）、D1 = TRUE
+SHEET = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>
+  <row r="1"><c r="A1"><v>1</v></c><c r="B1"><f t="shared" ref="B1:B5" si="0">A1*2</f><v>2</v></c>
+    <c r="C1" t="s"><v>0</v></c><c r="D1" t="b"><v>1</v></c></row>
+  <row r="2"><c r="A2"><v>2</v></c><c r="B2"><f t="shared" si="0"/><v>4</v></c>
+    <c r="C2" t="s"><v>1</v></c></row>
+  <row r="3"><c r="A3"><v>3</v></c><c r="B3"><f t="shared" si="0"/><v>6</v></c></row>
+  <row r="4"><c r="A4"><v>4.0</v></c><c r="B4"><f t="shared" si="0"/><v>8</v></c></row>
+  <row r="5"><c r="A5"><v>5</v></c><c r="B5"><f t="shared" si="0"/><v>10</v></c></row>
+</sheetData></worksheet>'''
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / 'book.xlsx'
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('xl/workbook.xml', WORKBOOK)
+        archive.writestr('xl/_rels/workbook.xml.rels', RELS)
+        archive.writestr('xl/sharedStrings.xml', SHARED_STRINGS)
+        archive.writestr('xl/worksheets/sheet1.xml', SHEET)
+    return str(path)
+
+
+def test_read_sheet(workbook):
+    grid = read_sheet(workbook)
+    assert grid.shape == (5, 4)
+    assert list(grid[:, 0]) == ['1', '2', '3', '4', '5']
+    # 共有数式は相対位置に正規化されるため、すべてのセルで同じ文字列になる
+    assert set(grid[:, 1]) == {'=R[0]C[-1]*2'}
+    assert list(grid[:2, 2]) == ['済', 'ab']
+    assert grid[0, 3] == 'TRUE'
+    assert grid[4, 3] == ''
+
+
+def test_read_sheet_limits_shape_and_rejects_unknown_sheet(workbook):
+    assert read_sheet(workbook, 'Data', shape=(2, 2)).shape == (2, 2)
+    with pytest.raises(ValueError):
+        read_sheet(workbook, 'Missing')
+
+
+def test_unchanged_values_need_no_ranges(workbook):
+    values = [[row, f'=A{row}*2'] for row in range(1, 6)]
+    plan = plan_sync(workbook, values)
+    assert plan.ranges == []
+    assert (plan.changed_cells, plan.total_cells) == (0, 10)
+
+
+def test_changes_are_placed_at_the_start_offset(workbook):
+    # C2:D3 のうち C2 だけ変更、D2 は None なので比較しない、D3 は空文字列なので変更不要
+    plan = plan_sync(workbook, [['x', None], ['', '']], start_row=1, start_column=2)
+    assert plan.ranges == [SyncRange('write', 1, 2, 1, 2, [['x']])]
+    assert (plan.changed_cells, plan.total_cells) == (1, 3)
+
+
+def test_empty_strings_clear_existing_values(workbook):
+    plan = plan_sync(workbook, [['', ''], ['', '']], start_row=0, start_column=0)
+    assert plan.ranges == [SyncRange('clear', 0, 0, 1, 1, None)]
+
+
+def test_missing_file_writes_every_defined_cell(tmp_path):
+    plan = plan_sync(str(tmp_path / 'missing.xlsx'), [['a', 'b'], ['c', None]], start_row=3)
+    assert plan.ranges == [
+        SyncRange('write', 3, 0, 3, 1, [['a', 'b']]),
+        SyncRange('write', 4, 0, 4, 0, [['c']]),
+    ]
+    assert plan.changed_cells == 3
+
+
+def test_group_ranges_merges_rows_with_the_same_columns():
+    mask = np.array([
+        [1, 1, 0, 1],
+        [1, 1, 0, 0],
+        [0, 0, 0, 1],
+        [1, 1, 0, 1],
+    ], dtype=bool)
+    assert group_ranges(mask) == [(0, 0, 1, 1), (0, 3, 0, 3), (2, 3, 3, 3), (3, 0, 3, 1)]
+
+
+def test_group_ranges_of_empty_mask():
+    assert group_ranges(np.zeros((0, 0), dtype=bool)) == []
+    assert group_ranges(np.zeros((2, 2), dtype=bool)) == []
+
+
+@pytest.mark.parametrize('value, stored', [
+    ('1,000', '1000'),
+    ('-1,234.5', '-1234.5'),
+    ('10%', '0.1'),
+    ('12.5%', '0.125'),
+    ('2024/1/1', '45292'),
+    ('2024-01-01', '45292'),
+    ('2024/1/1 12:00', '45292.5'),
+    ('12:30', '0.520833333333333'),
+    ('true', 'TRUE'),
+    (0.1 + 0.2, '0.3'),
+])
+def test_values_converted_by_excel_compare_equal(value, stored):
+    assert cell_text(value, 0, 0) == stored
+
+
+@pytest.mark.parametrize('value', ['¥1,000', '1/2', '2024/13/1', '1,00'])
+def test_other_formats_are_compared_as_text(value):
+    assert cell_text(value, 0, 0) == value
+
+
+def test_converted_values_need_no_ranges(tmp_path):
+    path = tmp_path / 'values.xlsx'
+    sheet = SHEET.replace('<v>1</v></c><c r="B1">', '<v>1000</v></c><c r="B1">')
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('xl/workbook.xml', WORKBOOK)
+        archive.writestr('xl/_rels/workbook.xml.rels', RELS)
+        archive.writestr('xl/sharedStrings.xml', SHARED_STRINGS)
+        archive.writestr('xl/worksheets/sheet1.xml', sheet)
+    plan = plan_sync(str(path), [['1,000'], ['2'], ['300%']])
+    assert plan.ranges == []
@@ -0,0 +1,62 @@
+import pytest
+
+from utils.excel_automation_text import TextInputEngine, escape_send_keys, requires_paste
+
+
+def make_engine(**options):
+    sent = []
+    clipboard = []
+    settings = dict(chunk_size=200, chars_per_second=0, key_pause=0.0, paste_threshold=1000, use_clipboard=True)
+    settings.update(options)
+    engine = TextInputEngine(send=lambda keys, pause: sent.append(keys), set_clipboard=clipboard.append,
+                             sleep=lambda seconds: None, **settings)
+    return engine, sent, clipboard
+
+
+@pytest.mark.parametrize('char', list('+^%~(){}[]'))
+def test_special_characters_are_escaped(char):
+    assert escape_send_keys(char) == '{' + char + '}'
+
+
+def test_newlines_become_alt_enter():
+    assert escape_send_keys('a\nb') == 'a%{ENTER}b'
+    assert escape_send_keys('a\r\nb') == 'a%{ENTER}b'
+
+
+def test_chunks_never_split_an_escape():
+    engine, sent, _ = make_engine(chunk_size=3)
+    assert engine.type_text('a+b(c)d{e}') == 'keys'
+    assert sent == ['a{+}b', '{(}c{)}', 'd{{}e', '{}}']
+
+
+def test_crlf_across_a_chunk_boundary_is_one_line_break():
+    engine, sent, _ = make_engine(chunk_size=2)
+    engine.type_text('ab\r\ncd')
+    assert ''.join(sent) == 'ab%{ENTER}cd'
+
+
+@pytest.mark.parametrize('text', ['日本語', 'ｱｲｳ', '絵文字\U0001F600', 'x' * 1001])
+def test_japanese_non_bmp_and_long_text_are_pasted(text):
+    engine, sent, clipboard = make_engine()
+    assert engine.type_text(text, paste_prefix='{BACKSPACE}') == 'paste'
+    assert clipboard == [text]
+    assert sent == ['{BACKSPACE}^v']
+
+
+def test_plain_text_is_typed():
+    assert not requires_paste('abc 123')
+    engine, sent, clipboard = make_engine()
+    assert engine.type_text('abc 123') == 'keys'
+    assert clipboard == []
+
+
+def test_tabs_are_always_pasted():
+    engine, sent, clipboard = make_engine(use_clipboard=False)
+    assert engine.type_text('a\tb') == 'paste'
+    assert clipboard == ['a\tb']
+
+
+def test_clipboard_can_be_disabled():
+    engine, sent, clipboard = make_engine(use_clipboard=False)
+    assert engine.type_text('日本語') == 'keys'
+    assert clipboard == []
@@ -0,0 +1,150 @@
+import time
+
+import cv2
+import numpy as np
+
+from utils.excel_automation_vision import TemplateLocator, match_center
+
+
+def make_icon(size=32, seed=0):
+    """ぼかしたノイズのアイコン（相関が鋭く、拡大縮小後も一致する）"""
+    rng = np.random.default_rng(seed)
+    icon = rng.integers(0, 256, (size, size), dtype=np.uint8)
+    return cv2.GaussianBlur(icon, (5, 5), 0)
+
+
+def make_screen(icon=None, position=(0, 0), size=(1080, 1920)):
+    """リボン風の帯とセルの罫線を描いた合成スクリーンショット"""
+    screen = np.full(size, 240, dtype=np.uint8)
+    screen[:150, :] = 220
+    screen[150:, ::64] = 200
+    screen[150::20, :] = 200
+    if icon is not None:
+        x, y = position
+        screen[y:y + icon.shape[0], x:x + icon.shape[1]] = icon
+    return screen
+
+
+def make_locator(icon):
+    locator = TemplateLocator(scales=(0.75, 1.0, 1.25, 1.5), threshold=0.85, roi_margin=64,
+                              coarse_scale=0.5, min_size=8)
+    locator.add_template('button', icon)
+    return locator
+
+
+def test_locates_template_on_full_screen():
+    icon = make_icon()
+    locator = make_locator(icon)
+    match = locator.locate('button', make_screen(icon, (1200, 60)))
+    assert (match.x, match.y, match.scale) == (1200, 60, 1.0)
+    assert match_center(match) == (1216, 76)
+
+
+def test_locates_scaled_template():
+    icon = make_icon()
+    scaled = cv2.resize(icon, None, fx=1.5, fy=1.5, interpolation=cv2.INTER_AREA)
+    locator = make_locator(icon)
+    match = locator.locate('button', make_screen(scaled, (300, 500)))
+    assert match.scale == 1.5
+    assert abs(match.x - 300) <= 1 and abs(match.y - 500) <= 1
+
+
+def test_returns_none_when_absent():
+    locator = make_locator(make_icon())
+    assert locator.locate('button', make_screen(make_icon(seed=1), (100, 100))) is None
+
+
+def test_reuses_last_hit_and_searches_roi_after_small_move():
+    icon = make_icon()
+    locator = make_locator(icon)
+    locator.locate('button', make_screen(icon, (800, 40)), layout_key='layout')
+
+    moved = locator.locate('button', make_screen(icon, (830, 50)), layout_key='layout')
+    assert (moved.x, moved.y) == (830, 50)
+
+    # レイアウトが変化した場合は前回の位置を再確認しない
+    relocated = locator.locate('button', make_screen(icon, (100, 900)), layout_key='other')
+    assert (relocated.x, relocated.y) == (100, 900)
+
+
+def test_cached_lookup_is_fast():
+    icon = make_icon()
+    locator = make_locator(icon)
+    screen = make_screen(icon, (1500, 80))
+    locator.locate('button', screen, layout_key='layout')
+
+    durations = []
+    for _ in range(5):
+        start = time.perf_counter()
+        assert locator.locate('button', screen, layout_key='layout') is not None
+        durations.append(time.perf_counter() - start)
+    assert min(durations) < 0.02
+
+
+def test_full_search_on_1080p_screen_is_fast():
+    icon = make_icon()
+    screen = make_screen(icon, (1500, 80))
+    durations = []
+    for _ in range(3):
+        locator = make_locator(icon)
+        start = time.perf_counter()
+        assert locator.locate('button', screen) is not None
+        durations.append(time.perf_counter() - start)
+    assert min(durations) < 0.02
+
+
+def test_invalidate_forces_full_search():
+    icon = make_icon()
+    locator = make_locator(icon)
+    locator.locate('button', make_screen(icon, (800, 40)), layout_key='layout')
+    locator.invalidate('button')
+    match = locator.locate('button', make_screen(icon, (10, 1000)), layout_key='layout')
+    assert (match.x, match.y) == (10, 1000)
+
+
+def test_locates_template_at_odd_offset():
+    icon = make_icon()
+    locator = make_locator(icon)
+    match = locator.locate('button', make_screen(icon, (1201, 61)))
+    assert (match.x, match.y) == (1201, 61)
+
+
+def test_polling_miss_searches_one_scale_per_lookup(monkeypatch):
+    locator = make_locator(make_icon())
+    screen = make_screen(make_icon(seed=1), (100, 100))
+    calls = []
+    original = cv2.matchTemplate
+
+    def counting_match(image, template, method):
+        calls.append(image.shape)
+        return original(image, template, method)
+
+    monkeypatch.setattr(cv2, 'matchTemplate', counting_match)
+    for _ in range(locator.search_cycle('button', 1)):
+        calls.clear()
+        assert locator.locate('button', screen, max_levels=1) is None
+        # 粗解像度での全体探索1回と、候補周辺の確認1回まで
+        assert len(calls) <= 2
+        assert sum(1 for shape in calls if shape == (540, 960)) == 1
+
+
+def test_polling_miss_is_fast():
+    locator = make_locator(make_icon())
+    screen = make_screen(make_icon(seed=1), (100, 100))
+    durations = []
+    for _ in range(locator.search_cycle('button', 1)):
+        start = time.perf_counter()
+        assert locator.locate('button', screen, max_levels=1) is None
+        durations.append(time.perf_counter() - start)
+    assert sorted(durations)[len(durations) // 2] < 0.02
+
+
+def test_polling_covers_every_scale_within_one_cycle():
+    icon = make_icon()
+    scaled = cv2.resize(icon, None, fx=1.5, fy=1.5, interpolation=cv2.INTER_AREA)
+    locator = make_locator(icon)
+    screen = make_screen(scaled, (300, 500))
+    cycle = locator.search_cycle('button', 1)
+    assert cycle == 6
+    matches = [locator.locate('button', screen, max_levels=1) for _ in range(cycle)]
+    assert any(match is not None and match.scale == 1.5 for match in matches)
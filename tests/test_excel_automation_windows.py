@@ -0,0 +1,187 @@
+import threading
+import time
+
+from utils.excel_automation_windows import ExcelWindowRegistry, FakeWindowBackend, WindowInfo
+
+MAIN = WindowInfo(100, 'Book1 - Excel', 'XLMAIN', True, None)
+
+
+def make_registry(windows=(MAIN,), watch=True):
+    backend = FakeWindowBackend(list(windows), watch=watch)
+    registry = ExcelWindowRegistry(1234, backend=backend, refresh_interval=0.01, resync_interval=60).start()
+    return backend, registry
+
+
+def test_find_main_window():
+    _, registry = make_registry()
+    assert registry.find_main_window() == MAIN
+
+
+def test_hidden_main_window_is_ignored():
+    _, registry = make_registry([MAIN._replace(visible=False)])
+    assert registry.find_main_window() is None
+
+
+def test_events_update_registry_without_enumeration():
+    backend, registry = make_registry()
+    enum_count = backend.enum_count
+
+    backend.add_window(200, '名前を付けて保存', '#32770', owner=100)
+    assert registry.find_dialog('名前を付けて保存').hwnd == 200
+
+    backend.update_window(200, title='Save As')
+    assert registry.find_dialog('名前を付けて保存') is None
+    assert registry.find_dialog(['Save As']).hwnd == 200
+
+    backend.remove_window(200)
+    assert registry.find_dialog('Save As') is None
+    # 通知が利用できる間は再列挙しない
+    assert backend.enum_count == enum_count
+
+
+def test_polling_picks_up_changes_without_events():
+    backend, registry = make_registry(watch=False)
+    backend.windows[300] = WindowInfo(300, 'Microsoft Excel', '#32770', True, 100)
+    found = registry.wait_for(lambda: registry.find_dialog('Microsoft Excel'), timeout=1)
+    assert found.hwnd == 300
+
+
+def test_find_dialogs_excludes_main_window_and_handles():
+    backend, registry = make_registry()
+    backend.add_window(200, 'Microsoft Excel', '#32770')
+    backend.add_window(201, 'Microsoft Excel', '#32770')
+    assert [window.hwnd for window in registry.find_dialogs('Excel')] == [200, 201]
+    assert [window.hwnd for window in registry.find_dialogs('Excel', exclude_handles=[200])] == [201]
+
+
+def test_find_dialogs_orders_by_pattern_priority():
+    backend, registry = make_registry()
+    backend.add_window(200, '確認', '#32770')
+    backend.add_window(201, 'エラー', '#32770')
+    assert [window.hwnd for window in registry.find_dialogs(['エラー', '確認'])] == [201, 200]
+
+
+def test_invalid_regex_falls_back_to_substring():
+    backend, registry = make_registry()
+    backend.add_window(200, 'Book[1] - 保存', '#32770')
+    assert registry.find_dialog('Book[1').hwnd == 200
+
+
+def test_wait_for_times_out():
+    _, registry = make_registry()
+    assert registry.wait_for(lambda: registry.find_dialog('存在しない'), timeout=0.05) is None
+
+
+SAVE_CHANGES = {'title_patterns': ['Microsoft Excel'], 'key_action': 'n'}
+ERROR = {'title_patterns': ['エラー'], 'key_action': '{ENTER}'}
+
+
+def close_on_perform(backend, performed):
+    def perform(config, dialog):
+        performed.append((config['key_action'], dialog.hwnd))
+        backend.remove_window(dialog.hwnd)
+    return perform
+
+
+def test_handle_dialogs_handles_several_dialogs_in_one_pass():
+    backend, registry = make_registry()
+    backend.add_window(200, 'エラー', '#32770', owner=100)
+    backend.add_window(201, 'Microsoft Excel', '#32770', owner=100)
+    performed = []
+
+    start = time.monotonic()
+    result = registry.handle_dialogs([SAVE_CHANGES, ERROR], close_on_perform(backend, performed),
+                                     timeout=5, quiet_period=5, check_interval=0.01, exclude_handles=(100,))
+    assert result.reason == 'handled'
+    assert result.success
+    assert result.handled == [0, 1]
+    assert performed == [('n', 201), ('{ENTER}', 200)]
+    assert time.monotonic() - start < 1
+
+
+def test_handle_dialogs_ends_early_when_quiet():
+    backend, registry = make_registry()
+    threading.Timer(0.05, backend.add_window, (200, 'Microsoft Excel', '#32770', True, 100)).start()
+    performed = []
+
+    start = time.monotonic()
+    result = registry.handle_dialogs([SAVE_CHANGES, ERROR], close_on_perform(backend, performed),
+                                     timeout=5, quiet_period=0.2, check_interval=0.01)
+    assert result.reason == 'quiet'
+    assert result.handled == [0]
+    assert performed == [('n', 200)]
+    assert time.monotonic() - start < 1
+
+
+def test_handle_dialogs_times_out():
+    _, registry = make_registry()
+    start = time.monotonic()
+    result = registry.handle_dialogs([SAVE_CHANGES], lambda config, dialog: None,
+                                     timeout=0.1, quiet_period=5, check_interval=0.01)
+    assert result.reason == 'timeout'
+    assert result.handled == []
+    assert 0.1 <= time.monotonic() - start < 1
+
+
+def test_handle_dialogs_reports_failed_action():
+    backend, registry = make_registry()
+    backend.add_window(200, 'エラー', '#32770', owner=100)
+
+    def fail(config, dialog):
+        raise RuntimeError('送信失敗')
+
+    result = registry.handle_dialogs([ERROR], fail, timeout=1, quiet_period=1, check_interval=0.01)
+    assert result.handled == [0]
+    assert not result.success
+
+
+class RacingBackend(FakeWindowBackend):
+    """列挙の途中で通知が届くバックエンド（列挙結果は通知前のスナップショット）"""
+
+    def __init__(self, windows, during_enum):
+        super().__init__(windows)
+        self.during_enum = during_enum
+
+    def enum_windows(self, pid):
+        snapshot = super().enum_windows(pid)
+        during_enum, self.during_enum = self.during_enum, None
+        if during_enum:
+            during_enum(self)
+        return snapshot
+
+
+def test_snapshot_does_not_undo_events_received_during_enumeration():
+    dialog = WindowInfo(200, 'エラー', '#32770', True, 100)
+    backend = RacingBackend([MAIN, dialog], None)
+    registry = ExcelWindowRegistry(1234, backend=backend, refresh_interval=0.01, resync_interval=60).start()
+
+    def race(backend):
+        backend.remove_window(200)
+        backend.add_window(201, 'Microsoft Excel', '#32770', owner=100)
+
+    backend.during_enum = race
+    registry.refresh(force=True)
+    # 破棄されたウィンドウは復活せず、列挙中に作成されたダイアログは残る
+    assert registry.get(200) is None
+    assert registry.get(201).title == 'Microsoft Excel'
+
+    # 以降の列挙では通常どおり反映される
+    backend.windows.pop(201)
+    registry.refresh(force=True)
+    assert registry.get(201) is None
+
+
+def test_polling_backs_off_while_nothing_changes():
+    backend, registry = make_registry(watch=False)
+    registry.max_refresh_interval = 0.08
+    start_count = backend.enum_count
+    deadline = time.monotonic() + 0.5
+    while time.monotonic() < deadline:
+        registry.find_dialog('存在しない')
+        time.sleep(0.001)
+    # 0.01秒間隔のままなら約50回になる
+    assert backend.enum_count - start_count <= 12
+
+    backend.windows[300] = WindowInfo(300, 'Microsoft Excel', '#32770', True, 100)
+    found = registry.wait_for(lambda: registry.find_dialog('Microsoft Excel'), timeout=0.5)
+    assert found.hwnd == 300
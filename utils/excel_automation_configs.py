@@ -21,18 +21,76 @@ class ExcelConfig:
         'dialog_wait': 1,        # ダイアログ待機時間
         'dialog_check_interval': 0.5, # ダイアログチェック間隔
         'dialog_timeout': 10,    # ダイアログ待機タイムアウト
+        'dialog_quiet_period': 2, # 複数ダイアログ処理でダイアログが表示されないまま終了するまでの時間
+        'open_timeout': 60,      # ワークブックを開く・閉じるまでの待機タイムアウト（大きなファイルの読み込みを含む）
         'ribbon_operation': 1, # リボン操作待機時間
+        'window_registry_refresh': 0.05, # ウィンドウ一覧の差分列挙間隔（通知が使えない場合）
+        'window_registry_refresh_max': 0.5, # 変化がない間に延ばす差分列挙間隔の上限（通知が使えない場合）
+        'window_registry_resync': 1,     # ウィンドウ一覧の再同期間隔（通知使用時）
+        'screen_settle_timeout': 5,      # 画面安定待機のタイムアウト
+        'cell_navigation': 0.1,          # 矢印キーでのセル移動後の待機時間
+    }
+    
+    # 画面安定待機設定（フレーム差分）
+    SCREEN_SETTLE = {
+        'enabled': True,          # 固定待機の代わりに画面安定検出を使用するかどうか
+        'scale': 0.25,            # キャプチャ画像の縮小率
+        'stable_frames': 3,       # 安定とみなす連続した無変化フレーム数
+        'frame_interval': 0.05,   # キャプチャ間隔（秒）
+        'pixel_threshold': 8,     # 変化とみなす画素値の差
+        'change_ratio': 0.001,    # 無変化とみなす変化画素の割合
+        'min_wait': 0.05,         # 操作直後の最小待機時間（秒）
+    }
+    
+    # テンプレートマッチング設定
+    TEMPLATE_MATCHING = {
+        'scales': (0.75, 1.0, 1.25, 1.5),  # テンプレートの拡大率（DPI差の吸収用）
+        'threshold': 0.85,        # 一致とみなす相関値
+        'roi_margin': 64,         # 前回の検出位置周辺を探索する余白（ピクセル）
+        'coarse_scale': 0.5,      # 全体探索時の縮小率
+        'min_size': 8,            # テンプレートの最小サイズ（ピクセル）
+        'levels_per_poll': 1,     # 表示を待機する間の1回の検索で全体探索する拡大率の数（前回検出時の拡大率と交互に探索）
+    }
+    
+    # テキスト入力設定
+    TEXT_INPUT = {
+        'chunk_size': 200,        # 1回のキー送信で送る最大文字数
+        'chars_per_second': 0,    # 入力速度の上限（文字/秒、0の場合は無制限）
+        'key_pause': 0.0,         # send_keys のキー間の待機時間（秒）
+        'paste_threshold': 1000,  # この文字数を超えるテキストはクリップボード経由で入力
+        'use_clipboard': True,    # 日本語・長いテキストをクリップボード経由で入力するかどうか（タブを含むテキストは常にクリップボード経由）
+    }
+    
+    # Excelプロセス監視設定
+    PROCESS_MONITOR = {
+        'sample_interval': 0.2,       # 計測間隔（秒）
+        'idle_cpu_percent': 5,        # アイドルとみなすCPU使用率（%、1コア=100%）
+        'idle_duration': 0.6,         # アイドルとみなすまでの継続時間（秒）
+        'idle_timeout': 30,           # アイドル待機のタイムアウト（秒）
+        'memory_growth_factor': 3.0,  # 起動後最初のアイドル時のメモリ使用量に対する再起動のしきい値（倍）
+        'max_memory_mb': 2048,        # メモリ使用量の上限（MB）
+        'max_handles': 10000,         # ハンドル数の上限
+        'restart_on_threshold': True, # しきい値を超えた場合に保存後にExcelを再起動するかどうか
     }
     
     # Excel関連設定
     EXCEL = {
         'process_name': 'excel.exe',
         'window_title_pattern': r'.*Excel.*',  # Excelウィンドウのタイトルパターン
+        'main_window_class': 'XLMAIN',  # Excelメインウィンドウのクラス名
+    }
+    
+    # ヘルパー内部で待機・処理するダイアログ
+    DIALOGS = {
+        'open': {'title_patterns': ['ファイルを開く', 'Open']},
+        'save_as': {'title_patterns': ['名前を付けて保存', 'Save As']},
+        # バッチ処理でワークブックを閉じたときの「変更を保存しますか?」（N: 保存しない）
+        'save_changes': {'title_patterns': ['Microsoft Excel'], 'key_action': 'n'},
     }
     
     # キーボードショートカット
     SHORTCUTS = {
-        'open_file': '^o',           # Ctrl+O
+        'open_file': '^{F12}',       # Ctrl+F12（Backstageを経由せずに「ファイルを開く」ダイアログを表示）
         'save_file': '^s',           # Ctrl+S
         'save_as': '^+s',            # Ctrl+Shift+S
         'close_workbook': '^w',      # Ctrl+W
@@ -41,6 +99,8 @@ class ExcelConfig:
         'go_to': '^g',               # Ctrl+G
         'insert_row': '^+{+}',       # Ctrl+Shift++
         'delete_row': '^-',          # Ctrl+-
+        'fill_down': '^d',           # Ctrl+D（下方向へコピー）
+        'fill_right': '^r',          # Ctrl+R（右方向へコピー）
     }
     
     # セル参照設定
@@ -50,6 +110,28 @@ class ExcelConfig:
         'max_rows': 1000,
     }
     
+    # セル移動設定
+    CELL_NAVIGATION = {
+        # 矢印キーで移動する最大キー数（超える場合は「ジャンプ」ダイアログを使用）。
+        # 非表示・フィルターで隠れた行列や結合セルがあると矢印キーの移動先がずれるため、既定では使用しない（0）
+        'max_relative_keys': 0,
+        'enter_direction': 'down', # Enterキー押下後の移動方向（Excelのオプション設定に合わせる）
+    }
+    
+    # 連続入力設定
+    FILL = {
+        'min_run': 3,  # 下方向・右方向へのコピーを使用する最小の連続セル数（これ未満は個別に入力）
+    }
+    
+    # メトリクス設定
+    METRICS = {
+        'buckets': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),  # 所要時間ヒストグラムのバケット（秒）
+        'http_port': None,        # Prometheus形式のエンドポイントのポート番号（Noneの場合は無効）
+        'http_host': '127.0.0.1', # エンドポイントの待ち受けアドレス
+        'json_file': None,        # JSONスナップショットの出力先（Noneの場合は無効）
+        'json_interval': 60,      # JSONスナップショットの出力間隔（秒）
+    }
+    
     # ログ設定
     LOGGING = {
         'level': 'DEBUG',
@@ -61,7 +143,13 @@ class ExcelConfig:
     ERROR_HANDLING = {
         'max_retries': 3,
         'retry_delay': 1,
-        'continue_on_error': True,
+        'continue_on_error': True,       # Falseの場合はリトライ後も失敗した操作で ExcelOperationError を送出
+        'backoff_factor': 2,             # リトライごとの待機時間の倍率
+        'max_retry_delay': 10,           # リトライ待機時間の上限（秒）
+        'jitter': 0.1,                   # リトライ待機時間のゆらぎ（±10%）
+        'operation_timeout': 60,         # 1操作（リトライを含む）の期限（秒）
+        'circuit_breaker_threshold': 3,  # この回数連続で操作が失敗したらExcelを再起動
+        'circuit_breaker_cooldown': 30,  # 回復処理（Excelの再起動）を設定していない場合に操作を停止する時間（秒）
     }
     
     @classmethod
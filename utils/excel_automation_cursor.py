@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+アクティブセルの位置モデル
+直前の操作からアクティブセルの位置を追跡し、セル選択に使う最小のキー操作を決定する
+"""
+
+import logging
+from utils.excel_automation_configs import ExcelConfig
+
+logger = logging.getLogger(__name__)
+
+# Enterキー押下後の移動方向（行の増分, 列の増分）
+ENTER_DIRECTIONS = {
+    'down': (1, 0),
+    'right': (0, 1),
+    'up': (-1, 0),
+    'left': (0, -1),
+    'none': (0, 0),
+}
+
+
+class CellCursor:
+    """
+    アクティブセルの位置
+
+    位置が不明な場合（起動直後、リボン操作やダイアログ操作の後など）は None とし、
+    次のセル選択では「ジャンプ」ダイアログを使用する。
+    範囲を選択している場合は、アクティブセルを選択するときに選択範囲を解除する。
+
+    矢印キー・Enterキーによる移動は非表示の行列を飛ばし、結合セルをまとめて移動するため、
+    シートにそれらがない場合にだけ max_relative_keys を 1 以上にして矢印キーでの移動を使う。
+    0 の場合は移動を伴うセル選択にはすべて「ジャンプ」を使い、Enter後の位置も追跡しない
+    """
+
+    def __init__(self, max_relative_keys=None, enter_direction=None):
+        """
+        Args:
+            max_relative_keys (int): 矢印キーで移動する最大キー数（これを超える場合は「ジャンプ」を使用）
+            enter_direction (str): Enterキー押下後の移動方向（Excelのオプション設定に合わせる）
+        """
+        settings = ExcelConfig.CELL_NAVIGATION
+        self.max_relative_keys = max_relative_keys if max_relative_keys is not None else settings['max_relative_keys']
+        self.enter_direction = enter_direction if enter_direction is not None else settings['enter_direction']
+        self.position = None
+        self.range_selected = False  # 複数セルの範囲を選択しているかどうか
+
+    def invalidate(self):
+        """位置を不明にする"""
+        self.position = None
+        self.range_selected = False
+
+    def moved_to(self, row, column, range_selected=False):
+        """
+        指定セルへ移動したことを記録
+
+        Args:
+            row (int): アクティブセルの行番号（0から開始）
+            column (int): アクティブセルの列番号（0から開始）
+            range_selected (bool): アクティブセルを含む範囲を選択したかどうか
+        """
+        self.position = (row, column)
+        self.range_selected = range_selected
+
+    def after_enter(self):
+        """入力確定（Enter）による移動を記録"""
+        if self.position is None:
+            return
+        if self.range_selected or self.max_relative_keys <= 0:
+            # 範囲選択中のEnterは選択範囲内を移動し、非表示の行列も飛ばすため、
+            # 矢印キーでの移動を使わない場合は位置を追跡しない
+            self.invalidate()
+            return
+        row_step, column_step = ENTER_DIRECTIONS[self.enter_direction]
+        row = self.position[0] + row_step
+        column = self.position[1] + column_step
+        if row < 0 or column < 0:
+            # シートの端では移動しない
+            return
+        self.position = (row, column)
+
+    def plan(self, row, column):
+        """
+        指定セルへ移動するためのキー操作を決定
+
+        Args:
+            row (int): 行番号（0から開始）
+            column (int): 列番号（0から開始）
+
+        Returns:
+            str: 送信するキー（移動不要の場合は空文字列、「ジャンプ」を使うべき場合はNone）
+        """
+        if self.position is None:
+            return None
+        if self.range_selected and (row, column) == self.position:
+            # Shift+Backspace でアクティブセルだけを残して選択範囲を解除
+            # （矢印キーで移動する場合は選択範囲も解除される）
+            return '+{BACKSPACE}'
+
+        row_delta = row - self.position[0]
+        column_delta = column - self.position[1]
+        if abs(row_delta) + abs(column_delta) > self.max_relative_keys:
+            return None
+
+        keys = ''
+        if row_delta:
+            keys += '{%s %d}' % ('DOWN' if row_delta > 0 else 'UP', abs(row_delta))
+        if column_delta:
+            keys += '{%s %d}' % ('RIGHT' if column_delta > 0 else 'LEFT', abs(column_delta))
+        return keys
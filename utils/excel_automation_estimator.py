@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+実行時間の見積もり
+ヘルパー操作の列（計画、または記録用スタブで実行したスクリプトの記録）から、ExcelConfig.TIMING の
+待機時間とタイムアウトに基づいて実行時間を見積もり、どのタイミング設定が支配的かを示す
+
+待機の種類ごとの見積もり方
+- 固定待機、画面安定検出で早く終わる待機: 設定値（上限）
+- Excelの起動（ウィンドウの表示待機）: window_wait（上限）
+- ダイアログ・ファイルを開いた後のタイトル表示の待機: 待機対象がすぐに表示されるものとして0秒
+  （dialog_found=False の場合はタイムアウトまで）
+- 起動後・保存後のアイドル待機: 最短時間（PROCESS_MONITOR の idle_duration + sample_interval）
+
+動的な待機を上限と最短で見積もる部分が混在するため、実際の実行時間の上限ではない。
+保存・再計算に時間がかかるワークブックではアイドル待機の分だけ長くなる
+"""
+
+import logging
+from collections import namedtuple
+from utils.excel_automation_configs import ExcelConfig
+from utils.excel_automation_cursor import CellCursor
+from utils.excel_automation_fill import plan_fill
+from utils.excel_automation_sync import plan_sync
+
+logger = logging.getLogger(__name__)
+
+# ヘルパー操作の呼び出し
+OperationCall = namedtuple('OperationCall', ['name', 'args', 'kwargs'])
+
+# 操作ごとの見積もり（cost はタイミング設定キー -> 回数、fixed_seconds はタイミング設定によらない時間）
+OperationEstimate = namedtuple('OperationEstimate', ['index', 'call', 'cost', 'fixed_seconds', 'seconds'])
+
+
+class RecordingExcelHelper:
+    """
+    ExcelAutomationHelper の代わりに使用する記録用スタブ
+
+    Excelを操作せずに呼び出されたメソッドと引数を記録する。スクリプトに ExcelAutomationHelper の
+    代わりに渡して実行すると、見積もり用の操作列が得られる
+    """
+
+    def __init__(self, dialog_found=True):
+        """
+        Args:
+            dialog_found (bool): wait_for_dialog / is_dialog_present でダイアログが見つかったものとして扱うかどうか
+        """
+        self.calls = []
+        self.dialog_found = dialog_found
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            self.calls.append(OperationCall(name, args, kwargs))
+            if name in ('wait_for_dialog', 'is_dialog_present'):
+                return self.dialog_found, None
+            if name == 'wait_any':
+                return (0, None) if self.dialog_found else (None, None)
+            if name == 'locate_image':
+                return (0, 0)
+            return True
+
+        return record
+
+
+def record_script(script, dialog_found=True):
+    """
+    スクリプトを記録用スタブで実行し、操作列を取得
+
+    Args:
+        script (callable): ヘルパーを引数に取る関数（例: lambda excel: excel.select_cell(0, 0)）
+        dialog_found (bool): ダイアログ待機でダイアログが見つかったものとして扱うかどうか
+
+    Returns:
+        list: OperationCall のリスト
+    """
+    recorder = RecordingExcelHelper(dialog_found=dialog_found)
+    script(recorder)
+    return recorder.calls
+
+
+def _arg(call, position, name, default=None):
+    """呼び出しの引数を位置・名前から取得"""
+    if name in call.kwargs:
+        return call.kwargs[name]
+    if len(call.args) > position:
+        return call.args[position]
+    return default
+
+
+class CostModel:
+    """
+    ヘルパー操作の実行時間モデル
+
+    各操作の時間を「タイミング設定キーごとの待機回数」と「固定時間」で表すため、
+    タイミング設定を変更した場合の見積もりも線形に計算できる
+    """
+
+    def __init__(self, timing=None, dialog_found=True, activation_per_operation=True):
+        """
+        Args:
+            timing (dict): タイミング設定（Noneの場合は ExcelConfig.TIMING）
+            dialog_found (bool): ダイアログ待機・ファイルを開いた後のタイトル待機で、待機対象が表示されるものとして
+                見積もるかどうか（Falseの場合は待機がタイムアウトするものとして見積もる）
+            activation_per_operation (bool): 各操作の前のウィンドウアクティベート待機を含めるかどうか
+        """
+        self.timing = dict(ExcelConfig.TIMING if timing is None else timing)
+        self.dialog_found = dialog_found
+        self.activation_per_operation = activation_per_operation
+        self.cursor = CellCursor()
+
+    def operation_cost(self, call):
+        """
+        1つの操作の待機回数と固定時間
+
+        Args:
+            call (OperationCall): 操作の呼び出し
+
+        Returns:
+            tuple: (タイミング設定キー -> 回数 の辞書, 固定時間（秒）)
+        """
+        handler = getattr(self, f'_cost_{call.name}', None)
+        if handler is None:
+            return {}, 0.0
+        cost = {}
+        fixed = handler(call, cost) or 0.0
+        return cost, fixed
+
+    def _add(self, cost, key, count=1):
+        cost[key] = cost.get(key, 0) + count
+
+    def _activate(self, cost):
+        if self.activation_per_operation:
+            self._add(cost, 'window_activation')
+
+    def _typing_seconds(self, text):
+        cps = ExcelConfig.TEXT_INPUT['chars_per_second']
+        return len(text) / cps if cps else 0.0
+
+    def _idle_seconds(self):
+        """アイドル待機の最短時間"""
+        settings = ExcelConfig.PROCESS_MONITOR
+        return settings['idle_duration'] + settings['sample_interval']
+
+    def _cost_start_excel(self, call, cost):
+        self.cursor.invalidate()
+        # ウィンドウの表示は動的に待機するため、上限の window_wait で見積もる
+        self._add(cost, 'window_wait')
+        return self._idle_seconds()
+
+    def _cost_open_file(self, call, cost):
+        self.cursor.invalidate()
+        self._activate(cost)
+        self._add(cost, 'file_operation', 2)
+        self._add(cost, 'text_input')
+        fixed = self._typing_seconds(str(_arg(call, 0, 'file_path', '')))
+        if not self.dialog_found:
+            # タイトルにファイル名が表示されないままタイムアウト
+            self._add(cost, 'open_timeout')
+        return fixed
+
+    def _cost_save_file(self, call, cost):
+        self._activate(cost)
+        file_path = _arg(call, 0, 'file_path')
+        fixed = 0.0
+        if file_path:
+            if not self.dialog_found:
+                # 「名前を付けて保存」ダイアログが表示されずに失敗
+                return self._dialog_timeout(call, None)
+            self._add(cost, 'text_input')
+            fixed += self._typing_seconds(str(file_path))
+        self._add(cost, 'file_operation')
+        return fixed + self._idle_seconds()
+
+    def _cost_select_cell(self, call, cost):
+        self._activate(cost)
+        row, column = _arg(call, 0, 'row', 0), _arg(call, 1, 'column', 0)
+        keys = self.cursor.plan(row, column)
+        if keys is None:
+            self._add(cost, 'cell_selection', 3)
+        elif keys:
+            self._add(cost, 'cell_navigation')
+        self.cursor.moved_to(row, column)
+
+    def _cost_input_text(self, call, cost):
+        self._activate(cost)
+        self._add(cost, 'text_input')
+        self.cursor.after_enter()
+        return self._typing_seconds(str(_arg(call, 0, 'text', '')))
+
+    def _cost_select_range(self, call, cost):
+        self._activate(cost)
+        self._add(cost, 'cell_selection', 3)
+        start_row, start_column = _arg(call, 0, 'start_row', 0), _arg(call, 1, 'start_column', 0)
+        end_row, end_column = _arg(call, 2, 'end_row', 0), _arg(call, 3, 'end_column', 0)
+        self.cursor.moved_to(start_row, start_column,
+                             range_selected=(start_row, start_column) != (end_row, end_column))
+        return self._typing_seconds(ExcelConfig.get_range_address(start_row, start_column, end_row, end_column))
+
+    def _cost_fill_range(self, call, cost):
+        fixed = self._cost_select_range(call, cost)
+        self._add(cost, 'text_input')
+        return fixed
+
+    def _cost_input_block(self, call, cost):
+        steps = plan_fill(_arg(call, 2, 'values', []), _arg(call, 0, 'start_row', 0),
+                          _arg(call, 1, 'start_column', 0), min_run=_arg(call, 3, 'min_run'))
+        fixed = 0.0
+        for step in steps:
+            if step.kind == 'input':
+                fixed += self._cost_select_cell(OperationCall('select_cell', (step.top, step.left), {}), cost) or 0.0
+                fixed += self._cost_input_text(OperationCall('input_text', (step.text,), {}), cost)
+            else:
+                fixed += self._cost_fill_range(
+                    OperationCall('fill_range', (step.top, step.left, step.bottom, step.right), {}), cost)
+        return fixed
+
+    def _cost_clear_range(self, call, cost):
+        start_row, start_column = _arg(call, 0, 'start_row', 0), _arg(call, 1, 'start_column', 0)
+        if (start_row, start_column) == (_arg(call, 2, 'end_row', 0), _arg(call, 3, 'end_column', 0)):
+            fixed = self._cost_select_cell(OperationCall('select_cell', (start_row, start_column), {}), cost)
+        else:
+            fixed = self._cost_select_range(call, cost)
+        self._add(cost, 'text_input')
+        return fixed
+
+    def _cost_sync_sheet(self, call, cost):
+        # ワークブックが指定されていない場合はすべてのセルを入力するものとして見積もる
+        plan = plan_sync(_arg(call, 4, 'file_path') or '', _arg(call, 0, 'values', []),
+                         _arg(call, 1, 'start_row', 0), _arg(call, 2, 'start_column', 0),
+                         sheet_name=_arg(call, 3, 'sheet_name'))
+        fixed = 0.0
+        for sync_range in plan.ranges:
+            if sync_range.kind == 'write':
+                fixed += self._cost_input_block(
+                    OperationCall('input_block', (sync_range.top, sync_range.left, sync_range.values), {}), cost)
+            else:
+                fixed += self._cost_clear_range(OperationCall(
+                    'clear_range', (sync_range.top, sync_range.left, sync_range.bottom, sync_range.right), {}),
+                    cost) or 0.0
+        return fixed
+
+    def _cost_click_ribbon_shortcut(self, call, cost):
+        self.cursor.invalidate()
+        self._activate(cost)
+        self._add(cost, 'text_input')
+        shortcut_key = str(_arg(call, 0, 'shortcut_key', ''))
+        self._add(cost, 'ribbon_operation', len(shortcut_key.split('>')) if '>' in shortcut_key else 2)
+
+    def _cost_click_image(self, call, cost):
+        self.cursor.invalidate()
+        self._activate(cost)
+        self._add(cost, 'ribbon_operation')
+
+    def _cost_close_dialog(self, call, cost):
+        self._activate(cost)
+        self._add(cost, 'dialog_wait')
+
+    def _cost_close_workbook(self, call, cost):
+        self.cursor.invalidate()
+        self._activate(cost)
+        self._add(cost, 'file_operation')
+
+    def _dialog_timeout(self, call, position):
+        timeout = _arg(call, position, 'timeout') if position is not None else None
+        if timeout is None:
+            timeout = self.timing.get('dialog_timeout', 10)
+        return timeout
+
+    def _cost_wait_for_dialog(self, call, cost):
+        if not self.dialog_found:
+            return self._dialog_timeout(call, 1)
+
+    def _cost_handle_dialog(self, call, cost):
+        if not self.dialog_found:
+            timeout = _arg(call, 2, 'timeout', 10)
+            return timeout
+        self.cursor.invalidate()
+        self._add(cost, 'dialog_wait', 2)
+
+    def _cost_wait_and_handle_dialogs(self, call, cost):
+        if self.dialog_found:
+            self.cursor.invalidate()
+            self._add(cost, 'dialog_wait', 2 * len(_arg(call, 0, 'dialog_configs', [])))
+        else:
+            quiet_period = _arg(call, 2, 'quiet_period')
+            if quiet_period is not None:
+                return quiet_period
+            self._add(cost, 'dialog_quiet_period')
+
+    def _cost_wait_any(self, call, cost):
+        if not self.dialog_found:
+            return self._dialog_timeout(call, 1)
+
+
+class Estimate:
+    """実行時間の見積もり結果"""
+
+    def __init__(self, operations, timing):
+        self.operations = operations
+        self.timing = timing
+
+    @property
+    def total_seconds(self):
+        """見積もり合計時間（秒）"""
+        return sum(operation.seconds for operation in self.operations)
+
+    def seconds_by_key(self):
+        """
+        タイミング設定キーごとの合計時間（大きい順）
+
+        Returns:
+            list: (キー, 合計時間, 待機回数) のリスト
+        """
+        counts = {}
+        for operation in self.operations:
+            for key, count in operation.cost.items():
+                counts[key] = counts.get(key, 0) + count
+        rows = [(key, count * self.timing.get(key, 1.0), count) for key, count in counts.items()]
+        fixed = sum(operation.fixed_seconds for operation in self.operations)
+        if fixed:
+            rows.append(('(タイムアウト・入力時間)', fixed, None))
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def seconds_by_operation(self):
+        """
+        操作名ごとの合計時間（大きい順）
+
+        Returns:
+            list: (操作名, 合計時間, 呼び出し回数) のリスト
+        """
+        totals = {}
+        for operation in self.operations:
+            seconds, calls = totals.get(operation.call.name, (0.0, 0))
+            totals[operation.call.name] = (seconds + operation.seconds, calls + 1)
+        rows = [(name, seconds, calls) for name, (seconds, calls) in totals.items()]
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def saving(self, key, new_value):
+        """
+        タイミング設定を変更した場合の短縮時間
+
+        Args:
+            key (str): タイミング設定キー
+            new_value (float): 変更後の値（秒）
+
+        Returns:
+            float: 短縮される時間（秒）（増える場合は負の値）
+        """
+        count = sum(operation.cost.get(key, 0) for operation in self.operations)
+        return count * (self.timing.get(key, 1.0) - new_value)
+
+    def report(self, top=None):
+        """
+        見積もりのレポートを作成
+
+        Args:
+            top (int): 表示するタイミング設定の数（Noneの場合はすべて）
+
+        Returns:
+            str: レポートのテキスト
+        """
+        lines = [f"見積もり合計: {self.total_seconds:.1f}秒（{len(self.operations)}操作）", "", "操作別:"]
+        for name, seconds, calls in self.seconds_by_operation():
+            lines.append(f"  {name:<28} {seconds:8.1f}秒  ({calls}回)")
+        lines += ["", "タイミング設定別（値を半分にした場合の短縮時間）:"]
+        for key, seconds, count in self.seconds_by_key()[:top]:
+            if count is None:
+                lines.append(f"  {key:<28} {seconds:8.1f}秒")
+                continue
+            half_saving = self.saving(key, self.timing.get(key, 1.0) / 2)
+            lines.append(f"  {key:<28} {seconds:8.1f}秒  ({count}回 × {self.timing.get(key, 1.0)}秒, "
+                         f"半分で -{half_saving:.1f}秒)")
+        return '\n'.join(lines)
+
+
+def estimate(calls, timing=None, dialog_found=True):
+    """
+    操作列の実行時間を見積もる
+
+    Args:
+        calls (list): OperationCall のリスト、または (操作名, 引数タプル[, キーワード引数辞書]) のリスト
+        timing (dict): タイミング設定（Noneの場合は ExcelConfig.TIMING）
+        dialog_found (bool): ダイアログ待機でダイアログが表示されるものとして見積もるかどうか
+
+    Returns:
+        Estimate: 見積もり結果
+    """
+    model = CostModel(timing=timing, dialog_found=dialog_found)
+    operations = []
+    for index, call in enumerate(calls):
+        if not isinstance(call, OperationCall):
+            name, args = call[0], tuple(call[1]) if len(call) > 1 else ()
+            call = OperationCall(name, args, dict(call[2]) if len(call) > 2 else {})
+        cost, fixed = model.operation_cost(call)
+        seconds = fixed + sum(count * model.timing.get(key, 1.0) for key, count in cost.items())
+        operations.append(OperationEstimate(index, call, cost, fixed, seconds))
+    return Estimate(operations, model.timing)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+連続入力のパターン検出
+入力ブロック内で、相対参照をずらしただけの同じ数式や同じ値が縦・横に続く範囲を検出し、
+先頭セルの入力と「下方向へコピー」（Ctrl+D）/「右方向へコピー」（Ctrl+R）による入力計画を作成する
+"""
+
+import re
+import logging
+from collections import namedtuple
+from utils.excel_automation_configs import ExcelConfig
+
+logger = logging.getLogger(__name__)
+
+# 入力計画の手順
+#   kind が 'input' の場合は (top, left) のセルに text を入力
+#   kind が 'fill_down' / 'fill_right' の場合は (top, left)-(bottom, right) の範囲を選択してコピー
+FillStep = namedtuple('FillStep', ['kind', 'top', 'left', 'bottom', 'right', 'text'])
+
+# A1形式のセル参照・列全体の参照（A:A）・行全体の参照（1:1）
+# （前後が英数字・ドット以外の位置に限定し、関数名（LOG10( など）は除外）。
+# 1つのパターンで置換するため、置換後の文字列が再度置換されることはない
+_CELL_REFERENCE_PATTERN = re.compile(
+    r'(?<![A-Za-z0-9_.])(?:'
+    r'(?P<first_column_absolute>\$?)(?P<first_column>[A-Za-z]{1,3}):(?P<last_column_absolute>\$?)(?P<last_column>[A-Za-z]{1,3})'
+    r'|(?P<first_row_absolute>\$?)(?P<first_row>[0-9]+):(?P<last_row_absolute>\$?)(?P<last_row>[0-9]+)'
+    r'|(?P<column_absolute>\$?)(?P<column>[A-Za-z]{1,3})(?P<row_absolute>\$?)(?P<row>[0-9]+)'
+    r')(?![A-Za-z0-9_(])'
+)
+
+
+def _column_index(letters):
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + (ord(letter) - 64)
+    return index - 1
+
+
+def normalize_formula(formula, row, column):
+    """
+    数式のセル参照を入力セルからの相対位置に変換（R1C1形式に相当）
+
+    相対参照をずらしただけの数式（例: A2 の =A1*2 と A3 の =A2*2）は同じ文字列になる。
+    列全体（A:A）・行全体（1:1）の参照も列・行の相対位置に変換する。文字列リテラル内は変換しない
+
+    Args:
+        formula (str): 数式（= で始まる文字列）
+        row (int): 入力セルの行番号（0から開始）
+        column (int): 入力セルの列番号（0から開始）
+
+    Returns:
+        str: 正規化した数式
+    """
+    def column_part(absolute, letters):
+        return f"C{_column_index(letters)}" if absolute else f"C[{_column_index(letters) - column}]"
+
+    def row_part(absolute, digits):
+        return f"R{int(digits) - 1}" if absolute else f"R[{int(digits) - 1 - row}]"
+
+    def replace(match):
+        groups = match.groupdict()
+        if groups['first_column'] is not None:
+            return (column_part(groups['first_column_absolute'], groups['first_column']) + ':'
+                    + column_part(groups['last_column_absolute'], groups['last_column']))
+        if groups['first_row'] is not None:
+            return (row_part(groups['first_row_absolute'], groups['first_row']) + ':'
+                    + row_part(groups['last_row_absolute'], groups['last_row']))
+        return (row_part(groups['row_absolute'], groups['row'])
+                + column_part(groups['column_absolute'], groups['column']))
+
+    # 二重引用符で分割すると、偶数番目が文字列リテラルの外側になる
+    parts = formula.split('"')
+    for index in range(0, len(parts), 2):
+        parts[index] = _CELL_REFERENCE_PATTERN.sub(replace, parts[index].upper())
+    return '"'.join(parts)
+
+
+def pattern_key(value, row, column):
+    """
+    セルの値を比較用のキーに変換（空セルはNone）
+
+    数式は相対参照を正規化し、それ以外の値はそのまま比較する
+    """
+    if value is None:
+        return None
+    text = str(value)
+    if text == '':
+        return None
+    if text.startswith('='):
+        return ('formula', normalize_formula(text, row, column))
+    return ('value', text)
+
+
+def _runs(keys, min_run):
+    """同じキーが連続する区間 (開始, 終了) を返す（空セル・min_run 未満の区間は除く）"""
+    runs = []
+    start = 0
+    length = len(keys)
+    while start < length:
+        end = start
+        while end + 1 < length and keys[end + 1] is not None and keys[end + 1] == keys[start]:
+            end += 1
+        if keys[start] is not None and end - start + 1 >= min_run:
+            runs.append((start, end))
+        start = end + 1
+    return runs
+
+
+def plan_fill(values, start_row=0, start_column=0, min_run=None):
+    """
+    入力ブロックの入力計画を作成
+
+    1. 列ごとに同じパターンが縦に続く区間を検出し、同じ行範囲の隣接列はまとめて「下方向へコピー」
+    2. 残りのセルについて行ごとに横に続く区間を検出し、「右方向へコピー」
+    3. どのパターンにも当てはまらないセルは個別に入力
+
+    各セルのキーは1回だけ計算するため、セル数に対して線形時間で処理する
+
+    Args:
+        values (list): 入力値の2次元リスト（values[行][列]、None または空文字列のセルは入力しない）
+        start_row (int): ブロック左上の行番号（0から開始）
+        start_column (int): ブロック左上の列番号（0から開始）
+        min_run (int): コピーを使用する最小の連続セル数（Noneの場合は設定ファイルの値を使用）
+
+    Returns:
+        list: FillStep のリスト（個別入力を行優先順に並べ、その後にコピー操作を並べる）
+    """
+    if min_run is None:
+        min_run = ExcelConfig.FILL['min_run']
+    min_run = max(2, min_run)
+
+    height = len(values)
+    width = max((len(row) for row in values), default=0)
+    keys = [
+        [pattern_key(row_values[column] if column < len(row_values) else None,
+                     start_row + row, start_column + column)
+         for column in range(width)]
+        for row, row_values in enumerate(values)
+    ]
+    covered = [[False] * width for _ in range(height)]
+    inputs = []
+    fills = []
+
+    # 縦方向の連続（同じ行範囲の隣接列はまとめる）
+    column_runs = {}
+    for column in range(width):
+        for top, bottom in _runs([keys[row][column] for row in range(height)], min_run):
+            column_runs.setdefault((top, bottom), []).append(column)
+    for (top, bottom), columns in column_runs.items():
+        group_start = columns[0]
+        for index, column in enumerate(columns):
+            is_last = index + 1 == len(columns) or columns[index + 1] != column + 1
+            for row in range(top, bottom + 1):
+                covered[row][column] = True
+            inputs.append((top, column))
+            if is_last:
+                fills.append(FillStep('fill_down', start_row + top, start_column + group_start,
+                                      start_row + bottom, start_column + column, None))
+                if index + 1 < len(columns):
+                    group_start = columns[index + 1]
+
+    # 横方向の連続（縦方向で使用済みのセルは除く）
+    for row in range(height):
+        row_keys = [None if covered[row][column] else keys[row][column] for column in range(width)]
+        for left, right in _runs(row_keys, min_run):
+            for column in range(left, right + 1):
+                covered[row][column] = True
+            inputs.append((row, left))
+            fills.append(FillStep('fill_right', start_row + row, start_column + left,
+                                  start_row + row, start_column + right, None))
+
+    # 個別入力
+    for row in range(height):
+        for column in range(width):
+            if not covered[row][column] and keys[row][column] is not None:
+                inputs.append((row, column))
+
+    inputs.sort()
+    steps = [
+        FillStep('input', start_row + row, start_column + column,
+                 start_row + row, start_column + column, str(values[row][column]))
+        for row, column in inputs
+    ]
+    return steps + fills
@@ -3,9 +3,18 @@ import os
 import winreg
 from pywinauto.application import Application
 from pywinauto.keyboard import send_keys
-from pywinauto.findwindows import find_window, find_windows
 import logging
 from utils.excel_automation_configs import ExcelConfig
+from utils.excel_automation_windows import ExcelWindowRegistry
+from utils.excel_automation_screen import ScreenSettleDetector, WindowCaptureSource
+from utils.excel_automation_vision import TemplateLocator, match_center
+from utils.excel_automation_text import TextInputEngine
+from utils.excel_automation_cursor import CellCursor
+from utils.excel_automation_fill import plan_fill
+from utils.excel_automation_sync import plan_sync
+from utils.excel_automation_retry import RetryEngine, CircuitBreaker, NonRetryableError, retry_operation
+from utils.excel_automation_process import ExcelProcessMonitor, PsutilProcessSource
+from utils.excel_automation_metrics import MetricsRegistry
 
 # ログファイルのクリーンアップ（スクリプト実行ごと）
 def cleanup_log_file():
@@ -62,6 +71,19 @@ class ExcelAutomationHelper:
         self.excel_window = None
         self.workbook = None
         self.copied_files = []  # コピーしたファイルのパスを記録
+        self.window_registry = None  # Excelプロセスのウィンドウレジストリ
+        self.capture_source = None  # 画面キャプチャソース（Noneの場合はウィンドウ領域をキャプチャ）
+        self.template_locator = TemplateLocator()  # UI要素検出用のテンプレート（事前計算済み）
+        self.text_engine = TextInputEngine()  # テキスト入力エンジン（エスケープ・分割送信・速度制限）
+        self.cursor = CellCursor()  # アクティブセルの位置（不明な場合は「ジャンプ」で移動）
+        self.source_file = None  # start_excel()で指定された元のファイル（再起動時に使用）
+        self.working_file = None  # Excelで開いているファイル（コピー先、名前を付けて保存した場合は保存先）
+        self.process_monitor = None  # Excelプロセスの監視（CPU・メモリ・ハンドル数）
+        # 操作の回数・所要時間などのメトリクス
+        self.metrics = MetricsRegistry()
+        self._start_metrics_export()
+        # リトライポリシー（連続失敗時はExcelを再起動）
+        self.retry_engine = RetryEngine(breaker=CircuitBreaker(on_trip=self._recycle_excel), metrics=self.metrics)
         
     def wait_for_excel_window(self, timeout=None, check_interval=None):
         """
@@ -69,38 +91,65 @@ class ExcelAutomationHelper:
         
         Args:
             timeout (float): 最大待機時間（秒）（Noneの場合は設定ファイルの値を使用）
-            check_interval (float): チェック間隔（秒）（Noneの場合は設定ファイルの値を使用）
+            check_interval (float): チェック間隔（秒）（Noneの場合はウィンドウレジストリの更新間隔を使用）
             
         Returns:
             bool: ウィンドウが見つかったかどうか
         """
         if timeout is None:
             timeout = ExcelConfig.get_timing('window_wait', 10)
-        if check_interval is None:
-            check_interval = 0.5
+        timeout = self.retry_engine.clamp(timeout)
             
         logger.info(f"Excelウィンドウの表示を待機中... (タイムアウト: {timeout}秒)")
         
-        process_name = ExcelConfig.get_excel_setting('process_name')
-        elapsed_time = 0
-        
-        while elapsed_time < timeout:
-             try:
-                 window_handle = find_window(process=process_name)
-                 if window_handle:
-                     self.excel_window = self.app.window(handle=window_handle)
-                     # ウィンドウが実際に表示されているかチェック
-                     if self.excel_window.is_visible():
-                         logger.info(f"Excelウィンドウを検出しました（{elapsed_time:.1f}秒後）")
-                         # ウィンドウが検出されたら、すぐに返す（追加の待機なし）
-                         return True
-             except Exception as e:
-                 logger.debug(f"ウィンドウ検索中（{elapsed_time:.1f}秒）: {e}")
-             
-             time.sleep(check_interval)
-             elapsed_time += check_interval
-        
-        return False
+        registry = self._get_window_registry()
+        if registry is None:
+            return False
+        
+        start_time = time.time()
+        window = registry.wait_for(registry.find_main_window, timeout, check_interval)
+        if window is None:
+            self._record_wait_timeout('excel_window')
+            return False
+        
+        try:
+            self.excel_window = self.app.window(handle=window.hwnd)
+        except Exception as e:
+            logger.debug(f"ウィンドウオブジェクト取得エラー: {e}")
+            return False
+        logger.info(f"Excelウィンドウを検出しました（{time.time() - start_time:.1f}秒後）")
+        return True
+    
+    def _get_window_registry(self):
+        """Excelプロセスのウィンドウレジストリを取得（未作成の場合は作成）"""
+        if self.window_registry is not None:
+            return self.window_registry
+        if not self.app:
+            logger.warning("Excelアプリケーションが初期化されていません")
+            return None
+        try:
+            self.window_registry = ExcelWindowRegistry(self.app.process).start()
+        except Exception as e:
+            logger.error(f"ウィンドウレジストリの作成に失敗: {e}")
+            return None
+        return self.window_registry
+    
+    def _main_window_handles(self):
+        """ダイアログ検索から除外するメインウィンドウのハンドル"""
+        try:
+            if self.excel_window:
+                return (self.excel_window.handle,)
+        except Exception as e:
+            logger.debug(f"メインウィンドウハンドル取得エラー: {e}")
+        return ()
+    
+    def _wrap_window(self, window):
+        """ウィンドウ情報をpywinautoのウィンドウオブジェクトに変換"""
+        try:
+            return self.app.window(handle=window.hwnd)
+        except Exception as e:
+            logger.debug(f"ウィンドウオブジェクト取得エラー: {e}")
+            return None
     
     def wait_for_dialog(self, title_patterns, timeout=None, check_interval=None):
         """
@@ -124,42 +173,30 @@ class ExcelAutomationHelper:
                 timeout = ExcelConfig.get_timing('dialog_timeout', 10)
             if check_interval is None:
                 check_interval = ExcelConfig.get_timing('dialog_check_interval', 0.5)
+            timeout = self.retry_engine.clamp(timeout)
             
             logger.info(f"ダイアログの表示を待機中... (タイムアウト: {timeout}秒, パターン: {title_patterns})")
             
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                try:
-                    # 各タイトルパターンでダイアログを検索
-                    for pattern in title_patterns:
-                        try:
-                            dialog_window = find_window(title_re=f".*{pattern}.*")
-                            if dialog_window:
-                                logger.info(f"ダイアログを検出しました: {pattern}")
-                                return True, dialog_window
-                        except Exception as e:
-                            logger.debug(f"ダイアログ検索エラー（パターン: {pattern}）: {e}")
-                            continue
-                    
-                    # より汎用的な検索（Excel関連のダイアログ）
-                    try:
-                        excel_dialogs = find_windows(title_re=".*Microsoft Excel.*")
-                        for dialog in excel_dialogs:
-                            dialog_title = dialog.window_text()
-                            logger.debug(f"検出されたダイアログ: {dialog_title}")
-                            if any(pattern.lower() in dialog_title.lower() for pattern in title_patterns):
-                                logger.info(f"ダイアログを検出しました: {dialog_title}")
-                                return True, dialog
-                    except Exception as e:
-                        logger.debug(f"汎用ダイアログ検索エラー: {e}")
-                    
-                    time.sleep(check_interval)
-                    
-                except Exception as e:
-                    logger.debug(f"ダイアログ待機中のエラー: {e}")
-                    time.sleep(check_interval)
+            registry = self._get_window_registry()
+            if registry is None:
+                return False, None
+            
+            start_time = time.perf_counter()
+            exclude_handles = self._main_window_handles()
+            dialog = registry.wait_for(
+                lambda: registry.find_dialog(title_patterns, exclude_handles),
+                timeout,
+                check_interval
+            )
+            self._record_wait_seconds('dialog', time.perf_counter() - start_time)
+            if dialog:
+                logger.info(f"ダイアログを検出しました: {dialog.title}")
+                self._record_dialog_wait('hit')
+                return True, self._wrap_window(dialog)
             
             logger.warning(f"ダイアログの表示待機がタイムアウトしました (パターン: {title_patterns})")
+            self._record_dialog_wait('miss')
+            self._record_wait_timeout('dialog')
             return False, None
             
         except Exception as e:
@@ -177,39 +214,15 @@ class ExcelAutomationHelper:
             tuple: (ダイアログが表示されているかどうか, ダイアログウィンドウオブジェクト)
         """
         try:
-            # タイトルパターンをリストに統一
-            if isinstance(title_patterns, str):
-                title_patterns = [title_patterns]
-            
-            # 各タイトルパターンでダイアログを検索
-            for pattern in title_patterns:
-                try:
-                    dialog_window = find_window(title_re=f".*{pattern}.*")
-                    if dialog_window:
-                        logger.info(f"ダイアログが表示されています: {pattern}")
-                        return True, dialog_window
-                except Exception as e:
-                    logger.debug(f"ダイアログ検索エラー（パターン: {pattern}）: {e}")
-                    continue
+            registry = self._get_window_registry()
+            if registry is None:
+                return False, None
             
-            # より汎用的な検索（メインのExcelウィンドウを除外）
-            try:
-                excel_dialogs = find_windows(title_re=".*Microsoft Excel.*")
-                
-                for dialog in excel_dialogs:
-                    dialog_title = dialog.window_text()
-                    
-                    # メインのExcelウィンドウを除外（通常はファイル名を含む）
-                    if self.excel_window and dialog.handle == self.excel_window.handle:
-                        continue
-                    
-                    # パターンマッチングをチェック
-                    if any(pattern.lower() in dialog_title.lower() for pattern in title_patterns):
-                        logger.info(f"ダイアログが表示されています: {dialog_title}")
-                        return True, dialog
-                        
-            except Exception as e:
-                logger.debug(f"汎用ダイアログ検索エラー: {e}")
+            # メインのExcelウィンドウを除外して検索
+            dialog = registry.find_dialog(title_patterns, self._main_window_handles())
+            if dialog:
+                logger.info(f"ダイアログが表示されています: {dialog.title}")
+                return True, self._wrap_window(dialog)
             
             return False, None
             
@@ -217,6 +230,7 @@ class ExcelAutomationHelper:
             logger.error(f"ダイアログ存在確認エラー: {e}")
             return False, None
     
+    @retry_operation("ダイアログ処理")
     def handle_dialog(self, title_patterns, key_action='{ESC}', timeout=10):
         """
         ダイアログを処理する（表示を待機してから適切なアクションを実行）
@@ -237,67 +251,140 @@ class ExcelAutomationHelper:
                 logger.info(f"ダイアログは表示されませんでした (パターン: {title_patterns})")
                 return True  # ダイアログが表示されない場合は成功とみなす
             
-            # アクションを実行
-            logger.info(f"ダイアログでアクション '{key_action}' を実行")
-            
-            # ダイアログをアクティブにする
-            try:
-                if dialog_window:
-                    dialog_window.set_focus()
-                    time.sleep(ExcelConfig.get_timing('dialog_wait', 0.2))
-            except Exception as e:
-                logger.debug(f"ダイアログアクティベートエラー: {e}")
-            
-            # ダイアログが完全に表示されるまで少し待機
-            time.sleep(ExcelConfig.get_timing('dialog_wait'))
-            
-            # アクションに応じたキーを送信
-            send_keys(key_action)
-            
-            time.sleep(ExcelConfig.get_timing('dialog_wait', 0.2))
-            logger.info(f"ダイアログの処理が完了しました")
+            self._perform_dialog_action(dialog_window, key_action)
             return True
                 
         except Exception as e:
             logger.error(f"ダイアログ処理エラー: {e}")
             return False
     
-    def wait_and_handle_dialogs(self, dialog_configs, timeout=10):
+    def _perform_dialog_action(self, dialog_window, key_action):
+        """ダイアログをアクティブにしてキー操作を実行"""
+        logger.info(f"ダイアログでアクション '{key_action}' を実行")
+        
+        dialog_handle = None
+        
+        # ダイアログをアクティブにする
+        try:
+            if dialog_window:
+                dialog_handle = dialog_window.handle
+                dialog_window.set_focus()
+        except Exception as e:
+            logger.debug(f"ダイアログアクティベートエラー: {e}")
+        
+        # ダイアログが完全に表示されるまで待機
+        self._wait_for_screen('dialog_wait', dialog_handle)
+        
+        # アクションに応じたキーを送信（アクティブセルが移動する可能性があるため位置を破棄）
+        self.cursor.invalidate()
+        send_keys(key_action)
+        
+        self._wait_for_screen('dialog_wait')
+        logger.info(f"ダイアログの処理が完了しました")
+    
+    def wait_any(self, dialog_configs, timeout=None, check_interval=None, exclude_handles=()):
         """
-        複数のダイアログ設定を順次チェックして処理
+        複数のダイアログ設定を同時に監視し、最初に表示されたダイアログを返す
         
         Args:
             dialog_configs (list): ダイアログ設定のリスト
                 [{'title_patterns': ['パターン1', 'パターン2'], 'key_action': '{ESC}'}, ...]
-            timeout (float): 各ダイアログの待機時間（秒）
+            timeout (float): 最大待機時間（秒）（Noneの場合は設定ファイルの値を使用）
+            check_interval (float): チェック間隔（秒）（Noneの場合は設定ファイルの値を使用）
+            exclude_handles (iterable): 検索から除外するウィンドウハンドル（処理済みのダイアログなど）
+            
+        Returns:
+            tuple: (表示されたダイアログ設定のインデックス, ダイアログのウィンドウ情報)（タイムアウトの場合は (None, None)）
+        """
+        try:
+            if timeout is None:
+                timeout = ExcelConfig.get_timing('dialog_timeout', 10)
+            if check_interval is None:
+                check_interval = ExcelConfig.get_timing('dialog_check_interval', 0.5)
+            timeout = self.retry_engine.clamp(timeout)
+            
+            registry = self._get_window_registry()
+            if registry is None:
+                return None, None
+            
+            exclude_handles = tuple(exclude_handles) + self._main_window_handles()
+            
+            start_time = time.perf_counter()
+            found = registry.wait_for(lambda: registry.find_any_dialog(dialog_configs, exclude_handles),
+                                      timeout, check_interval)
+            self._record_wait_seconds('dialog_any', time.perf_counter() - start_time)
+            if found:
+                logger.info(f"ダイアログを検出しました: {found[1].title}")
+                self._record_dialog_wait('hit')
+                return found
+            self._record_dialog_wait('miss')
+            self._record_wait_timeout('dialog_any')
+            return None, None
+            
+        except Exception as e:
+            logger.error(f"ダイアログ待機エラー: {e}")
+            return None, None
+    
+    def wait_and_handle_dialogs(self, dialog_configs, timeout=10, quiet_period=None):
+        """
+        複数のダイアログ設定を同時に監視し、表示された順に処理
+        
+        すべての設定のダイアログを処理した時点、または最後の処理（開始時）から quiet_period 秒間
+        どのダイアログも表示されなかった時点で終了する
+        
+        Args:
+            dialog_configs (list): ダイアログ設定のリスト
+                [{'title_patterns': ['パターン1', 'パターン2'], 'key_action': '{ESC}'}, ...]
+            timeout (float): 全体の最大待機時間（秒）
+            quiet_period (float): ダイアログが表示されないまま終了するまでの時間（秒）（Noneの場合は設定ファイルの値を使用）
             
         Returns:
             bool: すべての処理が成功したかどうか
         """
+        start_time = time.perf_counter()
         try:
-            success = True
-            for config in dialog_configs:
-                title_patterns = config.get('title_patterns', [])
-                key_action = config.get('key_action', '')
-                
-                # ダイアログの表示を待機してから処理
-                if not self.handle_dialog(title_patterns, key_action, timeout):
-                    success = False
-                    logger.warning(f"ダイアログの処理に失敗しました (パターン: {title_patterns})")
+            if quiet_period is None:
+                quiet_period = ExcelConfig.get_timing('dialog_quiet_period', 2)
+            
+            registry = self._get_window_registry()
+            if registry is None:
+                self._record_operation('wait_and_handle_dialogs', False, time.perf_counter() - start_time)
+                return False
+            
+            def perform(config, dialog):
+                logger.info(f"ダイアログを検出しました: {dialog.title}")
+                self._perform_dialog_action(self._wrap_window(dialog), config.get('key_action', ''))
+            
+            result = registry.handle_dialogs(
+                dialog_configs, perform, self.retry_engine.clamp(timeout), quiet_period,
+                check_interval=ExcelConfig.get_timing('dialog_check_interval', 0.5),
+                exclude_handles=self._main_window_handles()
+            )
+            
+            self._record_wait_seconds('dialog_any', result.wait_seconds)
+            for _ in result.handled:
+                self._record_dialog_wait('hit')
+            if result.reason == 'timeout':
+                # 全体の期限切れだけをタイムアウトとして記録（quiet_period が過ぎた場合は正常な終了）
+                self._record_dialog_wait('miss')
+                self._record_wait_timeout('dialog_any')
+            for index, config in enumerate(dialog_configs):
+                if index not in result.handled:
+                    logger.info(f"ダイアログは表示されませんでした (パターン: {config.get('title_patterns', [])})")
             
-            return success
+            self._record_operation('wait_and_handle_dialogs', result.success, time.perf_counter() - start_time)
+            return result.success
             
         except Exception as e:
             logger.error(f"複数ダイアログ処理エラー: {e}")
+            self._record_operation('wait_and_handle_dialogs', False, time.perf_counter() - start_time)
             return False
 
-    def activate_excel_window(self, max_retries=3, retry_delay=1.0):
+    @retry_operation("Excelウィンドウのアクティベート")
+    def activate_excel_window(self):
         """
         Excelウィンドウをアクティベートする汎用的なメソッド
-        
-        Args:
-            max_retries (int): 最大リトライ回数（デフォルト: 3）
-            retry_delay (float): リトライ間隔（秒）（デフォルト: 1.0）
+        （リトライは ExcelConfig.ERROR_HANDLING のリトライポリシーに従う）
             
         Returns:
             bool: アクティベートに成功したかどうか
@@ -307,96 +394,71 @@ class ExcelAutomationHelper:
                 logger.warning("Excelアプリケーションまたはウィンドウが初期化されていません")
                 return False
             
-            for attempt in range(max_retries):
-                try:
-                    logger.info(f"Excelウィンドウのアクティベートを試行中... (試行 {attempt + 1}/{max_retries})")
-                    
-                    # 方法1: pywinautoのset_focus()を使用
-                    try:
-                        self.excel_window.set_focus()
-                        time.sleep(ExcelConfig.get_timing('window_activation'))
-                        logger.info("pywinautoのset_focus()でExcelウィンドウをアクティベートしました")
-                        return True
-                    except Exception as e:
-                        logger.debug(f"set_focus()でのアクティベートに失敗: {e}")
-                    
-                    # 方法2: ウィンドウハンドルを使用してアクティベート
-                    try:
-                        import win32gui
-                        import win32con
-                        
-                        # ウィンドウハンドルを取得
-                        hwnd = self.excel_window.handle
-                        if hwnd:
-                            # ウィンドウを前面に表示
-                            win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                            time.sleep(ExcelConfig.get_timing('window_activation'))
-                            
-                            # ウィンドウをアクティブにする
-                            win32gui.SetForegroundWindow(hwnd)
-                            time.sleep(ExcelConfig.get_timing('window_activation'))
-                            
-                            logger.info("win32guiを使用してExcelウィンドウをアクティベートしました")
-                            return True
-                    except Exception as e:
-                        logger.debug(f"win32guiでのアクティベートに失敗: {e}")
-                    
-                    # 方法3: Alt+Tabを使用してExcelウィンドウに切り替え
-                    try:
-                        # Alt+Tabでウィンドウを切り替え
-                        send_keys('%{TAB}')
-                        time.sleep(ExcelConfig.get_timing('window_activation'))
-                        
-                        # さらに確実にするため、Altキーを押してリリース
-                        send_keys('%')
-                        time.sleep(ExcelConfig.get_timing('window_activation'))
-                        
-                        logger.info("Alt+Tabを使用してExcelウィンドウをアクティベートしました")
-                        return True
-                    except Exception as e:
-                        logger.debug(f"Alt+Tabでのアクティベートに失敗: {e}")
-                    
-                    # 方法4: ウィンドウタイトルで検索してアクティベート
-                    try:
-                        import win32gui
-                        import win32con
-                        
-                        def enum_windows_callback(hwnd, target_process):
-                            if win32gui.IsWindowVisible(hwnd):
-                                try:
-                                    import win32process
-                                    _, process_id = win32process.GetWindowThreadProcessId(hwnd)
-                                    import psutil
-                                    process = psutil.Process(process_id)
-                                    if process.name().lower() == target_process.lower():
-                                        win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                                        time.sleep(ExcelConfig.get_timing('window_activation'))
-                                        win32gui.SetForegroundWindow(hwnd)
-                                        time.sleep(ExcelConfig.get_timing('window_activation'))
-                                        return False  # 列挙を停止
-                                except Exception as e:
-                                    logger.debug(f"プロセス情報取得エラー: {e}")
-                            return True
-                        
-                        # Excelプロセスでウィンドウを検索してアクティベート
-                        process_name = ExcelConfig.get_excel_setting('process_name')
-                        win32gui.EnumWindows(enum_windows_callback, process_name)
-                        logger.info("プロセス名検索でExcelウィンドウをアクティベートしました")
-                        return True
-                    except Exception as e:
-                        logger.debug(f"ウィンドウタイトル検索でのアクティベートに失敗: {e}")
+            logger.info("Excelウィンドウのアクティベートを試行中...")
+            
+            # 方法1: pywinautoのset_focus()を使用
+            try:
+                self.excel_window.set_focus()
+                time.sleep(ExcelConfig.get_timing('window_activation'))
+                logger.info("pywinautoのset_focus()でExcelウィンドウをアクティベートしました")
+                return True
+            except Exception as e:
+                logger.debug(f"set_focus()でのアクティベートに失敗: {e}")
+            
+            # 方法2: ウィンドウハンドルを使用してアクティベート
+            try:
+                import win32gui
+                import win32con
+                
+                # ウィンドウハンドルを取得
+                hwnd = self.excel_window.handle
+                if hwnd:
+                    # ウィンドウを前面に表示
+                    win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+                    time.sleep(ExcelConfig.get_timing('window_activation'))
                     
-                    # リトライ前の待機
-                    if attempt < max_retries - 1:
-                        logger.info(f"アクティベートに失敗しました。{retry_delay}秒後にリトライします...")
-                        time.sleep(retry_delay)
+                    # ウィンドウをアクティブにする
+                    win32gui.SetForegroundWindow(hwnd)
+                    time.sleep(ExcelConfig.get_timing('window_activation'))
                     
-                except Exception as e:
-                    logger.debug(f"アクティベート試行 {attempt + 1} でエラー: {e}")
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay)
+                    logger.info("win32guiを使用してExcelウィンドウをアクティベートしました")
+                    return True
+            except Exception as e:
+                logger.debug(f"win32guiでのアクティベートに失敗: {e}")
             
-            logger.warning(f"Excelウィンドウのアクティベートに失敗しました（{max_retries}回試行）")
+            # 方法3: Alt+Tabを使用してExcelウィンドウに切り替え
+            try:
+                # Alt+Tabでウィンドウを切り替え
+                send_keys('%{TAB}')
+                time.sleep(ExcelConfig.get_timing('window_activation'))
+                
+                # さらに確実にするため、Altキーを押してリリース
+                send_keys('%')
+                time.sleep(ExcelConfig.get_timing('window_activation'))
+                
+                logger.info("Alt+Tabを使用してExcelウィンドウをアクティベートしました")
+                return True
+            except Exception as e:
+                logger.debug(f"Alt+Tabでのアクティベートに失敗: {e}")
+            
+            # 方法4: ウィンドウレジストリからメインウィンドウを検索してアクティベート
+            try:
+                import win32gui
+                import win32con
+                
+                registry = self._get_window_registry()
+                window = registry.find_main_window() if registry else None
+                if window:
+                    win32gui.ShowWindow(window.hwnd, win32con.SW_RESTORE)
+                    time.sleep(ExcelConfig.get_timing('window_activation'))
+                    win32gui.SetForegroundWindow(window.hwnd)
+                    time.sleep(ExcelConfig.get_timing('window_activation'))
+                    logger.info("ウィンドウレジストリの検索でExcelウィンドウをアクティベートしました")
+                    return True
+            except Exception as e:
+                logger.debug(f"ウィンドウレジストリ検索でのアクティベートに失敗: {e}")
+            
+            logger.warning("Excelウィンドウのアクティベートに失敗しました")
             return False
             
         except Exception as e:
@@ -425,14 +487,88 @@ class ExcelAutomationHelper:
             logger.error(f"Excelウィンドウアクティベート確認エラー: {e}")
             return False
 
-    def start_excel(self, file_path=None):
-        """Excelを起動し、指定されたファイルを開く"""
+    def _create_settle_detector(self, hwnd=None):
+        """画面安定検出器を作成（hwndがNoneの場合はExcelメインウィンドウを対象とする）"""
+        source = self.capture_source
+        if source is None:
+            source = WindowCaptureSource(lambda: hwnd or self.excel_window.handle)
+        return ScreenSettleDetector(source)
+    
+    def wait_until_settled(self, timeout=None, hwnd=None):
+        """
+        画面描画が安定するまで待機
+        
+        Args:
+            timeout (float): 最大待機時間（秒）（Noneの場合は設定ファイルの値を使用）
+            hwnd (int): キャプチャ対象のウィンドウハンドル（Noneの場合はExcelメインウィンドウ）
+            
+        Returns:
+            bool: タイムアウト前に画面が安定したかどうか
+        """
+        if timeout is None:
+            timeout = ExcelConfig.get_timing('screen_settle_timeout', 5)
+        timeout = self.retry_engine.clamp(timeout)
         try:
+            start_time = time.time()
+            settled = self._create_settle_detector(hwnd).wait_until_settled(timeout)
+            if settled:
+                logger.debug(f"画面が安定しました（{time.time() - start_time:.2f}秒後）")
+            else:
+                logger.warning(f"画面安定待機がタイムアウトしました (タイムアウト: {timeout}秒)")
+                self._record_wait_timeout('screen_settle')
+            return settled
+        except Exception as e:
+            logger.debug(f"画面安定待機エラー: {e}")
+            return False
+    
+    def _wait_for_screen(self, timing_key, hwnd=None, require_change=False):
+        """
+        操作後の待機（画面が安定した時点で終了し、設定ファイルの待機時間を上限とする）
+        
+        Args:
+            timing_key (str): 上限とするタイミング設定のキー
+            hwnd (int): キャプチャ対象のウィンドウハンドル（Noneの場合はExcelメインウィンドウ）
+            require_change (bool): 画面の変化を検出してから安定を判定するかどうか
+                （メニュー・KeyTipsなど、操作の結果が遅れて表示される場合に使用）
+        """
+        wait_time = self.retry_engine.clamp(ExcelConfig.get_timing(timing_key))
+        if not ExcelConfig.SCREEN_SETTLE['enabled']:
+            time.sleep(wait_time)
+            return
+        
+        start_time = time.monotonic()
+        try:
+            time.sleep(min(ExcelConfig.SCREEN_SETTLE['min_wait'], wait_time))
+            remaining = wait_time - (time.monotonic() - start_time)
+            if remaining > 0:
+                if not self._create_settle_detector(hwnd).wait_until_settled(remaining, require_change):
+                    self._record_wait_timeout('screen_settle')
+        except Exception as e:
+            # キャプチャできない場合は固定待機にフォールバック
+            logger.debug(f"画面安定検出に失敗、固定待機を使用: {e}")
+            time.sleep(max(0, wait_time - (time.monotonic() - start_time)))
+    
+    @retry_operation("Excel起動")
+    def start_excel(self, file_path=None, copy_to_trusted=True):
+        """
+        Excelを起動し、指定されたファイルを開く
+        
+        Args:
+            file_path (str): 開くファイルのパス
+            copy_to_trusted (bool): ファイルを信頼できる場所（デスクトップ）にコピーしてから開くかどうか
+                （Falseの場合は指定されたファイルをそのまま開く。再起動時に作業ファイルを開き直す場合に使用）
+        """
+        try:
+            self.cursor.invalidate()
+            
             # 起動前に復旧ファイルを削除
             self._cleanup_recovery_files()
             
-            # ファイルが指定されている場合、信頼できる場所にコピー
-            if file_path and os.path.exists(file_path):
+            # ファイルが指定されている場合、信頼できる場所にコピー（コピー済みの作業ファイルはそのまま開く）
+            copy_to_trusted = copy_to_trusted and file_path not in self.copied_files
+            if copy_to_trusted:
+                self.source_file = file_path
+            if file_path and os.path.exists(file_path) and copy_to_trusted:
                 # デスクトップにコピーして保護ビューを回避
                 import shutil
                 desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
@@ -470,8 +606,8 @@ class ExcelAutomationHelper:
                     continue
             
             if valid_excel_path is None:
-                logger.error("Excelが見つかりません。Excelがインストールされているか確認してください。")
-                return False
+                # インストールされていない場合はリトライしても見つからないため、Excelの再起動も行わない
+                raise NonRetryableError("Excelが見つかりません。Excelがインストールされているか確認してください。")
             
             # Excelを起動
             if file_path and os.path.exists(file_path):
@@ -484,6 +620,10 @@ class ExcelAutomationHelper:
                 self.app = Application().start(valid_excel_path)
                 logger.info("新しいExcelを起動しました")
             
+            # 起動したプロセスのウィンドウレジストリを作成
+            self._stop_window_registry()
+            self._get_window_registry()
+            
             # Excelウィンドウが表示されるまで動的に待機
             if not self.wait_for_excel_window():
                 logger.warning("プロセス名でのウィンドウ検索に失敗、タイトルパターンを使用")
@@ -498,34 +638,74 @@ class ExcelAutomationHelper:
             
             # ウィンドウが既に検出されているため、追加の待機は不要
             logger.info("Excelウィンドウの準備が完了しました")
+            self.working_file = file_path
+            
+            # プロセス監視を開始（ワークブックの読み込みが終わってアイドル状態になった時点のメモリ使用量を基準とする）
+            try:
+                self.process_monitor = ExcelProcessMonitor(PsutilProcessSource(self.app.process))
+            except Exception as e:
+                self.process_monitor = None
+                logger.debug(f"プロセス監視の開始に失敗（無視可能）: {e}")
+            self.wait_until_idle()
             
             return True
             
+        except NonRetryableError:
+            raise
         except Exception as e:
             logger.error(f"Excel起動エラー: {e}")
             logger.error("詳細なエラー情報:")
             import traceback
             traceback.print_exc()
+            # リトライに備えて起動途中のExcelを終了
+            try:
+                if self.app:
+                    self.app.kill()
+            except Exception as kill_error:
+                logger.debug(f"起動途中のExcel終了エラー（無視可能）: {kill_error}")
+            self._stop_window_registry()
             return False
     
+    @retry_operation("ファイルを開く", idempotent=False)
     def open_file(self, file_path):
-        """ファイルを開く"""
+        """
+        ファイルを開く
+        
+        すでに開いている場合は何もしない。前回の「ファイルを開く」ダイアログが残っている場合は
+        入力が重複しないよう失敗とする
+        """
         try:
+            self.cursor.invalidate()
+            
+            registry = self._get_window_registry()
+            if registry is not None:
+                if self._find_workbook_window(registry, file_path):
+                    logger.info(f"ファイルはすでに開いています: {file_path}")
+                    return True
+                if registry.find_dialog(ExcelConfig.DIALOGS['open']['title_patterns'], self._main_window_handles()):
+                    logger.error(f"「ファイルを開く」ダイアログが表示されたままのため、ファイルを開けません: {file_path}")
+                    return False
+            
             # Excelウィンドウをアクティベート
             self.ensure_excel_active("ファイルを開く")
             
-            # Ctrl+O でファイルを開く
+            # Ctrl+F12 で「ファイルを開く」ダイアログを表示
             send_keys(ExcelConfig.get_shortcut('open_file'))
             time.sleep(ExcelConfig.get_timing('file_operation'))
             
             # ファイルパスを入力
-            send_keys(file_path)
+            self.text_engine.type_text(file_path)
             time.sleep(ExcelConfig.get_timing('text_input'))
             
             # Enter で開く
             send_keys('{ENTER}')
             time.sleep(ExcelConfig.get_timing('file_operation'))
             
+            # ウィンドウタイトルにファイル名が表示されるまで待機
+            if not self._wait_for_workbook_title(file_path):
+                logger.error(f"ファイルを開いたことを確認できませんでした: {file_path}")
+                return False
+            
             logger.info(f"ファイルを開きました: {file_path}")
             return True
             
@@ -533,6 +713,84 @@ class ExcelAutomationHelper:
             logger.error(f"ファイルを開くエラー: {e}")
             return False
     
+    @staticmethod
+    def _find_workbook_window(registry, file_path):
+        """タイトルに指定ファイル名が表示されているExcelメインウィンドウ（見つからない場合はNone）"""
+        # 拡張子が非表示の場合もあるため、拡張子を除いたファイル名で比較
+        workbook_name = os.path.splitext(os.path.basename(file_path))[0].lower()
+        window = registry.find_main_window()
+        if window and workbook_name in window.title.lower():
+            return window
+        return None
+    
+    def _wait_for_workbook_title(self, file_path, timeout=None):
+        """
+        Excelメインウィンドウのタイトルに指定ファイル名が表示されるまで待機
+        
+        Args:
+            file_path (str): 開いたファイルのパス
+            timeout (float): 最大待機時間（秒）（Noneの場合は設定ファイルの値を使用）
+            
+        Returns:
+            bool: タイトルにファイル名が表示されたかどうか
+        """
+        if timeout is None:
+            timeout = ExcelConfig.get_timing('open_timeout', 60)
+        timeout = self.retry_engine.clamp(timeout)
+        registry = self._get_window_registry()
+        if registry is None:
+            return False
+        
+        if registry.wait_for(lambda: self._find_workbook_window(registry, file_path), timeout) is None:
+            self._record_wait_timeout('workbook_open')
+            return False
+        return True
+    
+    def _wait_for_workbook_closed(self, file_path, dialog_configs=(), timeout=None):
+        """
+        ワークブックを閉じる操作の後、ウィンドウタイトルから指定ファイル名が消えるまで待機
+        （待機中に表示されたダイアログ（保存確認など）は設定に従って処理する）
+        
+        Args:
+            file_path (str): 閉じたファイルのパス
+            dialog_configs (list): 待機中に処理するダイアログ設定（wait_and_handle_dialogs()の形式）
+            timeout (float): 最大待機時間（秒）（Noneの場合は設定ファイルの値を使用）
+            
+        Returns:
+            bool: ワークブックが閉じたかどうか
+        """
+        if timeout is None:
+            timeout = ExcelConfig.get_timing('open_timeout', 60)
+        deadline = time.monotonic() + self.retry_engine.clamp(timeout)
+        registry = self._get_window_registry()
+        if registry is None:
+            return False
+        
+        pending = list(dialog_configs)
+        handled_handles = list(self._main_window_handles())
+        
+        def find_progress():
+            if self._find_workbook_window(registry, file_path) is None:
+                return 'closed', None
+            return registry.find_any_dialog(pending, handled_handles)
+        
+        while True:
+            found = registry.wait_for(find_progress, max(0.0, deadline - time.monotonic()),
+                                      ExcelConfig.get_timing('dialog_check_interval', 0.5))
+            if found is None:
+                self._record_wait_timeout('workbook_close')
+                return False
+            index, dialog = found
+            if index == 'closed':
+                return True
+            config = pending.pop(index)
+            handled_handles.append(dialog.hwnd)
+            try:
+                self._perform_dialog_action(self._wrap_window(dialog), config.get('key_action', ''))
+            except Exception as e:
+                logger.warning(f"ダイアログの処理に失敗しました (パターン: {config.get('title_patterns', [])}): {e}")
+    
+    @retry_operation("ファイル保存")
     def save_file(self, file_path=None):
         """ファイルを保存"""
         try:
@@ -542,69 +800,309 @@ class ExcelAutomationHelper:
             if file_path:
                 # Ctrl+Shift+S で名前を付けて保存
                 send_keys(ExcelConfig.get_shortcut('save_as'))
-                time.sleep(ExcelConfig.get_timing('file_operation'))
-                send_keys(file_path)
-                time.sleep(ExcelConfig.get_timing('text_input'))
+                # ダイアログの表示前に入力するとシートに入力されるため、ダイアログの表示を待機
+                dialog_found, _ = self.wait_for_dialog(ExcelConfig.DIALOGS['save_as']['title_patterns'])
+                if not dialog_found:
+                    logger.error("「名前を付けて保存」ダイアログが表示されませんでした")
+                    return False
+                self.text_engine.type_text(file_path)
+                self._wait_for_screen('text_input')
                 send_keys('{ENTER}')
+                self.working_file = file_path
             else:
                 # Ctrl+S で保存
                 send_keys(ExcelConfig.get_shortcut('save_file'))
             
-            time.sleep(ExcelConfig.get_timing('file_operation'))
+            self._wait_for_screen('file_operation')
+            # 保存処理（再計算を含む）が終わるまで待機
+            self.wait_until_idle()
             logger.info("ファイルを保存しました")
+            
+            # 保存済みの状態でメモリ肥大化を確認し、必要に応じてExcelを再起動
+            self.check_process_health()
             return True
             
         except Exception as e:
             logger.error(f"ファイル保存エラー: {e}")
             return False
     
+    @retry_operation("セル選択")
     def select_cell(self, row, column):
-        """セルを選択"""
+        """
+        セルを選択
+        
+        現在のアクティブセルの位置が分かっていて近い場合は矢印キーで移動し、
+        位置が不明または遠い場合は「ジャンプ」ダイアログ（Ctrl+G）で移動する
+        
+        Args:
+            row (int): 行番号（0から開始）
+            column (int): 列番号（0から開始）
+            
+        Returns:
+            bool: 選択に成功したかどうか
+        """
+        # 範囲外のセル番号は ValueError（リトライしない）
+        cell_address = ExcelConfig.get_cell_address(row, column)
         try:
             # Excelウィンドウをアクティベート
             self.ensure_excel_active("セル選択")
             
-            # セルに移動
-            cell_address = ExcelConfig.get_cell_address(row, column)
-            send_keys(ExcelConfig.get_shortcut('go_to'))  # Ctrl+G でジャンプ
-            time.sleep(ExcelConfig.get_timing('cell_selection'))
-            send_keys(cell_address)
-            time.sleep(ExcelConfig.get_timing('cell_selection'))
-            send_keys('{ENTER}')
-            time.sleep(ExcelConfig.get_timing('cell_selection'))
+            keys = self.cursor.plan(row, column)
+            if keys is None:
+                # 「ジャンプ」ダイアログでセルに移動
+                send_keys(ExcelConfig.get_shortcut('go_to'))  # Ctrl+G でジャンプ
+                time.sleep(ExcelConfig.get_timing('cell_selection'))
+                send_keys(cell_address)
+                time.sleep(ExcelConfig.get_timing('cell_selection'))
+                send_keys('{ENTER}')
+                time.sleep(ExcelConfig.get_timing('cell_selection'))
+            elif keys:
+                # 矢印キーで相対移動（範囲選択中のアクティブセルの場合は選択範囲を解除）
+                send_keys(keys)
+                time.sleep(ExcelConfig.get_timing('cell_navigation'))
+            self.cursor.moved_to(row, column)
             
             logger.info(f"セル {cell_address} を選択しました")
             return True
             
         except Exception as e:
+            self.cursor.invalidate()
             logger.error(f"セル選択エラー: {e}")
             return False
     
+    @retry_operation("テキスト入力", idempotent=False)
     def input_text(self, text):
-        """テキストを入力"""
+        """
+        テキストを入力
+        
+        send_keys の特殊文字（+ ^ % ~ ( ) { }）はエスケープして入力し、改行はセル内改行として入力する。
+        日本語・BMP外の文字・長いテキストはクリップボード経由で入力する
+        
+        Args:
+            text (str): 入力するテキスト（数式も可）
+            
+        Returns:
+            bool: 入力に成功したかどうか
+        """
         try:
             # Excelウィンドウをアクティベート
             self.ensure_excel_active("テキスト入力")
             
-            send_keys(text)
+            # クリップボード経由の場合はBackspaceでセルをクリアして編集モードに入ってから貼り付ける
+            method = self.text_engine.type_text(text, paste_prefix='{BACKSPACE}')
             time.sleep(ExcelConfig.get_timing('text_input'))
             send_keys('{ENTER}')
-            logger.info(f"テキストを入力しました: {text}")
+            self.cursor.after_enter()
+            preview = text if len(text) <= 100 else f"{text[:100]}...（{len(text)}文字）"
+            logger.info(f"テキストを入力しました（{method}）: {preview}")
             return True
             
         except Exception as e:
+            self.cursor.invalidate()
             logger.error(f"テキスト入力エラー: {e}")
+            # リトライに備えて入力途中の編集を取り消す
+            try:
+                send_keys('{ESC}')
+            except Exception as cancel_error:
+                logger.debug(f"入力取り消しエラー（無視可能）: {cancel_error}")
+            return False
+
+    @retry_operation("範囲選択")
+    def select_range(self, start_row, start_column, end_row, end_column):
+        """
+        セル範囲を選択（「ジャンプ」ダイアログを使用）
+        
+        Args:
+            start_row (int): 左上の行番号（0から開始）
+            start_column (int): 左上の列番号（0から開始）
+            end_row (int): 右下の行番号（0から開始）
+            end_column (int): 右下の列番号（0から開始）
+            
+        Returns:
+            bool: 選択に成功したかどうか
+        """
+        range_address = ExcelConfig.get_range_address(start_row, start_column, end_row, end_column)
+        try:
+            # Excelウィンドウをアクティベート
+            self.ensure_excel_active("範囲選択")
+            
+            send_keys(ExcelConfig.get_shortcut('go_to'))  # Ctrl+G でジャンプ
+            time.sleep(ExcelConfig.get_timing('cell_selection'))
+            send_keys(range_address)
+            time.sleep(ExcelConfig.get_timing('cell_selection'))
+            send_keys('{ENTER}')
+            time.sleep(ExcelConfig.get_timing('cell_selection'))
+            # 範囲選択後のアクティブセルは左上のセル
+            self.cursor.moved_to(start_row, start_column,
+                                 range_selected=(start_row, start_column) != (end_row, end_column))
+            
+            logger.info(f"範囲 {range_address} を選択しました")
+            return True
+            
+        except Exception as e:
+            self.cursor.invalidate()
+            logger.error(f"範囲選択エラー: {e}")
+            return False
+
+    @retry_operation("連続入力", idempotent=False)
+    def fill_range(self, start_row, start_column, end_row, end_column, direction='down'):
+        """
+        範囲の先頭行（先頭列）の内容を範囲全体にコピー
+        
+        Args:
+            start_row (int): 左上の行番号（0から開始）
+            start_column (int): 左上の列番号（0から開始）
+            end_row (int): 右下の行番号（0から開始）
+            end_column (int): 右下の列番号（0から開始）
+            direction (str): 'down' の場合は下方向へコピー（Ctrl+D）、'right' の場合は右方向へコピー（Ctrl+R）
+            
+        Returns:
+            bool: コピーに成功したかどうか
+        """
+        if direction not in ('down', 'right'):
+            raise ValueError(f"コピーの方向が不正です: {direction}")
+        range_address = ExcelConfig.get_range_address(start_row, start_column, end_row, end_column)
+        try:
+            if not self.select_range(start_row, start_column, end_row, end_column):
+                return False
+            send_keys(ExcelConfig.get_shortcut(f'fill_{direction}'))
+            time.sleep(ExcelConfig.get_timing('text_input'))
+            
+            logger.info(f"{range_address} に"
+                        f"{'下' if direction == 'down' else '右'}方向へコピーしました")
+            return True
+            
+        except Exception as e:
+            self.cursor.invalidate()
+            logger.error(f"連続入力エラー: {e}")
+            return False
+
+    def input_block(self, start_row, start_column, values, min_run=None):
+        """
+        2次元の値（数式を含む）をまとめて入力
+        
+        相対参照をずらしただけの同じ数式や同じ値が縦・横に続く範囲は、先頭セルだけを入力して
+        下方向・右方向へのコピー（Ctrl+D / Ctrl+R）で入力する。それ以外のセルは個別に入力する
+        
+        Args:
+            start_row (int): 左上の行番号（0から開始）
+            start_column (int): 左上の列番号（0から開始）
+            values (list): 入力値の2次元リスト（values[行][列]、None または空文字列のセルは入力しない）
+            min_run (int): コピーを使用する最小の連続セル数（Noneの場合は設定ファイルの値を使用）
+            
+        Returns:
+            bool: すべての入力に成功したかどうか
+        """
+        start_time = time.perf_counter()
+        steps = plan_fill(values, start_row, start_column, min_run=min_run)
+        fills = sum(1 for step in steps if step.kind != 'input')
+        logger.info(f"まとめて入力します: 個別入力 {len(steps) - fills}セル, コピー {fills}範囲")
+        
+        success = True
+        for step in steps:
+            if step.kind == 'input':
+                result = self.select_cell(step.top, step.left) and self.input_text(step.text)
+            else:
+                result = self.fill_range(step.top, step.left, step.bottom, step.right,
+                                         direction='down' if step.kind == 'fill_down' else 'right')
+            success = success and result is not False
+        self._record_operation('input_block', success, time.perf_counter() - start_time)
+        return success
+
+    @retry_operation("範囲の削除")
+    def clear_range(self, start_row, start_column, end_row, end_column):
+        """
+        セル範囲の内容を削除（Deleteキー）
+        
+        Args:
+            start_row (int): 左上の行番号（0から開始）
+            start_column (int): 左上の列番号（0から開始）
+            end_row (int): 右下の行番号（0から開始）
+            end_column (int): 右下の列番号（0から開始）
+            
+        Returns:
+            bool: 削除に成功したかどうか
+        """
+        range_address = ExcelConfig.get_range_address(start_row, start_column, end_row, end_column)
+        try:
+            # 単一セルは矢印キーで移動できる場合があるため select_cell を使用
+            if (start_row, start_column) == (end_row, end_column):
+                selected = self.select_cell(start_row, start_column)
+            else:
+                selected = self.select_range(start_row, start_column, end_row, end_column)
+            if not selected:
+                return False
+            send_keys('{DELETE}')
+            time.sleep(ExcelConfig.get_timing('text_input'))
+            
+            logger.info(f"{range_address} の内容を削除しました")
+            return True
+            
+        except Exception as e:
+            self.cursor.invalidate()
+            logger.error(f"範囲の削除エラー: {e}")
             return False
 
+    def sync_sheet(self, values, start_row=0, start_column=0, sheet_name=None, file_path=None):
+        """
+        保存済みのワークブックと異なるセルだけを入力
+        
+        保存済みのシートと入力したい値を比較し、変更が必要なセルを連続する矩形範囲にまとめて
+        input_block（削除の場合は clear_range）で入力する。未保存の変更は比較に含まれないため、
+        ファイルを開いた直後または save_file の後に呼び出す
+        
+        Args:
+            values (list): 入力値の2次元リスト（values[行][列]、None のセルは変更しない、空文字列のセルは内容を削除）
+            start_row (int): 左上の行番号（0から開始）
+            start_column (int): 左上の列番号（0から開始）
+            sheet_name (str): 比較するシート名（Noneの場合はアクティブなシート）
+            file_path (str): 比較するワークブックのパス（Noneの場合は開いている作業用ファイル）
+            
+        Returns:
+            bool: すべての入力に成功したかどうか
+        """
+        start_time = time.perf_counter()
+        file_path = file_path or self.working_file
+        if not file_path:
+            logger.error("比較するワークブックが指定されていません")
+            self._record_operation('sync_sheet', False, time.perf_counter() - start_time)
+            return False
+        try:
+            plan = plan_sync(file_path, values, start_row, start_column, sheet_name=sheet_name)
+        except Exception as e:
+            logger.error(f"ワークブックの読み込みエラー: {e}")
+            self._record_operation('sync_sheet', False, time.perf_counter() - start_time)
+            return False
+        self.metrics.counter('excel_sync_cells_total', '差分同期で比較・変更したセル数').inc(
+            plan.total_cells, kind='compared')
+        self.metrics.counter('excel_sync_cells_total', '差分同期で比較・変更したセル数').inc(
+            plan.changed_cells, kind='changed')
+        logger.info(f"差分同期: {plan.total_cells}セル中 {plan.changed_cells}セルを変更します"
+                    f"（{len(plan.ranges)}範囲）")
+        
+        success = True
+        for sync_range in plan.ranges:
+            if sync_range.kind == 'write':
+                result = self.input_block(sync_range.top, sync_range.left, sync_range.values)
+            else:
+                result = self.clear_range(sync_range.top, sync_range.left, sync_range.bottom, sync_range.right)
+            success = success and result is not False
+        self._record_operation('sync_sheet', success, time.perf_counter() - start_time)
+        return success
+
+    @retry_operation("リボン操作", idempotent=False)
     def click_ribbon_shortcut(self, shortcut_key):
         """短縮キー形式でリボン操作を実行（例: "H>AC" でホームタブの中央揃え、"M>M>D" で数式タブ>名前の定義>名前の定義）"""
         try:
             # Excelウィンドウをアクティベート
             self.ensure_excel_active("リボン操作")
             
+            # リボン操作ではアクティブセルが移動する可能性があるため位置を破棄
+            self.cursor.invalidate()
+            
             # Altキーでリボンにアクセス
             send_keys('%')
-            time.sleep(ExcelConfig.get_timing('text_input'))
+            self._wait_for_screen('text_input', require_change=True)
             
             # 短縮キーの形式を解析
             if '>' in shortcut_key:
@@ -613,17 +1111,17 @@ class ExcelAutomationHelper:
                 # 各段階の短縮キーを順次送信
                 for i, key in enumerate(parts):
                     send_keys(key)
-                    time.sleep(ExcelConfig.get_timing('ribbon_operation'))
+                    self._wait_for_screen('ribbon_operation', require_change=True)
                 
                 logger.info(f"リボン短縮キー '{shortcut_key}' を実行しました")
                 return True
             else:
                 # タブのみの短縮キーの場合
                 send_keys(shortcut_key.upper())
-                time.sleep(ExcelConfig.get_timing('ribbon_operation'))
+                self._wait_for_screen('ribbon_operation', require_change=True)
                 # タブキー送信後、Enterキーで抜ける
                 send_keys('{ENTER}')
-                time.sleep(ExcelConfig.get_timing('ribbon_operation'))
+                self._wait_for_screen('ribbon_operation')
                 logger.info(f"リボンタブ短縮キー '{shortcut_key}' を実行しました")
                 return True
                     
@@ -631,6 +1129,98 @@ class ExcelAutomationHelper:
             logger.error(f"リボン短縮キー実行エラー: {e}")
             return False
 
+    def register_image(self, template_name, image_path):
+        """
+        UI要素検出用のテンプレート画像を登録
+        
+        Args:
+            template_name (str): テンプレート名
+            image_path (str): テンプレート画像のパス
+            
+        Returns:
+            bool: 登録に成功したかどうか
+        """
+        try:
+            self.template_locator.add_template(template_name, image_path)
+            logger.info(f"テンプレート画像を登録しました: {template_name} ({image_path})")
+            return True
+        except Exception as e:
+            logger.error(f"テンプレート画像登録エラー: {e}")
+            return False
+    
+    def locate_image(self, template_name, timeout=0):
+        """
+        テンプレート画像に一致するUI要素をExcelウィンドウ内から検索
+        
+        Args:
+            template_name (str): register_image()で登録したテンプレート名
+            timeout (float): 見つからない場合に再検索する時間（秒）
+            
+        Returns:
+            tuple: UI要素の中心の画面座標 (x, y)（見つからない場合はNone）
+        """
+        try:
+            import win32gui
+            
+            source = WindowCaptureSource(lambda: self.excel_window.handle, scale=1.0)
+            timeout = self.retry_engine.clamp(timeout)
+            # 待機する場合は1回の検索で探索する拡大率を制限し、すべての拡大率を探索するまでは終了しない
+            max_levels = ExcelConfig.TEMPLATE_MATCHING['levels_per_poll'] if timeout > 0 else None
+            min_polls = self.template_locator.search_cycle(template_name, max_levels)
+            polls = 0
+            start_time = time.time()
+            while True:
+                # ウィンドウ矩形をレイアウトの識別に使用（移動・リサイズ時は前回の結果を再利用しない）
+                rect = win32gui.GetWindowRect(self.excel_window.handle)
+                match = self.template_locator.locate(template_name, source(), layout_key=rect, max_levels=max_levels)
+                polls += 1
+                if match is not None:
+                    x, y = match_center(match)
+                    logger.debug(f"UI要素を検出しました: {template_name} (スコア: {match.score:.3f})")
+                    return rect[0] + x, rect[1] + y
+                if time.time() - start_time >= timeout and polls >= min_polls:
+                    logger.warning(f"UI要素が見つかりませんでした: {template_name}")
+                    return None
+                time.sleep(ExcelConfig.SCREEN_SETTLE['frame_interval'])
+            
+        except Exception as e:
+            logger.error(f"UI要素検索エラー: {e}")
+            return None
+    
+    @retry_operation("UI要素クリック")
+    def click_image(self, template_name, timeout=0):
+        """
+        テンプレート画像に一致するUI要素をクリック（KeyTipsで操作できないコントロール用）
+        
+        Args:
+            template_name (str): register_image()で登録したテンプレート名
+            timeout (float): 見つからない場合に再検索する時間（秒）
+            
+        Returns:
+            bool: クリックに成功したかどうか（UI要素が見つからなかった場合はNone）
+        """
+        try:
+            from pywinauto import mouse
+            
+            # Excelウィンドウをアクティベート
+            self.ensure_excel_active("UI要素クリック")
+            
+            coords = self.locate_image(template_name, timeout)
+            if coords is None:
+                # 見つからないことは操作の失敗ではないため、リトライ・再起動の対象にしない
+                return None
+            
+            self.cursor.invalidate()
+            mouse.click(coords=coords)
+            self._wait_for_screen('ribbon_operation', require_change=True)
+            logger.info(f"UI要素 '{template_name}' をクリックしました")
+            return True
+            
+        except Exception as e:
+            logger.error(f"UI要素クリックエラー: {e}")
+            return False
+
+    @retry_operation("ダイアログを閉じる")
     def close_dialog(self):
         """ダイアログを閉じる"""
         try:
@@ -654,6 +1244,7 @@ class ExcelAutomationHelper:
                 self.ensure_excel_active("ワークブックを閉じる")
                 
                 # 正常にExcelを閉じる（Ctrl+W でワークブックを閉じる）
+                self.cursor.invalidate()
                 send_keys(ExcelConfig.get_shortcut('close_workbook'))
                 time.sleep(ExcelConfig.get_timing('file_operation'))
                 logger.info("ワークブックを閉じました")
@@ -670,6 +1261,176 @@ class ExcelAutomationHelper:
             self._cleanup_copied_files()
             return False
 
+    def process_workbooks(self, file_paths, work, output_dir=None, close_dialog_configs=None):
+        """
+        複数のワークブックを1つのExcelプロセスで順に処理（バッチモード）
+        
+        各ファイルは信頼できる場所（デスクトップ）にコピーしてから open_file() で開く。
+        ファイルNを処理している間に、ファイルN+1のコピーをバックグラウンドで行い、
+        処理が終わったファイルのコピーはすぐに後片付けする。Excelは終了しないため、
+        すべての処理が終わったら exit_excel() を呼び出すこと
+        
+        work() で保存しなかった変更は、ワークブックを閉じたときの保存確認で破棄する
+        （close_dialog_configs を指定しない場合は ExcelConfig.DIALOGS['save_changes'] で処理する）
+        
+        使用例:
+            def work(excel, source_path):
+                excel.select_cell(0, 0)
+                excel.input_text("処理済み")
+                return excel.save_file()
+            
+            results = excel.process_workbooks(["a.xlsx", "b.xlsx"], work, output_dir="output")
+        
+        Args:
+            file_paths (list): 処理するファイルのパスのリスト
+            work (callable): work(helper, 元のファイルパス) 形式の処理関数（Falseを返すと失敗とみなす）
+            output_dir (str): 処理後のファイル（コピー）の移動先（Noneの場合はコピーを削除する）。
+                同名のファイルが上書きされないよう、ファイル名の先頭には連番（0001_ など）が付く
+            close_dialog_configs (list): ワークブックを閉じた後に処理するダイアログ設定（wait_and_handle_dialogs()の形式）
+                （Noneの場合は保存確認で「保存しない」を選択する。空のリストの場合は処理しない）
+            
+        Returns:
+            list: (元のファイルパス, 成功したかどうか) のリスト
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        results = []
+        file_paths = list(file_paths)
+        if not file_paths:
+            return results
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        if close_dialog_configs is None:
+            close_dialog_configs = [ExcelConfig.DIALOGS['save_changes']]
+        
+        logger.info(f"バッチ処理を開始します（{len(file_paths)}ファイル）")
+        # コピーと後片付けを並行して行えるよう2スレッドを使用
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            next_stage = executor.submit(self._stage_file, file_paths[0], 0)
+            finish_tasks = []
+            for index, source_path in enumerate(file_paths):
+                try:
+                    staged_path = next_stage.result()
+                except Exception as e:
+                    logger.error(f"ファイルのコピーに失敗しました: {source_path}: {e}")
+                    staged_path = None
+                
+                # 次のファイルを先行してコピー
+                if index + 1 < len(file_paths):
+                    next_stage = executor.submit(self._stage_file, file_paths[index + 1], index + 1)
+                
+                if staged_path is None:
+                    results.append((source_path, False))
+                    continue
+                
+                success, closed = self._process_staged_workbook(source_path, staged_path, work, close_dialog_configs)
+                results.append((source_path, success))
+                logger.info(f"バッチ処理 {index + 1}/{len(file_paths)}: {source_path} ({'成功' if success else '失敗'})")
+                
+                # 処理済みのコピーをバックグラウンドで後片付け
+                finish_tasks.append(executor.submit(self._finish_staged_file, source_path, staged_path, output_dir))
+                
+                if not closed:
+                    # 閉じられないワークブック（残ったダイアログなど）に次のファイルの入力が送られないよう中止
+                    logger.error("ワークブックを閉じられないため、残りのファイルを処理しません")
+                    results.extend((path, False) for path in file_paths[index + 1:])
+                    break
+            
+            for task in finish_tasks:
+                task.result()
+        
+        succeeded = sum(1 for _, success in results if success)
+        logger.info(f"バッチ処理が完了しました（成功: {succeeded}/{len(results)}）")
+        return results
+    
+    def _stage_file(self, file_path, index):
+        """
+        ファイルを信頼できる場所（デスクトップ）にコピー
+        （同名ファイルの衝突を避けるため、ファイル名の先頭に連番を付ける）
+        
+        Returns:
+            str: コピー先のパス
+        """
+        import shutil
+        desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
+        staged_path = os.path.join(desktop_path, f"{index + 1:04d}_{os.path.basename(file_path)}")
+        shutil.copy2(file_path, staged_path)
+        self.copied_files.append(staged_path)
+        logger.debug(f"ファイルを信頼できる場所にコピーしました: {staged_path}")
+        return staged_path
+    
+    def _process_staged_workbook(self, source_path, staged_path, work, close_dialog_configs):
+        """
+        コピー済みのワークブックを開いて処理し、閉じる
+        
+        Returns:
+            tuple: (処理に成功したかどうか, ワークブックを閉じたかどうか)
+        """
+        self.source_file = source_path
+        try:
+            running = self.app is not None and self.app.is_process_running()
+        except Exception:
+            running = False
+        
+        # 最初のファイルはExcelの起動と同時に開き、以降は同じExcelで開く
+        opened = self.open_file(staged_path) if running else self.start_excel(staged_path)
+        if not opened:
+            if self.recycled:
+                self.resume_after_recovery()
+            return False, True
+        self.working_file = staged_path
+        
+        try:
+            success = work(self, source_path) is not False
+        except Exception as e:
+            logger.error(f"バッチ処理エラー（{source_path}）: {e}")
+            success = False
+        
+        if self.recycled:
+            # 処理中にExcelを再起動した場合は未保存の変更が失われているため失敗とする
+            logger.error(f"処理中にExcelを再起動したため失敗として扱います: {source_path}")
+            success = False
+            self.resume_after_recovery()
+        
+        self.close_workbook()
+        self.working_file = None
+        # 保存確認が遅れて表示される場合があるため、ワークブックが閉じたことを確認してから次のファイルに進む
+        closed = self._wait_for_workbook_closed(staged_path, close_dialog_configs)
+        if not closed:
+            logger.error(f"ワークブックを閉じたことを確認できませんでした: {source_path}")
+            success = False
+        return success, closed
+    
+    def _finish_staged_file(self, source_path, staged_path, output_dir):
+        """
+        処理済みのコピーを出力先に移動（出力先がない場合は削除）
+        （後片付けに失敗したコピーは copied_files に残し、_cleanup_copied_files() で削除する）
+        """
+        import shutil
+        # ワークブックを閉じた直後はExcelがファイルをロックしている場合があるため、数回試行する
+        for attempt in range(5):
+            try:
+                if output_dir:
+                    # 別フォルダの同名ファイルが上書きされないよう、連番付きのファイル名のまま移動
+                    # （出力先が別ドライブの場合も移動できるよう shutil.move を使用）
+                    output_path = os.path.join(output_dir, os.path.basename(staged_path))
+                    shutil.move(staged_path, output_path)
+                    logger.info(f"処理済みのファイルを移動しました: {source_path} → {output_path}")
+                elif os.path.exists(staged_path):
+                    os.remove(staged_path)
+                    logger.debug(f"コピーしたファイルを削除しました: {staged_path}")
+            except PermissionError as e:
+                logger.debug(f"ファイルがロックされています（試行 {attempt + 1}）: {e}")
+                time.sleep(ExcelConfig.get_timing('file_operation'))
+                continue
+            except Exception as e:
+                logger.error(f"処理済みファイルの後片付けエラー: {e}")
+                return
+            if staged_path in self.copied_files:
+                self.copied_files.remove(staged_path)
+            return
+        logger.error(f"処理済みファイルがロックされているため後片付けできませんでした: {staged_path}")
+    
     def exit_excel(self):
         """Excelを終了する"""
         try:
@@ -682,9 +1443,165 @@ class ExcelAutomationHelper:
             self.app.kill()
             logger.info("Excelを終了しました")
 
+        # ウィンドウレジストリ・プロセス監視を停止
+        self._stop_window_registry()
+        self.process_monitor = None
+
         # 復旧ファイルを削除
         self._cleanup_recovery_files()
     
+    def wait_until_idle(self, timeout=None):
+        """
+        ExcelプロセスのCPU使用率が落ち着くまで待機（再計算の多い入力や保存の後に使用）
+        
+        Args:
+            timeout (float): 最大待機時間（秒）（Noneの場合は設定ファイルの値を使用）
+            
+        Returns:
+            bool: タイムアウト前にアイドル状態になったかどうか
+        """
+        if self.process_monitor is None:
+            return False
+        if timeout is None:
+            timeout = ExcelConfig.PROCESS_MONITOR['idle_timeout']
+        timeout = self.retry_engine.clamp(timeout)
+        try:
+            start_time = time.time()
+            idle = self.process_monitor.wait_until_idle(timeout)
+            if idle:
+                logger.debug(f"Excelがアイドル状態になりました（{time.time() - start_time:.2f}秒後）")
+            else:
+                logger.warning(f"Excelのアイドル待機がタイムアウトしました (タイムアウト: {timeout}秒)")
+                self._record_wait_timeout('process_idle')
+            return idle
+        except Exception as e:
+            logger.debug(f"アイドル待機エラー: {e}")
+            return False
+    
+    def check_process_health(self):
+        """
+        Excelプロセスのメモリ使用量・ハンドル数を確認し、しきい値を超えていれば再起動
+        （未保存の変更は失われるため、保存直後に呼び出す）
+        
+        Returns:
+            bool: しきい値を超えていなかったか、再起動に成功したかどうか
+        """
+        if self.process_monitor is None:
+            return True
+        try:
+            reason = self.process_monitor.check_resources()
+            sample = self.process_monitor.last_sample
+            self.metrics.gauge('excel_process_memory_bytes', 'Excelプロセスのメモリ使用量').set(sample.memory_bytes)
+            self.metrics.gauge('excel_process_handles', 'Excelプロセスのハンドル数').set(sample.handles)
+        except Exception as e:
+            logger.debug(f"プロセス状態確認エラー: {e}")
+            return True
+        if reason is None:
+            return True
+        
+        logger.warning(reason)
+        self.metrics.counter('excel_process_threshold_total', 'メモリ・ハンドル数のしきい値超過回数').inc()
+        if not ExcelConfig.PROCESS_MONITOR['restart_on_threshold']:
+            return True
+        return self.restart_excel()
+    
+    def restart_excel(self):
+        """
+        Excelを再起動し、開いていたファイル（保存済みの状態）をそのまま開き直す
+        （名前を付けて保存した場合は保存先のファイルを開き、信頼できる場所へのコピーは行わない）
+        
+        Returns:
+            bool: 再起動に成功したかどうか
+        """
+        logger.info("Excelを再起動します")
+        try:
+            if self.app:
+                self.exit_excel()
+        except Exception as e:
+            logger.debug(f"Excel終了エラー（無視可能）: {e}")
+        return self.start_excel(self.working_file, copy_to_trusted=False)
+    
+    def _start_metrics_export(self):
+        """設定ファイルに従ってメトリクスのHTTPエンドポイント・JSON出力を開始"""
+        try:
+            if ExcelConfig.METRICS['http_port'] is not None:
+                self.metrics.start_http_server()
+            if ExcelConfig.METRICS['json_file']:
+                self.metrics.start_json_dump(ExcelConfig.METRICS['json_file'])
+        except Exception as e:
+            logger.warning(f"メトリクス出力の開始に失敗しました: {e}")
+    
+    def _record_dialog_wait(self, result):
+        """ダイアログ待機の結果（hit/miss）を記録"""
+        self.metrics.counter('excel_dialog_waits_total', 'ダイアログ待機の結果').inc(result=result)
+    
+    def _record_wait_timeout(self, wait_name):
+        """待機処理のタイムアウトを記録"""
+        self.metrics.counter('excel_wait_timeouts_total', '待機処理のタイムアウト回数').inc(wait=wait_name)
+    
+    def _record_wait_seconds(self, wait_name, seconds):
+        """待機処理の所要時間を記録"""
+        self.metrics.histogram('excel_wait_seconds', '待機処理の所要時間').observe(seconds, wait=wait_name)
+    
+    def _record_operation(self, operation_name, success, seconds):
+        """リトライポリシーを使用しない複合操作の結果・所要時間を記録"""
+        self.retry_engine.record_operation(operation_name, 'success' if success else 'failure', seconds)
+    
+    def job_deadline(self, timeout):
+        """
+        ジョブ全体の期限を設定するコンテキスト
+        期限内の各操作のリトライ・待機は残り時間に制限される
+        
+        使用例:
+            with excel.job_deadline(600):
+                excel.select_cell(0, 0)
+                excel.input_text("Hello")
+        
+        Args:
+            timeout (float): 期限までの時間（秒）
+        """
+        return self.retry_engine.deadline(timeout)
+    
+    def _recycle_excel(self):
+        """
+        操作の連続失敗時にExcelを再起動（作業ファイルを保存済みの状態で開き直す）
+        
+        未保存の変更は失われるため、再起動後は resume_after_recovery() が呼び出されるまで
+        操作を実行しない（retry_engine.breaker が状態を管理する）
+        
+        Returns:
+            bool: 再起動に成功したかどうか
+        """
+        logger.warning("操作が連続で失敗したため、Excelを再起動します（未保存の変更は失われます）")
+        self.metrics.counter('excel_recycles_total', '連続失敗によるExcelの再起動回数').inc()
+        try:
+            if self.app:
+                self.exit_excel()
+        except Exception as e:
+            logger.debug(f"Excel終了エラー（無視可能）: {e}")
+        return self.start_excel(self.working_file, copy_to_trusted=False)
+    
+    @property
+    def recycled(self):
+        """操作の連続失敗によりExcelを再起動し、resume_after_recovery() が呼び出されていない状態かどうか"""
+        return self.retry_engine.breaker.tripped
+    
+    def resume_after_recovery(self):
+        """
+        再起動後の状態を解除し、操作の実行を再開
+        
+        再起動時に失われた未保存の変更は、呼び出し元でやり直す必要がある
+        """
+        if self.recycled:
+            logger.info("回復処理後の状態を解除しました。操作を再開します")
+        self.retry_engine.breaker.reset()
+    
+    def _stop_window_registry(self):
+        """ウィンドウレジストリを停止して破棄"""
+        if self.window_registry is not None:
+            self.window_registry.stop()
+            self.window_registry = None
+    
     def _cleanup_recovery_files(self):
         """復旧ファイルを削除"""
         try:
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+メトリクスの収集
+操作ごとの回数・所要時間（固定バケットのヒストグラム）・ダイアログ検出数などを記録し、
+Prometheusテキスト形式のHTTPエンドポイントまたはJSONファイルとして出力する
+"""
+
+import json
+import bisect
+import threading
+import logging
+from utils.excel_automation_configs import ExcelConfig
+
+logger = logging.getLogger(__name__)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key):
+    if not key:
+        return ''
+    escaped = []
+    for name, value in key:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """単調増加するカウンター"""
+
+    type_name = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """カウンターを増加"""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def snapshot(self):
+        with self._lock:
+            return [{'labels': dict(key), 'value': value} for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """任意の値を設定できるゲージ"""
+
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        """ゲージの値を設定"""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    """固定バケットのヒストグラム"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # ラベル -> [バケットごとの件数（累積でない）, 合計, 件数]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """値を記録"""
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels):
+        entry = self._values.get(_label_key(labels))
+        return entry[2] if entry else 0
+
+    def _cumulative(self, counts):
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def samples(self):
+        with self._lock:
+            entries = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        samples = []
+        for key, counts, total, count in entries:
+            for bound, cumulative in self._cumulative(counts):
+                samples.append((self.name + '_bucket', key + (('le', _format_value(float(bound))),), cumulative))
+            samples.append((self.name + '_sum', key, total))
+            samples.append((self.name + '_count', key, count))
+        return samples
+
+    def snapshot(self):
+        with self._lock:
+            entries = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        return [
+            {
+                'labels': dict(key),
+                'buckets': {_format_value(float(bound)): cumulative for bound, cumulative in self._cumulative(counts)},
+                'sum': total,
+                'count': count,
+            }
+            for key, counts, total, count in entries
+        ]
+
+
+class MetricsRegistry:
+    """メトリクスの登録と出力"""
+
+    def __init__(self, buckets=None):
+        """
+        Args:
+            buckets (tuple): 所要時間ヒストグラムのバケット境界（秒）（Noneの場合は設定ファイルの値を使用）
+        """
+        self.buckets = tuple(buckets if buckets is not None else ExcelConfig.METRICS['buckets'])
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._dump_stop = None
+
+    def _get_or_create(self, name, factory):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = factory()
+        return metric
+
+    def counter(self, name, help_text=''):
+        """カウンターを取得（未登録の場合は作成）"""
+        return self._get_or_create(name, lambda: Counter(name, help_text))
+
+    def gauge(self, name, help_text=''):
+        """ゲージを取得（未登録の場合は作成）"""
+        return self._get_or_create(name, lambda: Gauge(name, help_text))
+
+    def histogram(self, name, help_text='', buckets=None):
+        """ヒストグラムを取得（未登録の場合は作成）"""
+        return self._get_or_create(name, lambda: Histogram(name, help_text, buckets or self.buckets))
+
+    def render_prometheus(self):
+        """
+        Prometheusテキスト形式で出力
+
+        Returns:
+            str: メトリクスのテキスト
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            if metric.help_text:
+                lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            for name, key, value in metric.samples():
+                lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """
+        JSONに変換可能な形式で出力
+
+        Returns:
+            dict: メトリクス名 -> {'type': 種類, 'values': 値のリスト}
+        """
+        return {
+            metric.name: {'type': metric.type_name, 'values': metric.snapshot()}
+            for metric in list(self._metrics.values())
+        }
+
+    def write_json(self, path):
+        """スナップショットをJSONファイルに書き出す"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+    def start_json_dump(self, path, interval=None):
+        """
+        スナップショットを定期的にJSONファイルに書き出す
+
+        Args:
+            path (str): 出力先のファイルパス
+            interval (float): 書き出し間隔（秒）（Noneの場合は設定ファイルの値を使用）
+        """
+        if interval is None:
+            interval = ExcelConfig.METRICS['json_interval']
+        if self._dump_stop is not None:
+            return
+        stop = self._dump_stop = threading.Event()
+
+        def dump_loop():
+            while not stop.wait(interval):
+                try:
+                    self.write_json(path)
+                except Exception as e:
+                    logger.debug(f"メトリクスJSON書き出しエラー: {e}")
+
+        threading.Thread(target=dump_loop, daemon=True).start()
+        logger.info(f"メトリクスのJSON出力を開始しました: {path} ({interval}秒ごと)")
+
+    def start_http_server(self, port=None, host=None):
+        """
+        Prometheusテキスト形式のHTTPエンドポイント（/metrics）を開始
+
+        Args:
+            port (int): ポート番号（Noneの場合は設定ファイルの値を使用）
+            host (str): 待ち受けアドレス（Noneの場合は設定ファイルの値を使用）
+
+        Returns:
+            int: 待ち受けているポート番号
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        if self._server is not None:
+            return self._server.server_address[1]
+        if port is None:
+            port = ExcelConfig.METRICS['http_port']
+        if host is None:
+            host = ExcelConfig.METRICS['http_host']
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] == '/metrics':
+                    body = registry.render_prometheus().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif self.path.split('?')[0] == '/metrics.json':
+                    body = json.dumps(registry.snapshot(), ensure_ascii=False).encode('utf-8')
+                    content_type = 'application/json; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"メトリクスエンドポイント: {format % args}")
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        port = self._server.server_address[1]
+        logger.info(f"メトリクスエンドポイントを開始しました: http://{host}:{port}/metrics")
+        return port
+
+    def stop(self):
+        """HTTPエンドポイントと定期出力を停止"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._dump_stop is not None:
+            self._dump_stop.set()
+            self._dump_stop = None
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excelプロセスの監視
+psutil でCPU時間・ワーキングセット・ハンドル数を取得し、アイドル状態の検出と
+メモリ肥大化の検出を行う
+"""
+
+import time
+import logging
+from collections import namedtuple
+from utils.excel_automation_configs import ExcelConfig
+
+logger = logging.getLogger(__name__)
+
+# プロセスの計測値（cpu_seconds はユーザー時間とシステム時間の合計）
+ProcessSample = namedtuple('ProcessSample', ['timestamp', 'cpu_seconds', 'memory_bytes', 'handles'])
+
+
+class PsutilProcessSource:
+    """psutil によるプロセスの計測"""
+
+    def __init__(self, pid):
+        import psutil
+
+        self.process = psutil.Process(pid)
+
+    def sample(self):
+        """
+        プロセスの現在の計測値を取得
+
+        Returns:
+            ProcessSample: 計測値
+        """
+        with self.process.oneshot():
+            cpu_times = self.process.cpu_times()
+            memory = self.process.memory_info()
+            try:
+                handles = self.process.num_handles()
+            except AttributeError:
+                # Windows以外ではファイルディスクリプタ数で代用
+                handles = self.process.num_fds()
+        return ProcessSample(
+            timestamp=time.monotonic(),
+            cpu_seconds=cpu_times.user + cpu_times.system,
+            memory_bytes=memory.rss,
+            handles=handles,
+        )
+
+
+class FakeProcessSource:
+    """テスト用の計測ソース（与えられた計測値を順に返し、最後の計測値を繰り返す）"""
+
+    def __init__(self, samples):
+        self.samples = list(samples)
+        self.index = 0
+
+    def sample(self):
+        sample = self.samples[min(self.index, len(self.samples) - 1)]
+        self.index += 1
+        return sample
+
+
+class ExcelProcessMonitor:
+    """Excelプロセスのアイドル検出とメモリ肥大化の検出"""
+
+    def __init__(self, source, sleep=time.sleep, clock=time.monotonic):
+        """
+        Args:
+            source: sample() で ProcessSample を返す計測ソース
+            sleep (callable): 待機関数（テスト用に差し替え可能）
+            clock (callable): 経過時間の計測関数（テスト用に差し替え可能）
+        """
+        settings = ExcelConfig.PROCESS_MONITOR
+        self.source = source
+        self.sleep = sleep
+        self.clock = clock
+        self.sample_interval = settings['sample_interval']
+        self.idle_cpu_percent = settings['idle_cpu_percent']
+        self.idle_duration = settings['idle_duration']
+        self.memory_growth_factor = settings['memory_growth_factor']
+        self.max_memory_mb = settings['max_memory_mb']
+        self.max_handles = settings['max_handles']
+
+        self.baseline = None
+        self.last_sample = None
+
+    def sample(self):
+        """計測値を取得"""
+        sample = self.source.sample()
+        self.last_sample = sample
+        return sample
+
+    @staticmethod
+    def cpu_percent(previous, current):
+        """2つの計測値の間のCPU使用率（%、1コア=100%）"""
+        elapsed = current.timestamp - previous.timestamp
+        if elapsed <= 0:
+            return 0.0
+        return (current.cpu_seconds - previous.cpu_seconds) / elapsed * 100
+
+    def wait_until_idle(self, timeout):
+        """
+        CPU使用率が一定時間しきい値以下になるまで待機
+        （最初にアイドル状態になった時点の計測値をメモリ使用量の基準とする。
+        起動直後はワークブックの読み込み中でメモリ使用量が小さいため）
+
+        Args:
+            timeout (float): 最大待機時間（秒）
+
+        Returns:
+            bool: タイムアウト前にアイドル状態になったかどうか
+        """
+        deadline = self.clock() + timeout
+        previous = self.sample()
+        idle_since = None
+        while True:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return False
+            self.sleep(min(self.sample_interval, remaining))
+            current = self.sample()
+            if self.cpu_percent(previous, current) <= self.idle_cpu_percent:
+                if idle_since is None:
+                    idle_since = previous.timestamp
+                if current.timestamp - idle_since >= self.idle_duration:
+                    if self.baseline is None:
+                        self.baseline = current
+                    return True
+            else:
+                idle_since = None
+            previous = current
+
+    def check_resources(self):
+        """
+        メモリ使用量・ハンドル数がしきい値を超えていないかを確認
+
+        Returns:
+            str: しきい値を超えた理由（問題がない場合はNone）
+        """
+        sample = self.sample()
+        memory_mb = sample.memory_bytes / (1024 * 1024)
+        if self.max_memory_mb and memory_mb > self.max_memory_mb:
+            return f"メモリ使用量が上限を超えました ({memory_mb:.0f}MB > {self.max_memory_mb}MB)"
+        if (self.memory_growth_factor and self.baseline is not None
+                and sample.memory_bytes > self.baseline.memory_bytes * self.memory_growth_factor):
+            baseline_mb = self.baseline.memory_bytes / (1024 * 1024)
+            return f"メモリ使用量が起動時の{self.memory_growth_factor}倍を超えました ({baseline_mb:.0f}MB → {memory_mb:.0f}MB)"
+        if self.max_handles and sample.handles > self.max_handles:
+            return f"ハンドル数が上限を超えました ({sample.handles} > {self.max_handles})"
+        return None
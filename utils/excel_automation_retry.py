@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+リトライポリシー
+ExcelConfig.ERROR_HANDLING に基づく指数バックオフ付きリトライ、処理時間の期限（デッドライン）、
+連続失敗時のExcel再起動（サーキットブレーカー）を管理する
+"""
+
+import time
+import random
+import functools
+import logging
+from contextlib import contextmanager
+from utils.excel_automation_configs import ExcelConfig
+
+logger = logging.getLogger(__name__)
+
+
+class ExcelOperationError(Exception):
+    """リトライ後も操作が失敗した場合の例外（continue_on_error が False の場合に送出）"""
+
+
+class NonRetryableError(Exception):
+    """リトライしても結果が変わらない失敗（Excelが見つからない、設定の誤りなど）"""
+
+
+# リトライせずに呼び出し元へ送出する例外（引数の誤りなど、何度実行しても同じ結果になるもの）
+NON_RETRYABLE_ERRORS = (NonRetryableError, ValueError, TypeError)
+
+
+class RetryPolicy:
+    """指数バックオフ（ジッター付き）のリトライ間隔"""
+
+    def __init__(self, max_retries=None, retry_delay=None, backoff_factor=None, max_delay=None, jitter=None):
+        """
+        Args:
+            max_retries (int): 最大リトライ回数（初回の試行を含まない）
+            retry_delay (float): 初回のリトライ間隔（秒）
+            backoff_factor (float): リトライごとの間隔の倍率
+            max_delay (float): リトライ間隔の上限（秒）
+            jitter (float): リトライ間隔に加えるゆらぎの割合（0.1 の場合は ±10%）
+        """
+        settings = ExcelConfig.ERROR_HANDLING
+        self.max_retries = max_retries if max_retries is not None else settings['max_retries']
+        self.retry_delay = retry_delay if retry_delay is not None else settings['retry_delay']
+        self.backoff_factor = backoff_factor if backoff_factor is not None else settings['backoff_factor']
+        self.max_delay = max_delay if max_delay is not None else settings['max_retry_delay']
+        self.jitter = jitter if jitter is not None else settings['jitter']
+
+    def delay(self, attempt):
+        """
+        リトライ前の待機時間
+
+        Args:
+            attempt (int): 失敗した試行の番号（0から開始）
+
+        Returns:
+            float: 待機時間（秒）
+        """
+        delay = min(self.max_delay, self.retry_delay * (self.backoff_factor ** attempt))
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(0.0, delay)
+
+
+class Deadline:
+    """処理時間の期限"""
+
+    def __init__(self, timeout, clock=time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + timeout
+
+    def remaining(self):
+        """残り時間（秒）"""
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self):
+        """期限を過ぎたかどうか"""
+        return self.clock() >= self.expires_at
+
+
+class CircuitBreaker:
+    """
+    連続失敗の検出
+
+    操作が連続して失敗した回数がしきい値に達すると on_trip（Excelの再起動など）を呼び出す。
+    on_trip を呼び出した後は、再起動前の作業内容が失われている可能性があるため、
+    reset() が呼び出されるまで操作を実行せずに即座に失敗させる。
+    on_trip がない場合は一定時間（cooldown）操作を即座に失敗させる
+    """
+
+    def __init__(self, failure_threshold=None, cooldown=None, on_trip=None, clock=time.monotonic):
+        settings = ExcelConfig.ERROR_HANDLING
+        self.failure_threshold = failure_threshold if failure_threshold is not None else settings['circuit_breaker_threshold']
+        self.cooldown = cooldown if cooldown is not None else settings['circuit_breaker_cooldown']
+        self.on_trip = on_trip
+        self.clock = clock
+        self.failures = 0
+        self.open_until = None
+        self.tripped = False  # on_trip を呼び出した後、reset() されていない状態
+        self._tripping = False
+
+    def is_open(self):
+        """操作を即座に失敗させる状態かどうか"""
+        if self.tripped:
+            return True
+        if self.open_until is None:
+            return False
+        if self.clock() >= self.open_until:
+            # 待機時間を過ぎたら再度試行を許可
+            self.open_until = None
+            return False
+        return True
+
+    def reset(self):
+        """回復処理後の状態を解除し、操作の実行を再開"""
+        self.failures = 0
+        self.open_until = None
+        self.tripped = False
+
+    def record_success(self):
+        """成功を記録"""
+        if not self._tripping:
+            self.failures = 0
+
+    def record_failure(self):
+        """失敗を記録し、しきい値に達したら on_trip を呼び出す"""
+        if self._tripping:
+            return
+        self.failures += 1
+        if not self.failure_threshold or self.failures < self.failure_threshold:
+            return
+
+        logger.warning(f"操作が{self.failures}回連続で失敗しました。回復処理を実行します")
+        self.failures = 0
+        if self.on_trip is None:
+            self.open_until = self.clock() + self.cooldown
+            return
+        self._tripping = True
+        try:
+            recovered = self.on_trip()
+        except Exception as e:
+            logger.error(f"回復処理エラー: {e}")
+            recovered = False
+        finally:
+            self._tripping = False
+        self.tripped = True
+        if recovered:
+            logger.warning("回復処理を実行しました。reset() が呼び出されるまで操作を実行しません")
+        else:
+            logger.error("回復処理に失敗しました。reset() が呼び出されるまで操作を実行しません")
+
+
+class RetryEngine:
+    """
+    ヘルパー操作のリトライ実行
+
+    操作が False を返すか例外を送出した場合に失敗とみなし、ポリシーに従ってリトライする。
+    リトライは最も外側の操作でのみ行い、入れ子の操作は1回だけ実行する（試行回数が掛け算で増えないように）。
+    NON_RETRYABLE_ERRORS の例外はリトライせず、失敗としても数えずに（Excelを再起動せずに）そのまま送出する。
+    ジョブ単位・操作単位のデッドラインは入れ子の操作や待機処理にも適用される
+    """
+
+    def __init__(self, policy=None, breaker=None, operation_timeout=None, continue_on_error=None,
+                 metrics=None, sleep=time.sleep, clock=time.monotonic):
+        settings = ExcelConfig.ERROR_HANDLING
+        self.policy = policy if policy is not None else RetryPolicy()
+        self.breaker = breaker if breaker is not None else CircuitBreaker(clock=clock)
+        self.operation_timeout = operation_timeout if operation_timeout is not None else settings['operation_timeout']
+        self.continue_on_error = continue_on_error if continue_on_error is not None else settings['continue_on_error']
+        self.metrics = metrics
+        self.sleep = sleep
+        self.clock = clock
+        self._deadlines = []
+        self._depth = 0
+
+    @contextmanager
+    def deadline(self, timeout):
+        """
+        期限を設定するコンテキスト（入れ子の場合は最も早い期限が有効）
+
+        Args:
+            timeout (float): 期限までの時間（秒）（Noneの場合は期限なし）
+        """
+        if timeout is None:
+            yield
+            return
+        self._deadlines.append(Deadline(timeout, self.clock))
+        try:
+            yield
+        finally:
+            self._deadlines.pop()
+
+    def remaining(self):
+        """有効な期限までの残り時間（秒）（期限がない場合はNone）"""
+        if not self._deadlines:
+            return None
+        return min(deadline.remaining() for deadline in self._deadlines)
+
+    def clamp(self, timeout):
+        """待機時間を有効な期限までの残り時間に制限"""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if timeout is None:
+            return remaining
+        return min(timeout, remaining)
+
+    def run(self, operation_name, func, metric_name=None, retry=True):
+        """
+        操作をリトライポリシーに従って実行
+
+        Args:
+            operation_name (str): 操作の名前（ログ用）
+            func (callable): 引数なしで呼び出す操作
+            metric_name (str): メトリクスに記録する操作名（Noneの場合は記録しない）
+            retry (bool): 失敗した場合にリトライするかどうか
+                （キー入力を送信する操作など、繰り返すと結果が変わる操作は False）
+
+        Returns:
+            操作の戻り値（すべての試行が失敗した場合はFalse）
+
+        Raises:
+            ExcelOperationError: すべての試行が失敗し、continue_on_error が False の場合
+            NON_RETRYABLE_ERRORS: 操作がリトライしても結果が変わらない例外を送出した場合
+        """
+        outermost = self._depth == 0
+        if outermost and self.breaker.is_open():
+            if self.breaker.tripped:
+                logger.warning(f"{operation_name}: 回復処理（Excelの再起動）の後、状態が解除されていないため実行しません")
+            else:
+                logger.warning(f"{operation_name}: 回復待機中のため実行しません")
+            self.record_operation(metric_name, 'rejected', 0.0, 0)
+            return self._fail(operation_name)
+
+        start_time = time.perf_counter()
+        self._depth += 1
+        try:
+            with self.deadline(self.operation_timeout):
+                result, attempts = self._run_attempts(operation_name, func, retry=outermost and retry)
+        except NON_RETRYABLE_ERRORS as e:
+            if outermost:
+                logger.error(f"{operation_name}: リトライできないエラーのため中止しました: {e}")
+            self.record_operation(metric_name, 'failure', time.perf_counter() - start_time, 0)
+            raise
+        finally:
+            self._depth -= 1
+        self.record_operation(metric_name, 'failure' if result is False else 'success',
+                     time.perf_counter() - start_time, attempts - 1)
+
+        if result is not False:
+            if outermost:
+                self.breaker.record_success()
+            return result
+        if outermost:
+            self.breaker.record_failure()
+        return self._fail(operation_name)
+
+    def _run_attempts(self, operation_name, func, retry=True):
+        max_retries = self.policy.max_retries if retry else 0
+        attempts = 0
+        for attempt in range(max_retries + 1):
+            if self._deadlines and self.remaining() <= 0:
+                logger.warning(f"{operation_name}: 期限切れのため中止しました")
+                return False, max(1, attempts)
+
+            attempts += 1
+            try:
+                result = func()
+            except NON_RETRYABLE_ERRORS:
+                raise
+            except Exception as e:
+                logger.error(f"{operation_name}エラー（試行 {attempt + 1}）: {e}")
+                result = False
+            if result is not False:
+                return result, attempts
+
+            if attempt >= max_retries:
+                break
+            delay = self.clamp(self.policy.delay(attempt))
+            logger.info(f"{operation_name}に失敗しました。{delay:.2f}秒後にリトライします... "
+                        f"(試行 {attempt + 1}/{max_retries + 1})")
+            if delay > 0:
+                self.sleep(delay)
+        return False, attempts
+
+    def record_operation(self, metric_name, result, seconds, retries=0):
+        """
+        操作の結果・所要時間・リトライ回数をメトリクスに記録
+        （リトライポリシーを使用しない複合操作の記録にも使用する）
+
+        Args:
+            metric_name (str): 操作名（Noneの場合は記録しない）
+            result (str): 'success' / 'failure' / 'rejected'
+            seconds (float): 所要時間（秒）
+            retries (int): リトライ回数
+        """
+        if self.metrics is None or metric_name is None:
+            return
+        self.metrics.counter('excel_operations_total', '操作の実行回数').inc(operation=metric_name, result=result)
+        if result != 'rejected':
+            self.metrics.histogram('excel_operation_seconds', '操作の所要時間（リトライを含む）').observe(
+                seconds, operation=metric_name)
+        if retries > 0:
+            self.metrics.counter('excel_operation_retries_total', '操作のリトライ回数').inc(
+                retries, operation=metric_name)
+
+    def _fail(self, operation_name):
+        if self.continue_on_error:
+            return False
+        raise ExcelOperationError(f"{operation_name}に失敗しました")
+
+
+def retry_operation(operation_name, idempotent=True):
+    """
+    ヘルパーのメソッドを self.retry_engine のリトライポリシーで実行するデコレーター
+
+    Args:
+        operation_name (str): 操作の名前（ログ用）
+        idempotent (bool): 繰り返し実行しても結果が変わらない操作かどうか
+            （False の場合はリトライしない。途中まで送信したキー入力を再送しないように）
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            return self.retry_engine.run(operation_name, lambda: method(self, *args, **kwargs), method.__name__,
+                                         retry=idempotent)
+        return wrapper
+    return decorator
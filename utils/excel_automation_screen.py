@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+画面の安定待機
+Excelウィンドウ領域を低解像度でキャプチャし、フレーム差分から画面描画の完了を検出する
+"""
+
+import time
+import logging
+import numpy as np
+import cv2
+from utils.excel_automation_configs import ExcelConfig
+
+logger = logging.getLogger(__name__)
+
+
+def to_small_gray(frame, scale):
+    """フレームをグレースケールに変換して縮小"""
+    frame = np.asarray(frame)
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    if scale != 1.0:
+        frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return frame
+
+
+class WindowCaptureSource:
+    """ウィンドウ領域をキャプチャするソース"""
+
+    def __init__(self, hwnd_provider, scale=None):
+        """
+        Args:
+            hwnd_provider (callable): キャプチャ対象のウィンドウハンドルを返す関数
+            scale (float): 縮小率（Noneの場合は設定ファイルの値を使用）
+        """
+        self.hwnd_provider = hwnd_provider
+        self.scale = scale if scale is not None else ExcelConfig.SCREEN_SETTLE['scale']
+
+    def __call__(self):
+        """
+        ウィンドウ領域をキャプチャ
+
+        Returns:
+            numpy.ndarray: 縮小済みのグレースケール画像
+        """
+        import win32gui
+        from PIL import ImageGrab
+
+        hwnd = self.hwnd_provider()
+        left, top, right, bottom = win32gui.GetWindowRect(hwnd)
+        image = ImageGrab.grab(bbox=(left, top, right, bottom), all_screens=True)
+        return to_small_gray(image.convert('L'), self.scale)
+
+
+class SyntheticCaptureSource:
+    """テスト用のキャプチャソース（与えられたフレームを順に返し、最後のフレームを繰り返す）"""
+
+    def __init__(self, frames):
+        self.frames = [np.asarray(frame) for frame in frames]
+        self.index = 0
+
+    def __call__(self):
+        frame = self.frames[min(self.index, len(self.frames) - 1)]
+        self.index += 1
+        return frame
+
+
+class ScreenSettleDetector:
+    """フレーム差分による画面安定の検出"""
+
+    def __init__(self, source, stable_frames=None, frame_interval=None,
+                 pixel_threshold=None, change_ratio=None, sleep=time.sleep):
+        """
+        Args:
+            source (callable): 引数なしで呼び出してフレーム（numpy配列）を返すキャプチャソース
+            stable_frames (int): 安定とみなす連続した無変化フレーム数
+            frame_interval (float): キャプチャ間隔（秒）
+            pixel_threshold (int): 変化とみなす画素値の差
+            change_ratio (float): 変化画素の割合がこの値以下であれば無変化とみなす
+            sleep (callable): 待機関数（テスト用に差し替え可能）
+        """
+        settings = ExcelConfig.SCREEN_SETTLE
+        self.source = source
+        self.stable_frames = stable_frames if stable_frames is not None else settings['stable_frames']
+        self.frame_interval = frame_interval if frame_interval is not None else settings['frame_interval']
+        self.pixel_threshold = pixel_threshold if pixel_threshold is not None else settings['pixel_threshold']
+        self.change_ratio = change_ratio if change_ratio is not None else settings['change_ratio']
+        self.sleep = sleep
+
+    def frame_changed(self, previous, current):
+        """
+        2つのフレーム間に変化があるかどうか
+
+        Returns:
+            bool: 変化画素の割合がしきい値を超えたかどうか
+        """
+        if previous.shape != current.shape:
+            return True
+        diff = cv2.absdiff(previous, current)
+        changed = np.count_nonzero(diff > self.pixel_threshold)
+        return changed > self.change_ratio * diff.size
+
+    def wait_until_settled(self, timeout, require_change=False):
+        """
+        画面が安定するまで待機
+
+        Args:
+            timeout (float): 最大待機時間（秒）
+            require_change (bool): 変化を一度検出してから安定を判定するかどうか
+                （操作の結果が遅れて表示される場合に、描画開始前の無変化を安定とみなさないため）
+
+        Returns:
+            bool: タイムアウト前に画面が安定したかどうか（require_change の場合は変化が検出されなければFalse）
+        """
+        deadline = time.monotonic() + timeout
+        previous = self.source()
+        stable_count = 0
+        changed = not require_change
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self.sleep(min(self.frame_interval, remaining))
+            current = self.source()
+            if self.frame_changed(previous, current):
+                changed = True
+                stable_count = 0
+            elif changed:
+                stable_count += 1
+                if stable_count >= self.stable_frames:
+                    return True
+            previous = current
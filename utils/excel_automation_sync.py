@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ワークブックの差分同期
+保存済みのワークブック（.xlsx）のシートを読み込み、入力したい値との差分をNumPyで一括比較して、
+変更が必要なセルを連続する矩形範囲にまとめる
+
+.xlsx は zipfile と xml.etree で直接読み込むため、追加の依存ライブラリは不要
+"""
+
+import os
+import re
+import math
+import zipfile
+import datetime
+import logging
+import posixpath
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+import numpy as np
+from utils.excel_automation_fill import normalize_formula
+
+logger = logging.getLogger(__name__)
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# Excelが入力時に数値へ変換する書式（桁区切り・パーセント・日付・時刻）
+_THOUSANDS_PATTERN = re.compile(r'^[+-]?[0-9]{1,3}(?:,[0-9]{3})+(?:\.[0-9]+)?$')
+_PERCENT_PATTERN = re.compile(r'^[+-]?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)%$')
+_DATE_PATTERN = re.compile(
+    r'^([0-9]{4})[/-]([0-9]{1,2})[/-]([0-9]{1,2})(?:[ T]([0-9]{1,2}):([0-9]{2})(?::([0-9]{2}))?)?$'
+)
+_TIME_PATTERN = re.compile(r'^([0-9]{1,2}):([0-9]{2})(?::([0-9]{2}))?$')
+
+# Excelの日付シリアル値の基準日（1900年3月1日以降の日付で正しい値になる）
+_EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+
+# 同期の矩形範囲（kind が 'write' の場合は values を入力、'clear' の場合は範囲の内容を削除）
+SyncRange = namedtuple('SyncRange', ['kind', 'top', 'left', 'bottom', 'right', 'values'])
+
+# 同期計画（changed_cells は変更が必要なセル数、total_cells は比較したセル数）
+SyncPlan = namedtuple('SyncPlan', ['ranges', 'changed_cells', 'total_cells'])
+
+
+def _cell_position(reference):
+    """A1形式のセル参照を (行, 列)（0から開始）に変換"""
+    column = 0
+    index = 0
+    while index < len(reference) and reference[index].isalpha():
+        column = column * 26 + (ord(reference[index].upper()) - 64)
+        index += 1
+    return int(reference[index:]) - 1, column - 1
+
+
+def _canonical_number(text):
+    """数値として解釈できる文字列を正規化（Excelは入力された数値を数値として保存するため）"""
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    if not math.isfinite(number):
+        return text
+    if number.is_integer() and abs(number) < 1e15:
+        return str(int(number))
+    # Excelの有効桁数（15桁）で比較し、計算方法による最下位ビットの差を無視する
+    return format(number, '.15g')
+
+
+def _seconds_of_day(hours, minutes, seconds):
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds or 0)
+
+
+def _canonical_input(text):
+    """
+    入力する文字列を、Excelが入力時に変換した後の保存値に合わせて正規化
+
+    TRUE/FALSE（大文字小文字を区別しない）、桁区切り（1,000）、パーセント（10%）、
+    日付（2024/1/1、2024-01-01、時刻付き）、時刻（12:30）に対応する。
+    それ以外の書式（通貨記号、年を省略した日付など）は文字列のまま比較する
+    """
+    if text.upper() in ('TRUE', 'FALSE'):
+        return text.upper()
+    if _THOUSANDS_PATTERN.match(text):
+        return _canonical_number(text.replace(',', ''))
+    if _PERCENT_PATTERN.match(text):
+        return _canonical_number(str(float(text[:-1]) / 100))
+    match = _DATE_PATTERN.match(text)
+    if match:
+        year, month, day, hours, minutes, seconds = match.groups()
+        try:
+            date = datetime.datetime(int(year), int(month), int(day))
+        except ValueError:
+            return text
+        serial = (date - _EXCEL_EPOCH).days
+        if hours is not None:
+            serial += _seconds_of_day(hours, minutes, seconds) / 86400
+        return _canonical_number(str(serial))
+    match = _TIME_PATTERN.match(text)
+    if match and int(match.group(1)) < 24 and int(match.group(2)) < 60:
+        return _canonical_number(str(_seconds_of_day(*match.groups()) / 86400))
+    return _canonical_number(text)
+
+
+def _canonical_formula(formula, row, column):
+    """数式を比較用に正規化（セル参照は相対位置に変換し、新しい関数の _xlfn. 接頭辞は除く）"""
+    normalized = normalize_formula(formula, row, column)
+    return normalized.replace('_XLFN.', '').replace('_XLWS.', '')
+
+
+def cell_text(value, row, column):
+    """
+    入力値を比較用の文字列に変換（Excelが入力時に数値・論理値へ変換する値は変換後の値にする）
+
+    Args:
+        value: 入力値（None の場合は比較しない）
+        row (int): セルの行番号（0から開始）
+        column (int): セルの列番号（0から開始）
+
+    Returns:
+        str: 比較用の文字列（空セルは空文字列、value が None の場合は None）
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    text = str(value)
+    if text.startswith('='):
+        return _canonical_formula(text, row, column)
+    return _canonical_input(text)
+
+
+def _text_of(element):
+    """共有文字列・インライン文字列の要素からテキストを取得（リッチテキストは連結）"""
+    return ''.join(node.text or '' for node in element.iter(_MAIN_NS + 't'))
+
+
+def _sheet_path(archive, sheet_name):
+    """シート名（None の場合はアクティブなシート）に対応するワークシートXMLのパス"""
+    workbook = ET.fromstring(archive.read('xl/workbook.xml'))
+    sheets = workbook.findall(f'{_MAIN_NS}sheets/{_MAIN_NS}sheet')
+    if not sheets:
+        raise ValueError("ワークブックにシートがありません")
+    if sheet_name is None:
+        view = workbook.find(f'{_MAIN_NS}bookViews/{_MAIN_NS}workbookView')
+        active_tab = int(view.get('activeTab', 0)) if view is not None else 0
+        sheet = sheets[min(active_tab, len(sheets) - 1)]
+    else:
+        sheet = next((sheet for sheet in sheets if sheet.get('name') == sheet_name), None)
+        if sheet is None:
+            raise ValueError(f"シートが見つかりません: {sheet_name}")
+
+    relationship_id = sheet.get(_REL_NS + 'id')
+    relationships = ET.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    for relationship in relationships.iter(_PACKAGE_REL_NS + 'Relationship'):
+        if relationship.get('Id') == relationship_id:
+            target = relationship.get('Target')
+            if target.startswith('/'):
+                return target[1:]
+            return posixpath.normpath(posixpath.join('xl', target))
+    raise ValueError(f"シートの参照が見つかりません: {sheet.get('name')}")
+
+
+def read_sheet(file_path, sheet_name=None, shape=None):
+    """
+    保存済みワークブックのシートを比較用の文字列の2次元配列として読み込む
+
+    Args:
+        file_path (str): ワークブック（.xlsx）のパス
+        sheet_name (str): シート名（Noneの場合はアクティブなシート）
+        shape (tuple): 読み込む範囲の (行数, 列数)（Noneの場合は値のあるセルがすべて入る大きさ）
+
+    Returns:
+        numpy.ndarray: 比較用の文字列（空セルは空文字列）の2次元配列（dtype=object）
+    """
+    cells = {}
+    with zipfile.ZipFile(file_path) as archive:
+        shared_strings = []
+        if 'xl/sharedStrings.xml' in archive.namelist():
+            with archive.open('xl/sharedStrings.xml') as f:
+                for _, element in ET.iterparse(f):
+                    if element.tag == _MAIN_NS + 'si':
+                        shared_strings.append(_text_of(element))
+                        element.clear()
+
+        # 共有数式（下方向へのコピーなどで作成される）は先頭セルにだけ数式が保存される。
+        # 相対位置に正規化した数式は範囲内のすべてのセルで同じになるため、先頭セルの値を使う
+        shared_formulas = {}
+        with archive.open(_sheet_path(archive, sheet_name)) as f:
+            for _, element in ET.iterparse(f):
+                if element.tag != _MAIN_NS + 'c':
+                    continue
+                row, column = _cell_position(element.get('r'))
+                if shape is not None and (row >= shape[0] or column >= shape[1]):
+                    element.clear()
+                    continue
+
+                cell_type = element.get('t', 'n')
+                formula = element.find(_MAIN_NS + 'f')
+                value = element.find(_MAIN_NS + 'v')
+                if formula is not None:
+                    shared_index = formula.get('si') if formula.get('t') == 'shared' else None
+                    if formula.text:
+                        text = _canonical_formula('=' + formula.text, row, column)
+                        if shared_index is not None:
+                            shared_formulas[shared_index] = text
+                    else:
+                        text = shared_formulas.get(shared_index, '')
+                elif cell_type == 's' and value is not None:
+                    text = shared_strings[int(value.text)]
+                elif cell_type == 'inlineStr':
+                    text = _text_of(element)
+                elif cell_type == 'b' and value is not None:
+                    text = 'TRUE' if value.text == '1' else 'FALSE'
+                elif cell_type == 'n' and value is not None:
+                    text = _canonical_number(value.text)
+                else:
+                    text = (value.text or '') if value is not None else ''
+                if text != '':
+                    cells[(row, column)] = text
+                element.clear()
+
+    if shape is None:
+        shape = (max((row for row, _ in cells), default=-1) + 1,
+                 max((column for _, column in cells), default=-1) + 1)
+    grid = np.full(shape, '', dtype=object)
+    for (row, column), text in cells.items():
+        grid[row, column] = text
+    return grid
+
+
+def desired_grid(values, start_row=0, start_column=0):
+    """
+    入力したい値を比較用の文字列の2次元配列に変換
+
+    Args:
+        values (list): 入力値の2次元リスト（values[行][列]、None のセルは比較しない）
+        start_row (int): 左上の行番号（0から開始）
+        start_column (int): 左上の列番号（0から開始）
+
+    Returns:
+        tuple: (比較用の文字列の2次元配列, 比較するセルのマスク)
+    """
+    height = len(values)
+    width = max((len(row) for row in values), default=0)
+    grid = np.full((height, width), None, dtype=object)
+    for row, row_values in enumerate(values):
+        for column, value in enumerate(row_values):
+            grid[row, column] = cell_text(value, start_row + row, start_column + column)
+    defined = grid != None  # noqa: E711（要素ごとの比較）
+    grid[~defined] = ''
+    return grid, defined
+
+
+def group_ranges(mask):
+    """
+    変更が必要なセルのマスクを矩形範囲にまとめる
+
+    行ごとに連続するセルの区間を求め、同じ列範囲の区間が続く行を1つの矩形にまとめる
+
+    Args:
+        mask (numpy.ndarray): 変更が必要なセルのマスク（2次元のbool配列）
+
+    Returns:
+        list: (上, 左, 下, 右) のリスト（行優先順）
+    """
+    if mask.size == 0:
+        return []
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    starts = np.argwhere(edges == 1)
+    ends = np.argwhere(edges == -1)
+
+    ranges = []
+    open_ranges = {}  # (左, 右) -> [上, 下]
+    for (row, left), (_, end) in zip(starts, ends):
+        row, key = int(row), (int(left), int(end) - 1)
+        current = open_ranges.get(key)
+        if current is not None and current[1] == row - 1:
+            current[1] = row
+            continue
+        if current is not None:
+            ranges.append((current[0], key[0], current[1], key[1]))
+        open_ranges[key] = [row, row]
+    for (left, right), (top, bottom) in open_ranges.items():
+        ranges.append((top, left, bottom, right))
+    return sorted(ranges)
+
+
+def plan_sync(file_path, values, start_row=0, start_column=0, sheet_name=None):
+    """
+    保存済みワークブックと入力したい値を比較し、変更が必要な範囲を求める
+
+    Args:
+        file_path (str): ワークブック（.xlsx）のパス（存在しない場合はすべてのセルを入力する）
+        values (list): 入力値の2次元リスト（values[行][列]、None のセルは変更しない、空文字列のセルは内容を削除）
+        start_row (int): 左上の行番号（0から開始）
+        start_column (int): 左上の列番号（0から開始）
+        sheet_name (str): シート名（Noneの場合はアクティブなシート）
+
+    Returns:
+        SyncPlan: 同期計画（範囲の行・列番号はシート上の位置）
+    """
+    desired, defined = desired_grid(values, start_row, start_column)
+    height, width = desired.shape
+    if os.path.exists(file_path):
+        current = read_sheet(file_path, sheet_name, shape=(start_row + height, start_column + width))
+        current = current[start_row:, start_column:]
+    else:
+        logger.warning(f"ワークブックが見つからないため、すべてのセルを入力します: {file_path}")
+        current = np.full((height, width), '', dtype=object)
+
+    changed = defined & (desired != current)
+    empty = desired == ''
+    ranges = []
+    for kind, mask in (('write', changed & ~empty), ('clear', changed & empty)):
+        for top, left, bottom, right in group_ranges(mask):
+            block = None
+            if kind == 'write':
+                block = [list(values[row][left:right + 1]) for row in range(top, bottom + 1)]
+            ranges.append(SyncRange(kind, start_row + top, start_column + left,
+                                    start_row + bottom, start_column + right, block))
+    ranges.sort(key=lambda sync_range: (sync_range.top, sync_range.left))
+    return SyncPlan(ranges, int(changed.sum()), int(defined.sum()))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+テキスト入力エンジン
+send_keys の特殊文字のエスケープ、長いテキストの分割送信、日本語などのクリップボード経由の入力、
+入力速度の制限を行う
+"""
+
+import re
+import time
+import logging
+from utils.excel_automation_configs import ExcelConfig
+
+logger = logging.getLogger(__name__)
+
+# send_keys で特殊な意味を持つ文字のエスケープ表（改行はセル内改行 Alt+Enter として送信）
+SEND_KEYS_ESCAPE_TABLE = str.maketrans({
+    '+': '{+}',
+    '^': '{^}',
+    '%': '{%}',
+    '~': '{~}',
+    '(': '{(}',
+    ')': '{)}',
+    '{': '{{}',
+    '}': '{}}',
+    '[': '{[}',
+    ']': '{]}',
+    '\n': '%{ENTER}',
+    '\r': None,
+})
+
+# IMEの影響を受けやすい文字（全角記号・かな・漢字・全角英数）とBMP外の文字
+_PASTE_REQUIRED_PATTERN = re.compile(
+    '[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef\U00010000-\U0010ffff]'
+)
+
+
+def escape_send_keys(text):
+    """テキストを send_keys の書式にエスケープ"""
+    return text.translate(SEND_KEYS_ESCAPE_TABLE)
+
+
+def requires_paste(text):
+    """キー送信ではなくクリップボード経由で入力すべき文字を含むかどうか"""
+    return _PASTE_REQUIRED_PATTERN.search(text) is not None
+
+
+def set_clipboard_text(text):
+    """クリップボードにテキストを設定"""
+    import win32clipboard
+    import win32con
+
+    win32clipboard.OpenClipboard()
+    try:
+        win32clipboard.EmptyClipboard()
+        win32clipboard.SetClipboardData(win32con.CF_UNICODETEXT, text)
+    finally:
+        win32clipboard.CloseClipboard()
+
+
+class TextInputEngine:
+    """send_keys によるテキスト入力エンジン"""
+
+    def __init__(self, send=None, set_clipboard=None, chunk_size=None, chars_per_second=None,
+                 key_pause=None, paste_threshold=None, use_clipboard=None, sleep=time.sleep):
+        """
+        Args:
+            send (callable): send(keys, pause) 形式のキー送信関数（Noneの場合はpywinautoのsend_keys）
+            set_clipboard (callable): クリップボード設定関数（Noneの場合はwin32clipboardを使用）
+            chunk_size (int): 1回のキー送信で送る最大文字数
+            chars_per_second (float): 入力速度の上限（文字/秒、0の場合は無制限）
+            key_pause (float): send_keys のキー間の待機時間（秒）
+            paste_threshold (int): この文字数を超えるテキストはクリップボード経由で入力
+            use_clipboard (bool): 日本語・BMP外の文字・長いテキストにクリップボード経由の入力を使うかどうか
+            sleep (callable): 待機関数（テスト用に差し替え可能）
+        """
+        settings = ExcelConfig.TEXT_INPUT
+        self.send = send if send is not None else self._send_keys
+        self.set_clipboard = set_clipboard if set_clipboard is not None else set_clipboard_text
+        self.chunk_size = chunk_size if chunk_size is not None else settings['chunk_size']
+        self.chars_per_second = chars_per_second if chars_per_second is not None else settings['chars_per_second']
+        self.key_pause = key_pause if key_pause is not None else settings['key_pause']
+        self.paste_threshold = paste_threshold if paste_threshold is not None else settings['paste_threshold']
+        self.use_clipboard = use_clipboard if use_clipboard is not None else settings['use_clipboard']
+        self.sleep = sleep
+
+        # 計測値
+        self.total_chars = 0
+        self.total_seconds = 0.0
+
+    @staticmethod
+    def _send_keys(keys, pause):
+        from pywinauto.keyboard import send_keys
+        send_keys(keys, pause=pause, with_spaces=True)
+
+    @property
+    def measured_chars_per_second(self):
+        """これまでの実測入力速度（文字/秒）"""
+        if self.total_seconds <= 0:
+            return 0.0
+        return self.total_chars / self.total_seconds
+
+    def reset_stats(self):
+        """計測値をリセット"""
+        self.total_chars = 0
+        self.total_seconds = 0.0
+
+    def should_paste(self, text):
+        """テキストをクリップボード経由で入力するかどうか"""
+        if '\t' in text:
+            # タブはキー送信ではセルの移動になるため、セル内の文字として入力するには貼り付けるしかない
+            return True
+        if not self.use_clipboard:
+            return False
+        return len(text) > self.paste_threshold or requires_paste(text)
+
+    def iter_chunks(self, text):
+        """
+        テキストを分割し、エスケープ済みのキー列として返す
+
+        Yields:
+            tuple: (エスケープ済みのキー列, 元の文字数)
+        """
+        size = max(1, self.chunk_size)
+        for start in range(0, len(text), size):
+            chunk = text[start:start + size]
+            yield escape_send_keys(chunk), len(chunk)
+
+    def type_text(self, text, paste_prefix=''):
+        """
+        テキストを入力
+
+        Args:
+            text (str): 入力するテキスト
+            paste_prefix (str): クリップボード経由で入力する前に送信するキー（セルの編集モードに入る操作など）
+
+        Returns:
+            str: 使用した入力方法（'paste' または 'keys'）
+        """
+        if not text:
+            return 'keys'
+
+        start_time = time.perf_counter()
+        sent = 0
+        if self.should_paste(text):
+            method = 'paste'
+            self.set_clipboard(text)
+            self.send(paste_prefix + '^v', self.key_pause)
+            sent = len(text)
+            self._throttle(start_time, sent)
+        else:
+            method = 'keys'
+            for keys, length in self.iter_chunks(text):
+                self.send(keys, self.key_pause)
+                sent += length
+                self._throttle(start_time, sent)
+
+        self.total_chars += sent
+        self.total_seconds += time.perf_counter() - start_time
+        return method
+
+    def _throttle(self, start_time, sent):
+        """入力速度が上限を超えないように待機"""
+        if not self.chars_per_second:
+            return
+        wait = sent / self.chars_per_second - (time.perf_counter() - start_time)
+        if wait > 0:
+            self.sleep(wait)
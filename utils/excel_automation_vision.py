@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+テンプレートマッチングによるUI要素の検出
+KeyTipsで操作できないコントロールを、画像テンプレートから画面上の位置として検出する
+"""
+
+import logging
+from collections import namedtuple
+import numpy as np
+import cv2
+from utils.excel_automation_configs import ExcelConfig
+from utils.excel_automation_screen import to_small_gray
+
+logger = logging.getLogger(__name__)
+
+# 検出結果（座標はキャプチャ画像内のピクセル）
+TemplateMatch = namedtuple('TemplateMatch', ['x', 'y', 'width', 'height', 'score', 'scale'])
+
+
+def match_center(match):
+    """検出結果の中心座標を取得"""
+    return match.x + match.width // 2, match.y + match.height // 2
+
+
+def load_gray_image(path):
+    """画像ファイルをグレースケールで読み込む（日本語パスに対応）"""
+    data = np.fromfile(path, dtype=np.uint8)
+    image = cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError(f"画像を読み込めません: {path}")
+    return image
+
+
+class _TemplatePyramid:
+    """テンプレートの拡大縮小版（通常解像度・粗解像度）の事前計算結果"""
+
+    def __init__(self, image, scales, coarse_scale, min_size):
+        self.levels = []
+        for scale in scales:
+            full = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale != 1.0 else image
+            if min(full.shape[:2]) < min_size:
+                continue
+            coarse = cv2.resize(full, None, fx=coarse_scale, fy=coarse_scale, interpolation=cv2.INTER_AREA)
+            if min(coarse.shape[:2]) < min_size:
+                coarse = None
+            self.levels.append((scale, full, coarse))
+
+
+class TemplateLocator:
+    """
+    キャッシュ付きのマルチスケールテンプレートマッチング
+
+    テンプレートのピラミッドは登録時に一度だけ計算する。検索は
+    1. 前回の検出結果（ウィンドウレイアウトが同じ場合）の再確認
+    2. 前回の検出位置周辺の領域（ROI）の探索
+    3. 粗解像度での全体探索と通常解像度での絞り込み
+    の順に行い、前の段階で見つかった時点で終了する。
+    表示を待機して繰り返し検索する場合は、全体探索する拡大率を1回あたり max_levels 個に制限し、
+    前回検出時の拡大率とそれ以外の拡大率を交互に探索する（見つからない間の1回の検索時間を抑えるため）
+    """
+
+    def __init__(self, scales=None, threshold=None, roi_margin=None, coarse_scale=None, min_size=None):
+        """
+        Args:
+            scales (tuple): テンプレートの拡大率（DPI差の吸収用）
+            threshold (float): 一致とみなす相関値（TM_CCOEFF_NORMED）
+            roi_margin (int): 前回の検出位置周辺を探索する余白（ピクセル）
+            coarse_scale (float): 全体探索時の縮小率
+            min_size (int): テンプレートの最小サイズ（これより小さい縮小版は使用しない）
+        """
+        settings = ExcelConfig.TEMPLATE_MATCHING
+        self.scales = tuple(scales if scales is not None else settings['scales'])
+        self.threshold = threshold if threshold is not None else settings['threshold']
+        self.roi_margin = roi_margin if roi_margin is not None else settings['roi_margin']
+        self.coarse_scale = coarse_scale if coarse_scale is not None else settings['coarse_scale']
+        self.min_size = min_size if min_size is not None else settings['min_size']
+
+        self._templates = {}
+        self._last_hits = {}  # name -> (layout_key, TemplateMatch)
+        self._preferred_scales = {}  # name -> 前回検出時の拡大率
+        self._search_offsets = {}  # name -> 次回の全体探索で優先する拡大率以外から探索を始める位置
+
+    def add_template(self, name, image):
+        """
+        テンプレートを登録し、ピラミッドを事前計算
+
+        Args:
+            name (str): テンプレート名
+            image: 画像ファイルのパスまたは画像（numpy配列）
+        """
+        if isinstance(image, str):
+            image = load_gray_image(image)
+        image = to_small_gray(image, 1.0)
+        self._templates[name] = _TemplatePyramid(image, self.scales, self.coarse_scale, self.min_size)
+        self._last_hits.pop(name, None)
+        self._preferred_scales.pop(name, None)
+        self._search_offsets.pop(name, None)
+
+    def has_template(self, name):
+        """テンプレートが登録済みかどうか"""
+        return name in self._templates
+
+    def invalidate(self, name=None):
+        """前回の検出結果を破棄（nameがNoneの場合はすべて）"""
+        if name is None:
+            self._last_hits.clear()
+        else:
+            self._last_hits.pop(name, None)
+
+    @staticmethod
+    def _search_order(levels):
+        """
+        拡大率を制限した検索で探索する順序（優先する拡大率とそれ以外を交互に並べる）
+
+        例: 優先 P・それ以外 A, B, C の場合は P, A, P, B, P, C
+        """
+        if len(levels) <= 1:
+            return list(levels)
+        order = []
+        for other in levels[1:]:
+            order.extend((levels[0], other))
+        return order
+
+    def search_cycle(self, name, max_levels):
+        """
+        max_levels を指定した検索で、すべての拡大率を全体探索するのに必要な検索回数
+
+        Args:
+            name (str): テンプレート名
+            max_levels (int): 1回の検索で全体探索する拡大率の数（Noneの場合は制限なし）
+        """
+        levels = self._templates[name].levels
+        if max_levels is None or len(levels) <= max_levels:
+            return 1
+        return -(-len(self._search_order(levels)) // max(1, max_levels))
+
+    def _next_levels(self, name, levels, max_levels):
+        """今回の検索で全体探索する拡大率（呼び出しごとに探索順序を進める）"""
+        order = self._search_order(levels)
+        offset = self._search_offsets.get(name, 0) % len(order)
+        selected = []
+        for index in range(max(1, max_levels)):
+            level = order[(offset + index) % len(order)]
+            if level not in selected:
+                selected.append(level)
+        self._search_offsets[name] = (offset + max(1, max_levels)) % len(order)
+        return selected
+
+    def locate(self, name, screen, layout_key=None, max_levels=None):
+        """
+        画面上のテンプレートの位置を検索
+
+        Args:
+            name (str): テンプレート名
+            screen: キャプチャ画像（numpy配列）
+            layout_key: ウィンドウレイアウトを表す値（ウィンドウ矩形など）。変化した場合は前回の結果を再利用しない
+            max_levels (int): 全体探索する拡大率の数（Noneの場合はすべて）。残りの拡大率は次回以降の呼び出しで
+                前回検出時の拡大率と交互に探索する（search_cycle() 回ですべての拡大率を探索）
+
+        Returns:
+            TemplateMatch: 検出結果（見つからない場合はNone）
+        """
+        pyramid = self._templates[name]
+        screen = to_small_gray(screen, 1.0)
+        last = self._last_hits.get(name)
+
+        match = None
+        if last is not None:
+            last_layout, last_match = last
+            if last_layout == layout_key:
+                match = self._verify(pyramid, screen, last_match)
+            if match is None:
+                match = self._search_roi(pyramid, screen, last_match)
+        if match is None:
+            levels = sorted(pyramid.levels, key=lambda level: abs(level[0] - self._preferred_scales.get(name, 1.0)))
+            if max_levels is not None and len(levels) > max_levels:
+                levels = self._next_levels(name, levels, max_levels)
+            match = self._search_full(screen, levels)
+
+        if match is None:
+            self._last_hits.pop(name, None)
+            return None
+        self._last_hits[name] = (layout_key, match)
+        self._preferred_scales[name] = match.scale
+        return match
+
+    def _level(self, pyramid, scale):
+        for level in pyramid.levels:
+            if level[0] == scale:
+                return level
+        return None
+
+    def _verify(self, pyramid, screen, last_match):
+        """前回の検出位置にテンプレートがそのまま存在するかを確認"""
+        level = self._level(pyramid, last_match.scale)
+        if level is None:
+            return None
+        _, template, _ = level
+        height, width = template.shape[:2]
+        patch = screen[last_match.y:last_match.y + height, last_match.x:last_match.x + width]
+        if patch.shape[:2] != (height, width):
+            return None
+        score = float(cv2.matchTemplate(patch, template, cv2.TM_CCOEFF_NORMED)[0, 0])
+        if score < self.threshold:
+            return None
+        return last_match._replace(score=score)
+
+    def _search_roi(self, pyramid, screen, last_match):
+        """前回の検出位置周辺の領域を探索"""
+        margin = self.roi_margin
+        left = max(0, last_match.x - margin)
+        top = max(0, last_match.y - margin)
+        right = min(screen.shape[1], last_match.x + last_match.width + margin)
+        bottom = min(screen.shape[0], last_match.y + last_match.height + margin)
+        roi = screen[top:bottom, left:right]
+
+        # 前回と同じ拡大率から優先して探索
+        levels = sorted(pyramid.levels, key=lambda level: level[0] != last_match.scale)
+        for scale, template, _ in levels:
+            match = self._match(roi, template, scale, left, top)
+            if match is not None:
+                return match
+        return None
+
+    def _search_full(self, screen, levels):
+        """
+        粗解像度で全体を探索し、候補周辺を通常解像度で絞り込む
+        （levels の順に探索し、一致した時点で終了する）
+        """
+        coarse_screen = None
+        for scale, template, coarse in levels:
+            if coarse is None:
+                # 粗解像度では小さすぎるテンプレートは通常解像度で探索
+                match = self._match(screen, template, scale, 0, 0)
+                if match is not None:
+                    return match
+                continue
+            if coarse_screen is None:
+                coarse_screen = cv2.resize(
+                    screen, None, fx=self.coarse_scale, fy=self.coarse_scale, interpolation=cv2.INTER_AREA
+                )
+            if coarse.shape[0] > coarse_screen.shape[0] or coarse.shape[1] > coarse_screen.shape[1]:
+                continue
+            result = cv2.matchTemplate(coarse_screen, coarse, cv2.TM_CCOEFF_NORMED)
+            _, score, _, location = cv2.minMaxLoc(result)
+            # 粗解像度では画素位置のずれ（奇数座標など）で相関が大きく下がるため、
+            # しきい値を大きく緩めて最も一致する位置を候補とし、通常解像度で確認する
+            if score < self.threshold * 0.5:
+                continue
+            height, width = template.shape[:2]
+            x = int(location[0] / self.coarse_scale)
+            y = int(location[1] / self.coarse_scale)
+            margin = int(2 / self.coarse_scale) + 2
+            left, top = max(0, x - margin), max(0, y - margin)
+            roi = screen[top:y + height + margin, left:x + width + margin]
+            match = self._match(roi, template, scale, left, top)
+            if match is not None:
+                return match
+        return None
+
+    def _match(self, image, template, scale, offset_x, offset_y):
+        """画像内でテンプレートを探索（しきい値未満の場合はNone）"""
+        height, width = template.shape[:2]
+        if height > image.shape[0] or width > image.shape[1]:
+            return None
+        result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, location = cv2.minMaxLoc(result)
+        if score < self.threshold:
+            return None
+        return TemplateMatch(
+            x=offset_x + location[0],
+            y=offset_y + location[1],
+            width=width,
+            height=height,
+            score=float(score),
+            scale=scale,
+        )
@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excelプロセスのウィンドウレジストリ
+Excelプロセスが所有するトップレベルウィンドウ（HWND、タイトル、クラス、表示状態、オーナー）を
+メモリ上に保持し、ウィンドウ検索をデスクトップ全体の列挙なしで行う
+"""
+
+import re
+import threading
+import time
+import logging
+from collections import namedtuple
+from utils.excel_automation_configs import ExcelConfig
+
+logger = logging.getLogger(__name__)
+
+# ウィンドウ情報
+WindowInfo = namedtuple('WindowInfo', ['hwnd', 'title', 'class_name', 'visible', 'owner'])
+
+# 複数ダイアログ処理の結果
+#   handled: 処理したダイアログ設定のインデックス（処理した順）
+#   reason: 'handled'（すべて処理）/ 'quiet'（quiet_period の間どのダイアログも表示されなかった）/ 'timeout'
+#   success: すべての処理が例外なく完了したかどうか
+#   wait_seconds: ダイアログの表示を待機した時間の合計（秒）
+DialogWaitResult = namedtuple('DialogWaitResult', ['handled', 'reason', 'success', 'wait_seconds'])
+
+
+class Win32WindowBackend:
+    """win32gui を使用したウィンドウ情報取得バックエンド"""
+
+    # SetWinEventHook 関連の定数
+    EVENT_OBJECT_CREATE = 0x8000
+    EVENT_OBJECT_DESTROY = 0x8001
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    OBJID_WINDOW = 0
+    CHILDID_SELF = 0
+    GA_PARENT = 1
+    WM_QUIT = 0x0012
+
+    def __init__(self):
+        self._watch_thread = None
+        self._watch_thread_id = None
+
+    def enum_windows(self, pid):
+        """指定プロセスのトップレベルウィンドウを列挙"""
+        import win32gui
+        import win32process
+
+        windows = []
+
+        def enum_windows_callback(hwnd, _):
+            try:
+                _, process_id = win32process.GetWindowThreadProcessId(hwnd)
+                if process_id == pid:
+                    windows.append(self._describe(hwnd))
+            except Exception as e:
+                logger.debug(f"ウィンドウ情報取得エラー（HWND: {hwnd}）: {e}")
+            return True
+
+        win32gui.EnumWindows(enum_windows_callback, None)
+        return windows
+
+    def get_window(self, hwnd, pid):
+        """指定HWNDのウィンドウ情報を取得（対象外の場合はNone）"""
+        import ctypes
+        import win32gui
+        import win32process
+
+        try:
+            if not win32gui.IsWindow(hwnd):
+                return None
+            _, process_id = win32process.GetWindowThreadProcessId(hwnd)
+            if process_id != pid:
+                return None
+            # トップレベルウィンドウのみを対象とする
+            user32 = ctypes.windll.user32
+            if user32.GetAncestor(hwnd, self.GA_PARENT) != user32.GetDesktopWindow():
+                return None
+            return self._describe(hwnd)
+        except Exception as e:
+            logger.debug(f"ウィンドウ情報取得エラー（HWND: {hwnd}）: {e}")
+            return None
+
+    def _describe(self, hwnd):
+        """HWNDからウィンドウ情報を生成"""
+        import win32gui
+        import win32con
+
+        return WindowInfo(
+            hwnd=hwnd,
+            title=win32gui.GetWindowText(hwnd),
+            class_name=win32gui.GetClassName(hwnd),
+            visible=bool(win32gui.IsWindowVisible(hwnd)),
+            owner=win32gui.GetWindow(hwnd, win32con.GW_OWNER) or None,
+        )
+
+    def start_watch(self, pid, callback):
+        """
+        ウィンドウの生成・破棄・タイトル変更の通知を開始
+
+        Args:
+            pid (int): 監視対象のプロセスID
+            callback (callable): callback(event, hwnd) 形式の通知先（event は 'created', 'destroyed', 'changed'）
+
+        Returns:
+            bool: 通知の開始に成功したかどうか
+        """
+        import ctypes
+        from ctypes import wintypes
+
+        if self._watch_thread is not None:
+            return True
+
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+        WinEventProc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+        )
+        started = threading.Event()
+        result = {'ok': False}
+
+        def win_event_proc(hook, event, hwnd, id_object, id_child, thread_id, event_time):
+            if id_object != self.OBJID_WINDOW or id_child != self.CHILDID_SELF or not hwnd:
+                return
+            if event == self.EVENT_OBJECT_CREATE:
+                callback('created', hwnd)
+            elif event == self.EVENT_OBJECT_DESTROY:
+                callback('destroyed', hwnd)
+            else:
+                callback('changed', hwnd)
+
+        def watch_loop():
+            # コールバックオブジェクトはスレッド終了まで参照を保持する
+            proc = WinEventProc(win_event_proc)
+            hook = user32.SetWinEventHook(
+                self.EVENT_OBJECT_CREATE, self.EVENT_OBJECT_NAMECHANGE,
+                0, proc, pid, 0, self.WINEVENT_OUTOFCONTEXT
+            )
+            self._watch_thread_id = kernel32.GetCurrentThreadId()
+            result['ok'] = bool(hook)
+            started.set()
+            if not hook:
+                return
+            try:
+                msg = wintypes.MSG()
+                while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                    user32.TranslateMessage(ctypes.byref(msg))
+                    user32.DispatchMessageW(ctypes.byref(msg))
+            finally:
+                user32.UnhookWinEvent(hook)
+
+        self._watch_thread = threading.Thread(target=watch_loop, daemon=True)
+        self._watch_thread.start()
+        started.wait(timeout=1.0)
+        if not result['ok']:
+            self._watch_thread = None
+            self._watch_thread_id = None
+        return result['ok']
+
+    def stop_watch(self):
+        """ウィンドウ通知を停止"""
+        import ctypes
+
+        if self._watch_thread is None:
+            return
+        try:
+            ctypes.windll.user32.PostThreadMessageW(self._watch_thread_id, self.WM_QUIT, 0, 0)
+            self._watch_thread.join(timeout=1.0)
+        except Exception as e:
+            logger.debug(f"ウィンドウ通知停止エラー（無視可能）: {e}")
+        self._watch_thread = None
+        self._watch_thread_id = None
+
+
+class FakeWindowBackend:
+    """テスト用のウィンドウバックエンド（ウィンドウを手動で追加・削除する）"""
+
+    def __init__(self, windows=None, watch=True):
+        self.windows = {}
+        self.enum_count = 0
+        self._watch = watch
+        self._callback = None
+        for window in windows or []:
+            self.windows[window.hwnd] = window
+
+    def enum_windows(self, pid):
+        self.enum_count += 1
+        return list(self.windows.values())
+
+    def get_window(self, hwnd, pid):
+        return self.windows.get(hwnd)
+
+    def start_watch(self, pid, callback):
+        if not self._watch:
+            return False
+        self._callback = callback
+        return True
+
+    def stop_watch(self):
+        self._callback = None
+
+    def add_window(self, hwnd, title='', class_name='', visible=True, owner=None):
+        """ウィンドウを追加して生成通知を送る"""
+        self.windows[hwnd] = WindowInfo(hwnd, title, class_name, visible, owner)
+        self._notify('created', hwnd)
+
+    def update_window(self, hwnd, **changes):
+        """ウィンドウ情報を変更して変更通知を送る"""
+        self.windows[hwnd] = self.windows[hwnd]._replace(**changes)
+        self._notify('changed', hwnd)
+
+    def remove_window(self, hwnd):
+        """ウィンドウを削除して破棄通知を送る"""
+        self.windows.pop(hwnd, None)
+        self._notify('destroyed', hwnd)
+
+    def _notify(self, event, hwnd):
+        if self._callback:
+            self._callback(event, hwnd)
+
+
+class ExcelWindowRegistry:
+    """
+    Excelプロセス単位のウィンドウレジストリ
+
+    ウィンドウの生成・破棄通知（利用できない場合は一定間隔の差分列挙）でメモリ上の一覧を
+    差分更新し、各検索はメモリ上の一覧に対して行う。
+    通知が利用できない場合の差分列挙の間隔は、変化がない間は max_refresh_interval まで倍々に延ばす
+    """
+
+    def __init__(self, pid, backend=None, refresh_interval=None, resync_interval=None, max_refresh_interval=None):
+        """
+        Args:
+            pid (int): 対象のExcelプロセスID
+            backend: ウィンドウ情報取得バックエンド（Noneの場合は Win32WindowBackend）
+            refresh_interval (float): 通知が利用できない場合の差分列挙の最小間隔（秒）
+            resync_interval (float): 通知利用時の取りこぼし補正のための再列挙間隔（秒）
+            max_refresh_interval (float): 通知が利用できない場合の差分列挙の最大間隔（秒）
+        """
+        self.pid = pid
+        self.backend = backend if backend is not None else Win32WindowBackend()
+        if refresh_interval is None:
+            refresh_interval = ExcelConfig.get_timing('window_registry_refresh', 0.05)
+        if resync_interval is None:
+            resync_interval = ExcelConfig.get_timing('window_registry_resync', 1.0)
+        if max_refresh_interval is None:
+            max_refresh_interval = ExcelConfig.get_timing('window_registry_refresh_max', 0.5)
+        self.refresh_interval = refresh_interval
+        self.resync_interval = resync_interval
+        self.max_refresh_interval = max(refresh_interval, max_refresh_interval)
+        self.main_window_class = ExcelConfig.get_excel_setting('main_window_class')
+
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._last_refresh = None
+        self._poll_interval = refresh_interval
+        self._watching = False
+        # 通知の通し番号（列挙中に届いた通知を列挙結果で上書きしないように使う）
+        self._event_sequence = 0
+        self._event_sequences = {}  # hwnd -> 最後に通知を反映したときの通し番号
+
+    def start(self):
+        """通知の購読を開始し、初回の列挙を行う"""
+        try:
+            self._watching = self.backend.start_watch(self.pid, self._on_event)
+        except Exception as e:
+            logger.debug(f"ウィンドウ通知の開始に失敗（差分列挙を使用）: {e}")
+            self._watching = False
+        logger.info(f"ウィンドウレジストリを開始しました (PID: {self.pid}, 通知: {self._watching})")
+        self.refresh(force=True)
+        return self
+
+    def stop(self):
+        """通知の購読を停止"""
+        if self._watching:
+            try:
+                self.backend.stop_watch()
+            except Exception as e:
+                logger.debug(f"ウィンドウ通知の停止エラー（無視可能）: {e}")
+        self._watching = False
+
+    def _on_event(self, event, hwnd):
+        """バックエンドからの通知を反映"""
+        window = None
+        if event != 'destroyed':
+            window = self.backend.get_window(hwnd, self.pid)
+            if window is None:
+                return
+        with self._lock:
+            self._event_sequence += 1
+            self._event_sequences[hwnd] = self._event_sequence
+            if window is None:
+                self._windows.pop(hwnd, None)
+            else:
+                self._windows[hwnd] = window
+
+    def refresh(self, force=False):
+        """
+        必要に応じてウィンドウ一覧を再列挙し、差分を反映
+
+        Args:
+            force (bool): 間隔に関係なく再列挙するかどうか
+
+        Returns:
+            bool: 再列挙を行ったかどうか
+        """
+        now = time.monotonic()
+        interval = self.resync_interval if self._watching else self._poll_interval
+        if not force and self._last_refresh is not None and now - self._last_refresh < interval:
+            return False
+
+        with self._lock:
+            sequence = self._event_sequence
+        try:
+            current = {window.hwnd: window for window in self.backend.enum_windows(self.pid)}
+        except Exception as e:
+            logger.debug(f"ウィンドウ列挙エラー: {e}")
+            return False
+
+        with self._lock:
+            # 列挙中に通知が届いたウィンドウは通知の内容が新しいため、列挙結果で上書きしない
+            newer = {hwnd for hwnd, event_sequence in self._event_sequences.items() if event_sequence > sequence}
+            self._event_sequences = {hwnd: self._event_sequences[hwnd] for hwnd in newer}
+            added = current.keys() - self._windows.keys() - newer
+            removed = self._windows.keys() - current.keys() - newer
+            changed = False
+            for hwnd in removed:
+                del self._windows[hwnd]
+            for hwnd, window in current.items():
+                if hwnd not in newer and self._windows.get(hwnd) != window:
+                    self._windows[hwnd] = window
+                    changed = True
+        self._last_refresh = now
+        if added or removed or changed:
+            self._poll_interval = self.refresh_interval
+        else:
+            # 変化がない間は列挙の間隔を延ばす（通知が利用できない場合の負荷を抑える）
+            self._poll_interval = min(self._poll_interval * 2, self.max_refresh_interval)
+        if added or removed:
+            logger.debug(f"ウィンドウ一覧を更新しました (追加: {len(added)}, 削除: {len(removed)})")
+        return True
+
+    def windows(self):
+        """現在のウィンドウ一覧のスナップショットを取得"""
+        self.refresh()
+        with self._lock:
+            return list(self._windows.values())
+
+    def get(self, hwnd):
+        """HWNDからウィンドウ情報を取得"""
+        self.refresh()
+        with self._lock:
+            return self._windows.get(hwnd)
+
+    def find_main_window(self):
+        """
+        表示されているExcelメインウィンドウを検索
+
+        Returns:
+            WindowInfo: メインウィンドウの情報（見つからない場合はNone）
+        """
+        for window in self.windows():
+            if window.visible and window.class_name == self.main_window_class:
+                return window
+        return None
+
+    def find_dialogs(self, title_patterns, exclude_handles=()):
+        """
+        タイトルパターンに一致する表示中のダイアログを検索
+
+        Args:
+            title_patterns (str or list): ダイアログタイトルのパターン（正規表現または部分文字列）
+            exclude_handles (iterable): 除外するウィンドウハンドル
+
+        Returns:
+            list: 一致したウィンドウ情報のリスト（パターンの優先順）
+        """
+        if isinstance(title_patterns, str):
+            title_patterns = [title_patterns]
+        exclude_handles = set(exclude_handles)
+
+        candidates = [
+            window for window in self.windows()
+            if window.visible
+            and window.title
+            and window.class_name != self.main_window_class
+            and window.hwnd not in exclude_handles
+        ]
+
+        found = []
+        for pattern in title_patterns:
+            for window in candidates:
+                if window in found:
+                    continue
+                if _title_matches(pattern, window.title):
+                    found.append(window)
+        return found
+
+    def find_dialog(self, title_patterns, exclude_handles=()):
+        """タイトルパターンに一致する最初のダイアログを検索（見つからない場合はNone）"""
+        dialogs = self.find_dialogs(title_patterns, exclude_handles)
+        return dialogs[0] if dialogs else None
+
+    def find_any_dialog(self, dialog_configs, exclude_handles=()):
+        """
+        複数のダイアログ設定のうち、表示されている最初のダイアログを検索
+
+        Args:
+            dialog_configs (list): ダイアログ設定のリスト（'title_patterns' を含む辞書）
+            exclude_handles (iterable): 除外するウィンドウハンドル
+
+        Returns:
+            tuple: (ダイアログ設定のインデックス, ウィンドウ情報)（見つからない場合はNone）
+        """
+        for index, config in enumerate(dialog_configs):
+            dialog = self.find_dialog(config.get('title_patterns', []), exclude_handles)
+            if dialog:
+                return index, dialog
+        return None
+
+    def handle_dialogs(self, dialog_configs, perform, timeout, quiet_period, check_interval=None, exclude_handles=()):
+        """
+        複数のダイアログ設定を同時に監視し、表示された順に処理
+
+        すべての設定のダイアログを処理した時点、または最後の処理（開始時）から quiet_period 秒間
+        どのダイアログも表示されなかった時点で終了する
+
+        Args:
+            dialog_configs (list): ダイアログ設定のリスト（'title_patterns' を含む辞書）
+            perform (callable): perform(ダイアログ設定, ウィンドウ情報) 形式の処理関数
+            timeout (float): 全体の最大待機時間（秒）
+            quiet_period (float): ダイアログが表示されないまま終了するまでの時間（秒）
+            check_interval (float): チェック間隔（秒）（Noneの場合は差分列挙の間隔）
+            exclude_handles (iterable): 検索から除外するウィンドウハンドル
+
+        Returns:
+            DialogWaitResult: 処理結果
+        """
+        pending = list(enumerate(dialog_configs))
+        excluded = list(exclude_handles)
+        handled = []
+        success = True
+        wait_seconds = 0.0
+        reason = 'handled'
+        deadline = time.monotonic() + timeout
+        last_activity = time.monotonic()
+
+        while pending:
+            now = time.monotonic()
+            timeout_remaining = deadline - now
+            quiet_remaining = last_activity + quiet_period - now
+            if min(timeout_remaining, quiet_remaining) <= 0:
+                reason = 'timeout' if timeout_remaining <= quiet_remaining else 'quiet'
+                break
+
+            found = self.wait_for(
+                lambda: self.find_any_dialog([config for _, config in pending], excluded),
+                min(timeout_remaining, quiet_remaining),
+                check_interval
+            )
+            wait_seconds += time.monotonic() - now
+            if found is None:
+                reason = 'timeout' if timeout_remaining <= quiet_remaining else 'quiet'
+                break
+
+            position, dialog = found
+            index, config = pending.pop(position)
+            handled.append(index)
+            excluded.append(dialog.hwnd)
+            try:
+                perform(config, dialog)
+            except Exception as e:
+                success = False
+                logger.warning(f"ダイアログの処理に失敗しました (パターン: {config.get('title_patterns', [])}): {e}")
+            last_activity = time.monotonic()
+
+        return DialogWaitResult(handled, reason, success, wait_seconds)
+
+    def wait_for(self, finder, timeout, check_interval=None):
+        """
+        検索関数が結果を返すまで待機
+
+        Args:
+            finder (callable): 引数なしで呼び出し、見つかった場合に真となる値を返す関数
+            timeout (float): 最大待機時間（秒）
+            check_interval (float): チェック間隔（秒）（Noneの場合は差分列挙の間隔）
+
+        Returns:
+            検索関数の戻り値（タイムアウトした場合はNone）
+        """
+        if check_interval is None:
+            check_interval = self.refresh_interval
+        deadline = time.monotonic() + timeout
+        while True:
+            result = finder()
+            if result:
+                return result
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(check_interval, remaining))
+
+
+def _title_matches(pattern, title):
+    """タイトルがパターンに一致するかどうか（正規表現として解釈できない場合は部分一致）"""
+    try:
+        if re.search(pattern, title):
+            return True
+    except re.error:
+        pass
+    return pattern.lower() in title.lower()